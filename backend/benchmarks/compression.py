@@ -0,0 +1,94 @@
+"""
+Compression benchmark: CPU time vs. bytes on the wire
+
+Fetches representative responses from the app uncompressed (listing pages,
+a movie detail, the first part of the NDJSON export), then compresses each
+with gzip at several levels and, when the brotli package is installed, brotli
+at several qualities. For every combination it reports the compressed size,
+the CPU time and the estimated time to send the response over a link of the
+given bandwidth (CPU + transfer), which is what GZIP_LEVEL / BROTLI_QUALITY /
+COMPRESSION_MINIMUM_SIZE trade off.
+
+Usage (from the backend directory):
+    python -m benchmarks.compression --rounds 20 --mbps 10
+"""
+import argparse
+import time
+from typing import Dict, List, Tuple
+from config import settings
+from utils.compression import Compressor, brotli
+
+GZIP_LEVELS = (1, 4, 6, 9)
+BROTLI_QUALITIES = (1, 4, 6, 11)
+
+# Bytes of the export to compress, enough to reach the streaming steady state
+EXPORT_SAMPLE_BYTES = 1_000_000
+
+
+def fetch_payloads() -> Dict[str, bytes]:
+    # Imported here: building the app starts the background services
+    from fastapi.testclient import TestClient
+    from main import app
+
+    settings.RESPONSE_CACHE_ENABLED = False
+    headers = {"Accept-Encoding": "identity"}
+    payloads = {}
+    with TestClient(app) as client:
+        for name, url in (
+            ("detail", "/movies/1"),
+            ("page of 20", "/movies?page_size=20"),
+            ("page of 100", "/movies?page_size=100"),
+        ):
+            payloads[name] = client.get(url, headers=headers).raise_for_status().content
+        with client.stream("GET", "/movies/export", headers=headers) as response:
+            sample = b""
+            for chunk in response.iter_bytes():
+                sample += chunk
+                if len(sample) >= EXPORT_SAMPLE_BYTES:
+                    break
+        payloads["export (1 MB)"] = sample[:EXPORT_SAMPLE_BYTES]
+    return payloads
+
+
+def settings_to_try() -> List[Tuple[str, str, int]]:
+    combos = [(f"gzip-{level}", "gzip", level) for level in GZIP_LEVELS]
+    if brotli is not None:
+        combos += [(f"br-{quality}", "br", quality) for quality in BROTLI_QUALITIES]
+    return combos
+
+
+def measure(payload: bytes, encoding: str, level: int, rounds: int) -> Tuple[int, float]:
+    """Compressed size and mean CPU milliseconds"""
+    size = 0
+    started = time.thread_time()
+    for _ in range(rounds):
+        compressor = Compressor(encoding, gzip_level=level, brotli_quality=level)
+        size = len(compressor.finish(payload))
+    return size, (time.thread_time() - started) / rounds * 1000
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.compression", description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rounds", type=int, default=20, help="Compressions timed per combination")
+    parser.add_argument("--mbps", type=float, default=10.0, help="Link bandwidth for the transfer estimate")
+    args = parser.parse_args(argv)
+
+    bytes_per_ms = args.mbps * 1e6 / 8 / 1000
+    if brotli is None:
+        print("brotli not installed: gzip only")
+    print(f"Transfer estimate at {args.mbps:g} Mbit/s; current settings: gzip-{settings.GZIP_LEVEL}, "
+          f"br-{settings.BROTLI_QUALITY}, minimum {settings.COMPRESSION_MINIMUM_SIZE} bytes")
+
+    for name, payload in fetch_payloads().items():
+        identity_ms = len(payload) / bytes_per_ms
+        print(f"\n{name}: {len(payload)} bytes, {identity_ms:.2f} ms to send uncompressed")
+        print(f"  {'encoding':<10} {'bytes':>9} {'ratio':>7} {'cpu ms':>8} {'total ms':>9}")
+        for label, encoding, level in settings_to_try():
+            size, cpu_ms = measure(payload, encoding, level, args.rounds)
+            total = cpu_ms + size / bytes_per_ms
+            print(f"  {label:<10} {size:>9} {size / len(payload):>7.3f} {cpu_ms:>8.3f} {total:>9.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,160 @@
+"""
+Serialization benchmark for the movie listing and detail endpoints
+
+Compares, on the configured database:
+
+- ``orm``: ORM objects with eager loads, validated into MovieSummary /
+  MovieResponse models and serialized the way FastAPI does for a
+  response_model (the path before LEAN_SERIALIZATION)
+- ``dicts``: column tuples shaped into dicts, still validated and serialized
+  through the response model (LEAN_SERIALIZATION=false)
+- ``lean``: the same dicts encoded directly by FastJSONResponse (orjson when
+  installed)
+
+Each path is timed on its own (query + serialization), then whole requests
+are timed through the app with LEAN_SERIALIZATION off and on and the
+response cache disabled.
+
+Usage (from the backend directory):
+    python -m benchmarks.serialization --rounds 200 --page-size 50
+"""
+import argparse
+import json
+import time
+from typing import Any, Callable, Dict, List, Sequence
+from pydantic import TypeAdapter
+from sqlalchemy import select
+from sqlalchemy.orm import Session, joinedload, selectinload
+from config import settings
+from database.db import ReadSessionLocal
+from models import Movie
+from schemas import MovieList, MovieResponse, MovieSummary
+from services.movie_pages import load_movie_detail, load_movie_summaries
+from utils.responses import FastJSONResponse, orjson
+
+MOVIE_LIST = TypeAdapter(MovieList)
+MOVIE_RESPONSE = TypeAdapter(MovieResponse)
+
+
+def _model_json(adapter: TypeAdapter, value: Any) -> bytes:
+    # What FastAPI does with a response_model: validate, dump, json.dumps
+    content = adapter.dump_python(adapter.validate_python(value, from_attributes=True), mode="json")
+    return json.dumps(content, ensure_ascii=False, allow_nan=None, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def _orm_listing(db: Session, ids: Sequence[int]) -> bytes:
+    movies = db.query(Movie).options(
+        selectinload(Movie.genres),
+        joinedload(Movie.rating)
+    ).filter(Movie.id.in_(ids)).all()
+    by_id = {movie.id: movie for movie in movies}
+    summaries = [
+        MovieSummary(
+            id=movie.id,
+            title=movie.title,
+            year=movie.year,
+            duration=movie.duration,
+            average_rating=movie.rating.rating if movie.rating else None,
+            vote_count=movie.rating.vote_count if movie.rating else None,
+            genres=[g.genre for g in movie.genres]
+        )
+        for movie in (by_id[movie_id] for movie_id in ids if movie_id in by_id)
+    ]
+    return _model_json(MOVIE_LIST, MovieList(movies=summaries, total=None, page=1, page_size=len(ids)))
+
+
+def _dict_listing(db: Session, ids: Sequence[int]) -> Dict[str, Any]:
+    return {
+        "movies": load_movie_summaries(db, ids),
+        "total": None,
+        "total_estimated": False,
+        "page": 1,
+        "page_size": len(ids),
+        "next_cursor": None
+    }
+
+
+def _orm_detail(db: Session, movie_id: int) -> bytes:
+    movie = db.query(Movie).options(
+        joinedload(Movie.genres),
+        joinedload(Movie.rating)
+    ).filter(Movie.id == movie_id).first()
+    return _model_json(MOVIE_RESPONSE, MovieResponse.model_validate(movie))
+
+
+def _time(work: Callable[[], Any], rounds: int) -> float:
+    """Mean milliseconds per call"""
+    work()
+    started = time.perf_counter()
+    for _ in range(rounds):
+        work()
+    return (time.perf_counter() - started) / rounds * 1000
+
+
+def _report(name: str, timings: Dict[str, float]) -> None:
+    baseline = timings["orm"] if "orm" in timings else timings["off"]
+    print(name)
+    for path, ms in timings.items():
+        print(f"  {path:<6} {ms:8.3f} ms  {baseline / ms:5.2f}x")
+
+
+def run_paths(ids: List[int], rounds: int) -> None:
+    db = ReadSessionLocal()
+    try:
+        detail_id = ids[0]
+        _report(f"listing, {len(ids)} movies (query + serialization)", {
+            "orm": _time(lambda: _orm_listing(db, ids), rounds),
+            "dicts": _time(lambda: _model_json(MOVIE_LIST, _dict_listing(db, ids)), rounds),
+            "lean": _time(lambda: FastJSONResponse(_dict_listing(db, ids)).body, rounds),
+        })
+        _report(f"detail, movie {detail_id} (query + serialization)", {
+            "orm": _time(lambda: _orm_detail(db, detail_id), rounds),
+            "dicts": _time(lambda: _model_json(MOVIE_RESPONSE, load_movie_detail(db, detail_id)), rounds),
+            "lean": _time(lambda: FastJSONResponse(load_movie_detail(db, detail_id)).body, rounds),
+        })
+    finally:
+        db.close()
+
+
+def run_requests(ids: List[int], rounds: int) -> None:
+    # Imported here: building the app starts the background services
+    from fastapi.testclient import TestClient
+    from main import app
+
+    settings.RESPONSE_CACHE_ENABLED = False
+    urls = {
+        f"GET /movies?page_size={len(ids)}": f"/movies?page_size={len(ids)}&include_total=false",
+        f"GET /movies/{ids[0]}": f"/movies/{ids[0]}",
+    }
+    with TestClient(app) as client:
+        for name, url in urls.items():
+            timings = {}
+            for path, lean in (("off", False), ("on", True)):
+                settings.LEAN_SERIALIZATION = lean
+                timings[path] = _time(lambda: client.get(url).raise_for_status(), rounds)
+            _report(f"{name} (whole request, LEAN_SERIALIZATION off/on)", timings)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.serialization", description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rounds", type=int, default=200, help="Calls timed per path")
+    parser.add_argument("--page-size", type=int, default=50, help="Movies per listing page")
+    args = parser.parse_args(argv)
+
+    db = ReadSessionLocal()
+    try:
+        ids = list(db.scalars(select(Movie.id).order_by(Movie.id).limit(args.page_size)))
+    finally:
+        db.close()
+    if not ids:
+        print("No movies in the database")
+        return 1
+
+    print(f"JSON encoder: {'orjson' if orjson is not None else 'json (orjson not installed)'}")
+    run_paths(ids, args.rounds)
+    run_requests(ids, args.rounds)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,4 @@
+import sys
+from cli.datasets import main
+
+sys.exit(main())
@@ -0,0 +1,332 @@
+"""
+Bulk import/export of the movies, genres and ratings datasets
+
+Files use the same layout as the seed CSVs in ``database/`` (``id_pelicula``,
+``titulo``, ...), either as CSV or as newline-delimited JSON with those field
+names. Imports upsert on each table's key (``id_pelicula`` for movies,
+``id_pelicula`` + ``genero`` for genres, ``id`` for ratings) in one short
+transaction per chunk, so they can run against a live database without holding
+its writer; genre names missing from the catalog are added to it. The schema,
+search index and version triggers are set up first, like on API startup, so
+every row the import changes moves the catalog version (services/versions.py),
+which tells running API processes to reload their counts, indexes,
+leaderboards and cached responses; rows that already hold the file's values
+are left alone. SQLite has a single writer, so dataset files are imported one after another.
+Exports read through the read engine and run in parallel, one worker per dataset.
+
+Usage (from the backend directory):
+    python -m cli import --movies movies.csv --genres genres.ndjson
+    python -m cli export --output exports/ --format ndjson
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterator, List, Optional, Sequence
+from sqlalchemy.engine import Connection, Engine
+from config import settings
+from database.bootstrap import bootstrap_database
+from database.db import engine as default_engine, read_engine as default_read_engine
+from database.seed import SEED_DATASETS, SeedDataset, iter_dataset_chunks, upsert_rows
+from utils.logging import logger
+
+DATASETS: Dict[str, SeedDataset] = {dataset.name: dataset for dataset in SEED_DATASETS}
+FORMATS = ("csv", "ndjson")
+
+# Seconds between progress lines for a running dataset
+PROGRESS_INTERVAL = 2.0
+
+
+@dataclass
+class TransferResult:
+    """Outcome of importing or exporting one dataset"""
+    dataset: str
+    rows: int
+    seconds: float
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds > 0 else 0.0
+
+
+class Progress:
+    """Periodic progress logging for one dataset"""
+
+    def __init__(self, action: str, dataset: str):
+        self.action = action
+        self.dataset = dataset
+        self.rows = 0
+        self.started = time.perf_counter()
+        self._last_report = self.started
+
+    def advance(self, rows: int) -> None:
+        self.rows += rows
+        now = time.perf_counter()
+        if now - self._last_report >= PROGRESS_INTERVAL:
+            self._last_report = now
+            elapsed = now - self.started
+            logger.info(
+                f"{self.action} {self.dataset}: {self.rows} rows "
+                f"({self.rows / elapsed:.0f} rows/s)"
+            )
+
+    def finish(self) -> TransferResult:
+        result = TransferResult(self.dataset, self.rows, time.perf_counter() - self.started)
+        logger.info(
+            f"{self.action} {self.dataset}: done, {result.rows} rows in "
+            f"{result.seconds:.2f}s ({result.rows_per_second:.0f} rows/s)"
+        )
+        return result
+
+
+def detect_format(path: str, default: Optional[str] = None) -> str:
+    """Guess the file format from its extension"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".csv":
+        return "csv"
+    if extension in (".ndjson", ".jsonl"):
+        return "ndjson"
+    if default:
+        return default
+    raise ValueError(f"Cannot detect format of {path}, use --format")
+
+
+def iter_ndjson_chunks(
+    dataset: SeedDataset,
+    path: str,
+    batch_size: int,
+    converters: Optional[Sequence[Callable]] = None
+) -> Iterator[List[tuple]]:
+    """Stream an NDJSON file as lists of converted row tuples"""
+    headers = [header for header, _, _ in dataset.columns]
+    fields = list(zip(headers, converters or dataset.converters()))
+    with open(path, "r", encoding="utf-8") as file:
+        chunk = []
+        for line_number, line in enumerate(file, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+                chunk.append(tuple(
+                    converter(record[header]) if record[header] is not None else None
+                    for header, converter in fields
+                ))
+            except (ValueError, KeyError, TypeError) as e:
+                logger.warning(f"Skipping invalid line {line_number} in {dataset.name} NDJSON: {e}")
+                continue
+            if len(chunk) >= batch_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+
+def resolve_bound_columns(dataset: SeedDataset, connection: Connection, chunk: List[tuple]) -> List[tuple]:
+    """Run the converters that need the database (genre names) over a chunk, skipping rows they reject"""
+    bound = [
+        (position, dataset.bound_converters[column](connection))
+        for position, (_, column, _) in enumerate(dataset.columns)
+        if column in dataset.bound_converters
+    ]
+    if not bound:
+        return chunk
+    rows = []
+    for row in chunk:
+        values = list(row)
+        try:
+            for position, converter in bound:
+                if values[position] is not None:
+                    values[position] = converter(values[position])
+        except ValueError as e:
+            logger.warning(f"Skipping invalid {dataset.name} row: {e}")
+            continue
+        rows.append(tuple(values))
+    return rows
+
+
+def import_dataset(
+    engine: Engine,
+    dataset: SeedDataset,
+    path: str,
+    file_format: str,
+    batch_size: int
+) -> TransferResult:
+    """Upsert a dataset file into its table, one transaction per chunk"""
+    columns = dataset.column_names
+    progress = Progress("Import", dataset.name)
+    # Columns resolved through the database are read as plain values and
+    # converted inside the chunk's transaction
+    converters = [converter for _, _, converter in dataset.columns]
+    if file_format == "csv":
+        chunks = iter_dataset_chunks(dataset, path, batch_size, converters)
+    else:
+        chunks = iter_ndjson_chunks(dataset, path, batch_size, converters)
+
+    for chunk in chunks:
+        # The writer connection is only held while a chunk is written, so API
+        # writes queue behind one chunk rather than the whole file. New catalog
+        # genres commit together with the chunk that uses them
+        with engine.begin() as connection:
+            rows = resolve_bound_columns(dataset, connection, chunk)
+            upsert_rows(
+                connection,
+                dataset.table,
+                [dict(zip(columns, row)) for row in rows],
+                dataset.key_columns
+            )
+        progress.advance(len(rows))
+    return progress.finish()
+
+
+def export_dataset(
+    engine: Engine,
+    dataset: SeedDataset,
+    path: str,
+    file_format: str,
+    batch_size: int
+) -> TransferResult:
+    """Write a table to a file, streaming rows from the database"""
+    headers = [header for header, _, _ in dataset.columns]
+    query = dataset.select_for_export()
+
+    progress = Progress("Export", dataset.name)
+    with engine.connect() as connection, open(path, "w", encoding="utf-8", newline="") as file:
+        result = connection.execution_options(yield_per=batch_size).execute(query)
+        if file_format == "csv":
+            writer = csv.writer(file)
+            writer.writerow(headers)
+        for rows in result.partitions():
+            if file_format == "csv":
+                writer.writerows(
+                    ["" if value is None else value for value in row] for row in rows
+                )
+            else:
+                file.writelines(
+                    json.dumps(dict(zip(headers, row)), ensure_ascii=False) + "\n" for row in rows
+                )
+            progress.advance(len(rows))
+    return progress.finish()
+
+
+def _run_parallel(jobs: List[tuple], workers: int) -> List[TransferResult]:
+    """Run (function, args) jobs in a thread pool and collect their results"""
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = [executor.submit(function, *args) for function, args in jobs]
+        return [future.result() for future in futures]
+
+
+def _report(action: str, results: List[TransferResult], seconds: float) -> None:
+    """Log the throughput of a finished run"""
+    logger.info(f"{action} summary:")
+    for result in results:
+        logger.info(
+            f"  {result.dataset:<8} {result.rows:>10} rows  {result.seconds:8.2f}s  "
+            f"{result.rows_per_second:>10.0f} rows/s"
+        )
+    total_rows = sum(result.rows for result in results)
+    rate = total_rows / seconds if seconds > 0 else 0.0
+    logger.info(f"  {'total':<8} {total_rows:>10} rows  {seconds:8.2f}s  {rate:>10.0f} rows/s")
+
+
+def run_import(args: argparse.Namespace, engine: Engine) -> List[TransferResult]:
+    """Import every dataset given on the command line, one after another"""
+    # Tables, migrations and triggers only: the seed files are not loaded,
+    # and DB_BOOTSTRAP_MODE=reset never drops data here
+    bootstrap_database(engine, mode="auto", seed=False)
+
+    files = []
+    for name in DATASETS:
+        path = getattr(args, name)
+        if path:
+            files.append((DATASETS[name], path, args.format or detect_format(path)))
+    if not files:
+        raise ValueError("Nothing to import, pass at least one of --movies, --genres, --ratings")
+
+    started = time.perf_counter()
+    # Writers would only take turns on the database lock (and the writer
+    # engine's single pooled connection on SQLite), so files go in order
+    results = [
+        import_dataset(engine, dataset, path, file_format, args.batch_size)
+        for dataset, path, file_format in files
+    ]
+    _report("Import", results, time.perf_counter() - started)
+    return results
+
+
+def run_export(args: argparse.Namespace, engine: Engine) -> List[TransferResult]:
+    """Export the selected datasets into the output directory"""
+    os.makedirs(args.output, exist_ok=True)
+    file_format = args.format or "csv"
+
+    jobs = [
+        (export_dataset, (
+            engine,
+            DATASETS[name],
+            os.path.join(args.output, f"{name}.{file_format}"),
+            file_format,
+            args.batch_size
+        ))
+        for name in args.datasets
+    ]
+
+    started = time.perf_counter()
+    results = _run_parallel(jobs, args.jobs)
+    _report("Export", results, time.perf_counter() - started)
+    return results
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m cli",
+        description="Bulk import/export of the movies, genres and ratings datasets"
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = subparsers.add_parser("import", help="Upsert dataset files into the database")
+    for name in DATASETS:
+        import_parser.add_argument(f"--{name}", metavar="PATH", help=f"{name} file (.csv or .ndjson)")
+
+    export_parser = subparsers.add_parser("export", help="Write the datasets to files")
+    export_parser.add_argument("--output", required=True, metavar="DIR", help="Output directory")
+    export_parser.add_argument(
+        "--datasets", nargs="+", choices=list(DATASETS), default=list(DATASETS),
+        help="Datasets to export (default: all)"
+    )
+
+    export_parser.add_argument(
+        "--jobs", type=int, default=len(DATASETS),
+        help="Datasets exported in parallel"
+    )
+
+    for subparser in (import_parser, export_parser):
+        subparser.add_argument("--format", choices=FORMATS, help="File format (default: from extension / csv)")
+        subparser.add_argument(
+            "--batch-size", type=int, default=settings.SEED_BATCH_SIZE,
+            help="Rows per chunk"
+        )
+    return parser
+
+
+def main(
+    argv: Optional[List[str]] = None,
+    engine: Engine = default_engine,
+    read_engine: Engine = default_read_engine
+) -> int:
+    args = build_parser().parse_args(argv)
+    try:
+        if args.command == "import":
+            run_import(args, engine)
+        else:
+            run_export(args, read_engine)
+    except (OSError, ValueError) as e:
+        logger.error(str(e))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
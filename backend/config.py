@@ -12,16 +12,132 @@ class Settings:
         "DATABASE_URL", 
         "sqlite:///database/local/database.sqlite"
     )
+    # auto: create missing tables and seed empty ones, reset: drop and
+    # recreate everything on startup, skip: leave the database untouched
+    DB_BOOTSTRAP_MODE: str = os.getenv("DB_BOOTSTRAP_MODE", "auto")
+    BOOTSTRAP_LOCK_FILE: str = os.getenv(
+        "BOOTSTRAP_LOCK_FILE",
+        "database/local/bootstrap.lock"
+    )
+    # Where route handlers run their queries: sync (on the event loop),
+    # async (asyncio driver, aiosqlite / asyncpg) or threadpool.
+    # ASYNC_DATABASE_URL defaults to DATABASE_URL with the driver swapped
+    DB_EXECUTION_MODE: str = os.getenv("DB_EXECUTION_MODE", "sync").lower()
+    ASYNC_DATABASE_URL: str = os.getenv("ASYNC_DATABASE_URL", "")
+    # threadpool mode: threads (0 = the connection pool size, never more)
+    # and calls allowed to wait for a thread before answering 503
+    DB_THREADPOOL_WORKERS: int = int(os.getenv("DB_THREADPOOL_WORKERS", "0"))
+    DB_THREADPOOL_QUEUE_LIMIT: int = int(os.getenv("DB_THREADPOOL_QUEUE_LIMIT", "64"))
+    # Read replicas (comma separated URLs, empty for none): reads are spread
+    # over the healthy ones, a client's reads stay on the primary for
+    # READ_YOUR_WRITES_SECONDS after it writes
+    DATABASE_REPLICA_URLS: list = [
+        url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()
+    ]
+    REPLICA_HEALTH_CHECK_SECONDS: float = float(os.getenv("REPLICA_HEALTH_CHECK_SECONDS", "10"))
+    READ_YOUR_WRITES_SECONDS: float = float(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))
+    # SQLite connection profile (see database/profile.py): pragmas applied
+    # to every connection and the size of the read-only connection pool
+    SQLITE_JOURNAL_MODE: str = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+    SQLITE_SYNCHRONOUS: str = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+    SQLITE_CACHE_SIZE: int = int(os.getenv("SQLITE_CACHE_SIZE", "-65536"))  # negative: KiB
+    SQLITE_MMAP_SIZE: int = int(os.getenv("SQLITE_MMAP_SIZE", "268435456"))
+    SQLITE_BUSY_TIMEOUT_MS: int = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+    SQLITE_READ_POOL_SIZE: int = int(os.getenv("SQLITE_READ_POOL_SIZE", "8"))
+    # Rows per executemany when loading the seed CSV files
+    SEED_BATCH_SIZE: int = int(os.getenv("SEED_BATCH_SIZE", "5000"))
     
     # Server
     HOST: str = os.getenv("HOST", "0.0.0.0")
     PORT: int = int(os.getenv("PORT", "8000"))
     DEBUG: bool = os.getenv("DEBUG", "False").lower() == "true"
     
+    # Encode listing/detail responses straight from dicts (orjson when
+    # installed) instead of validating them against the response models
+    LEAN_SERIALIZATION: bool = os.getenv("LEAN_SERIALIZATION", "True").lower() == "true"
+
+    # Response compression: bodies below the minimum size (bytes) are sent
+    # as they are; brotli is offered when the brotli package is installed
+    COMPRESSION_ENABLED: bool = os.getenv("COMPRESSION_ENABLED", "True").lower() == "true"
+    COMPRESSION_MINIMUM_SIZE: int = int(os.getenv("COMPRESSION_MINIMUM_SIZE", "1024"))
+    GZIP_LEVEL: int = int(os.getenv("GZIP_LEVEL", "6"))
+    BROTLI_QUALITY: int = int(os.getenv("BROTLI_QUALITY", "4"))
+
+    # Cache-Control of successful GET responses, by longest matching path
+    # prefix: "prefix=header value" rules separated by ";"
+    CACHE_CONTROL_POLICIES: dict = dict(
+        rule.strip().split("=", 1) for rule in os.getenv(
+            "CACHE_CONTROL_POLICIES",
+            "/movies=no-cache;"
+            "/movies/suggest=public, max-age=60, stale-while-revalidate=600;"
+            "/movies/export=no-store;"
+            "/genres=public, max-age=30, stale-while-revalidate=300;"
+            "/ratings=public, max-age=30, stale-while-revalidate=300"
+        ).split(";") if rule.strip()
+    )
+
+    # Request metrics at GET /metrics: latency histogram buckets (seconds),
+    # and the SQL statements per request above which a warning is logged
+    # (0 to never warn)
+    METRICS_ENABLED: bool = os.getenv("METRICS_ENABLED", "True").lower() == "true"
+    METRICS_LATENCY_BUCKETS: list = [
+        float(value) for value in os.getenv(
+            "METRICS_LATENCY_BUCKETS", "0.005,0.01,0.025,0.05,0.1,0.25,0.5,1,2.5,5,10"
+        ).split(",")
+    ]
+    SQL_STATEMENT_WARN_THRESHOLD: int = int(os.getenv("SQL_STATEMENT_WARN_THRESHOLD", "50"))
+
     # Pagination (static configuration)
     DEFAULT_PAGE_SIZE: int = 50
     MAX_PAGE_SIZE: int = 100
 
+    # Most items accepted by one batch write request
+    BATCH_MAX_ITEMS: int = int(os.getenv("BATCH_MAX_ITEMS", "5000"))
+    # Most IDs accepted by one movie lookup request
+    LOOKUP_MAX_IDS: int = int(os.getenv("LOOKUP_MAX_IDS", "500"))
+    # Rows fetched per round trip by GET /movies/export
+    EXPORT_CHUNK_SIZE: int = int(os.getenv("EXPORT_CHUNK_SIZE", "1000"))
+
+    # Listing totals: seconds an exact count stays cached (dropped on any
+    # write), seconds an estimated count may be reused, and cache size
+    COUNT_CACHE_TTL: float = float(os.getenv("COUNT_CACHE_TTL", "60"))
+    COUNT_ESTIMATE_TTL: float = float(os.getenv("COUNT_ESTIMATE_TTL", "600"))
+    COUNT_CACHE_MAX_ENTRIES: int = int(os.getenv("COUNT_CACHE_MAX_ENTRIES", "1024"))
+
+    # Answer genre/year/rating listings from in-memory bitmaps instead of SQL
+    FACET_ENGINE_ENABLED: bool = os.getenv("FACET_ENGINE_ENABLED", "False").lower() == "true"
+
+    # Response cache for read endpoints: memory (per worker LRU) or redis
+    # (shared by all workers, needs the redis package)
+    RESPONSE_CACHE_ENABLED: bool = os.getenv("RESPONSE_CACHE_ENABLED", "True").lower() == "true"
+    RESPONSE_CACHE_BACKEND: str = os.getenv("RESPONSE_CACHE_BACKEND", "memory").lower()
+    RESPONSE_CACHE_TTL: float = float(os.getenv("RESPONSE_CACHE_TTL", "30"))
+    RESPONSE_CACHE_MAX_ENTRIES: int = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "2048"))
+    REDIS_URL: str = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+    # Seconds between reads of the catalog version, which tell the in-memory
+    # indexes and counters about writes made by other workers or imports
+    # (0 = never, they then only see this worker's writes)
+    CATALOG_VERSION_POLL_SECONDS: float = float(os.getenv("CATALOG_VERSION_POLL_SECONDS", "2"))
+
+    # Seconds before the in-memory rating statistics are recomputed from the
+    # ratings table (API writes update them immediately)
+    RATING_STATS_RECONCILE_SECONDS: float = float(os.getenv("RATING_STATS_RECONCILE_SECONDS", "300"))
+
+    # Top-rated leaderboards: min_votes thresholds that get their own ranked
+    # list, the entries kept per list, the prior vote weight (m) of the
+    # Bayesian weighted rating and how often the lists are rebuilt to refresh
+    # the mean rating
+    LEADERBOARD_VOTE_BUCKETS: list = [
+        int(value) for value in os.getenv("LEADERBOARD_VOTE_BUCKETS", "1,10,50,100,500,1000,5000,10000").split(",")
+    ]
+    LEADERBOARD_LIST_SIZE: int = int(os.getenv("LEADERBOARD_LIST_SIZE", "1000"))
+    LEADERBOARD_PRIOR_VOTES: int = int(os.getenv("LEADERBOARD_PRIOR_VOTES", "1000"))
+    LEADERBOARD_REFRESH_SECONDS: float = float(os.getenv("LEADERBOARD_REFRESH_SECONDS", "3600"))
+
+    # Seconds before the in-memory genre counts are recounted from the table
+    GENRE_COUNTS_RECONCILE_SECONDS: float = float(os.getenv("GENRE_COUNTS_RECONCILE_SECONDS", "300"))
+
 
 # Global settings instance
 settings = Settings()
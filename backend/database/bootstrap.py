@@ -0,0 +1,228 @@
+"""
+Database bootstrap for the Movies API
+
+Creates missing tables, applies schema migrations and seeds the CSV datasets
+only when a table is empty or its seed file changed. On an already
+bootstrapped database startup is a handful of metadata lookups, whatever the
+size of the seed files.
+"""
+import contextlib
+import hashlib
+import os
+from typing import Callable, Dict, Optional
+from sqlalchemy import Column, String, Table, inspect, select, text
+from sqlalchemy.engine import Connection, Engine
+from config import settings
+from database.db import Base
+from database.seed import SEED_DATASETS, SeedDataset, load_dataset, sqlite_load_window
+from services.search import ensure_search_index
+from services.versions import ensure_version_triggers
+from utils.logging import logger
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock, bootstrap runs unguarded
+    fcntl = None
+
+# Bump when the table definitions change and register a migration below
+SCHEMA_VERSION = 3
+
+
+def _migrate_genre_catalog(connection: Connection) -> None:
+    """v2: move genre names out of the per-movie rows into genre_catalog"""
+    if not inspect(connection).has_table("genres"):
+        return
+    # One catalog row per case-insensitive name, keeping one of its spellings
+    connection.execute(text(
+        "INSERT INTO genre_catalog (name) "
+        "SELECT MIN(TRIM(genre)) FROM genres "
+        "WHERE TRIM(genre) <> '' AND LOWER(TRIM(genre)) NOT IN (SELECT LOWER(name) FROM genre_catalog) "
+        "GROUP BY LOWER(TRIM(genre))"
+    ))
+    connection.execute(text(
+        "INSERT INTO movie_genres (movie_id, genre_id) "
+        "SELECT DISTINCT g.movie_id, c.id FROM genres g "
+        "JOIN genre_catalog c ON LOWER(c.name) = LOWER(TRIM(g.genre))"
+    ))
+    connection.execute(text("DROP TABLE genres"))
+
+
+def _migrate_versions(connection: Connection) -> None:
+    """v3: version and updated_at columns for conditional requests"""
+    # ADD COLUMN can't default to CURRENT_TIMESTAMP: fill existing rows after
+    columns = {
+        "movies": ["version INTEGER NOT NULL DEFAULT 1", "updated_at DATETIME"],
+        "ratings": ["updated_at DATETIME"],
+        "movie_genres": ["updated_at DATETIME"],
+    }
+    for table_name, definitions in columns.items():
+        existing = {column["name"] for column in inspect(connection).get_columns(table_name)}
+        for definition in definitions:
+            if definition.split()[0] not in existing:
+                connection.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {definition}"))
+        connection.execute(text(f"UPDATE {table_name} SET updated_at = CURRENT_TIMESTAMP WHERE updated_at IS NULL"))
+
+
+# Migrations keyed by the version they upgrade to
+MIGRATIONS: Dict[int, Callable[[Connection], None]] = {
+    2: _migrate_genre_catalog,
+    3: _migrate_versions,
+}
+
+schema_meta = Table(
+    "schema_meta",
+    Base.metadata,
+    Column("key", String(100), primary_key=True),
+    Column("value", String(255), nullable=False),
+)
+
+
+def get_meta(connection: Connection, key: str) -> Optional[str]:
+    """Read a value from the schema_meta table"""
+    return connection.execute(
+        select(schema_meta.c.value).where(schema_meta.c.key == key)
+    ).scalar()
+
+
+def set_meta(connection: Connection, key: str, value: str) -> None:
+    """Write a value to the schema_meta table"""
+    updated = connection.execute(
+        schema_meta.update().where(schema_meta.c.key == key).values(value=value)
+    )
+    if updated.rowcount == 0:
+        connection.execute(schema_meta.insert().values(key=key, value=value))
+
+
+@contextlib.contextmanager
+def _bootstrap_lock():
+    """Serialize bootstrap across workers started at the same time"""
+    if fcntl is None:
+        yield
+        return
+
+    lock_path = settings.BOOTSTRAP_LOCK_FILE
+    os.makedirs(os.path.dirname(lock_path) or ".", exist_ok=True)
+    with open(lock_path, "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _file_fingerprint(path: str) -> str:
+    """Cheap change detector for a seed file (size and mtime)"""
+    stat = os.stat(path)
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def _file_checksum(path: str) -> str:
+    """SHA-256 of a seed file"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _migrate(connection: Connection) -> None:
+    """Bring the schema version up to SCHEMA_VERSION"""
+    stored = get_meta(connection, "schema_version")
+    if stored is None and inspect(connection).has_table("genres"):
+        # Created before versioning, with the original genres table
+        stored = "1"
+    if stored is None:
+        # Fresh database: create_all already built the current schema
+        set_meta(connection, "schema_version", str(SCHEMA_VERSION))
+        logger.info(f"Database schema initialized at version {SCHEMA_VERSION}")
+        return
+
+    version = int(stored)
+    if version > SCHEMA_VERSION:
+        logger.warning(
+            f"Database schema version {version} is newer than this build ({SCHEMA_VERSION})"
+        )
+        return
+
+    while version < SCHEMA_VERSION:
+        version += 1
+        migration = MIGRATIONS.get(version)
+        if migration is not None:
+            logger.info(f"Migrating database schema to version {version}")
+            migration(connection)
+        set_meta(connection, "schema_version", str(version))
+
+
+def _seed(connection: Connection, dataset: SeedDataset) -> None:
+    """Seed a dataset if its table is empty or its CSV file changed"""
+    csv_path = dataset.csv_path
+    if not os.path.exists(csv_path):
+        logger.warning(f"{dataset.name.capitalize()} CSV file not found: {csv_path}")
+        return
+
+    fingerprint_key = f"seed:{dataset.name}:fingerprint"
+    checksum_key = f"seed:{dataset.name}:checksum"
+
+    is_empty = connection.execute(
+        select(1).select_from(dataset.table).limit(1)
+    ).first() is None
+    fingerprint = _file_fingerprint(csv_path)
+    if not is_empty and get_meta(connection, fingerprint_key) == fingerprint:
+        return
+
+    checksum = _file_checksum(csv_path)
+    stored_checksum = get_meta(connection, checksum_key)
+    if is_empty:
+        load_dataset(connection, dataset)
+    elif stored_checksum is None:
+        # Populated before seed tracking existed: adopt the current data
+        logger.info(f"Recording seed checksum for existing {dataset.name} data")
+    elif stored_checksum != checksum:
+        logger.info(f"Seed file for {dataset.name} changed, reseeding")
+        load_dataset(connection, dataset, upsert=True)
+
+    set_meta(connection, checksum_key, checksum)
+    set_meta(connection, fingerprint_key, fingerprint)
+
+
+def bootstrap_database(engine: Engine, mode: Optional[str] = None, seed: bool = True) -> None:
+    """
+    Prepare the database for serving requests
+
+    Args:
+        engine: Engine to bootstrap
+        mode: "auto" (create missing tables, seed when needed), "reset" (drop
+            and recreate everything) or "skip". Defaults to
+            settings.DB_BOOTSTRAP_MODE.
+        seed: Load the seed CSV files; False only prepares the schema, the
+            search index and the version triggers (dataset imports)
+    """
+    mode = (mode or settings.DB_BOOTSTRAP_MODE).lower()
+    if mode == "skip":
+        logger.info("Database bootstrap skipped")
+        return
+    if mode not in ("auto", "reset"):
+        raise ValueError(f"Unknown database bootstrap mode: {mode}")
+
+    with _bootstrap_lock():
+        if mode == "reset":
+            logger.warning("Dropping all database tables")
+            Base.metadata.drop_all(bind=engine)
+
+        # checkfirst: only tables that don't exist yet are created
+        Base.metadata.create_all(bind=engine)
+
+        with engine.connect() as connection, sqlite_load_window(connection):
+            with connection.begin():
+                _migrate(connection)
+                for dataset in SEED_DATASETS if seed else ():
+                    _seed(connection, dataset)
+                # After seeding, so a fresh database is indexed in one pass
+                # instead of through the triggers row by row
+                indexed = get_meta(connection, "search_index") == "built"
+                if ensure_search_index(connection, rebuild=not indexed):
+                    set_meta(connection, "search_index", "built")
+                # Also after seeding, for the same reason
+                ensure_version_triggers(connection)
+
+    logger.info("Database bootstrap completed")
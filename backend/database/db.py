@@ -2,17 +2,37 @@ from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from config import settings
+from database.profile import apply_sqlite_profile, is_sqlite_file, pool_options
+from utils.metrics import instrument_engine
 from utils.logging import logger
 
-# Create engine with configuration
+# Create engine with configuration. On SQLite this is the single writer
+# connection; reads go through read_engine (see database/profile.py)
 engine = create_engine(
     settings.DATABASE_URL, 
     echo=settings.DEBUG,
     pool_pre_ping=True,  # Verify connections before use
-    pool_recycle=3600    # Recycle connections every hour
+    pool_recycle=3600,   # Recycle connections every hour
+    **pool_options(settings.DATABASE_URL)
 )
+apply_sqlite_profile(engine)
+instrument_engine(engine, "writer")
+
+if is_sqlite_file(settings.DATABASE_URL):
+    read_engine = create_engine(
+        settings.DATABASE_URL,
+        echo=settings.DEBUG,
+        pool_pre_ping=True,
+        pool_recycle=3600,
+        **pool_options(settings.DATABASE_URL, read_only=True)
+    )
+    apply_sqlite_profile(read_engine, read_only=True)
+    instrument_engine(read_engine, "reader")
+else:
+    read_engine = engine
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
 
 Base = declarative_base()
 
@@ -0,0 +1,78 @@
+"""
+SQLite connection profile
+
+Every connection SQLAlchemy opens to a SQLite file gets the pragmas below:
+WAL journaling (readers no longer wait for writers and vice versa),
+synchronous=NORMAL (safe with WAL, fsync only at checkpoints), a larger page
+cache, memory-mapped reads, in-memory temp tables and a busy timeout so a
+locked database is retried instead of failing at once.
+
+SQLite allows a single writer at a time, so writes go through an engine with
+one pooled connection and queue for it in-process rather than contending for
+the file lock. Its transactions start with BEGIN IMMEDIATE, taking the file
+lock up front: a transaction never fails halfway when another process wrote
+first, and what it reads before writing (e.g. the catalog version, see
+services/versions.py) can't change under it. Reads use a separate engine whose connections are opened with
+``query_only`` and can run in parallel. Other databases, and in-memory SQLite
+(which can't be shared between engines), use one engine for both.
+"""
+from typing import Any, Dict, List, Union
+from sqlalchemy import event
+from sqlalchemy.engine import Engine, URL, make_url
+from config import settings
+
+
+def is_sqlite_file(url: Union[str, URL]) -> bool:
+    """Whether the URL points to a SQLite database file"""
+    parsed = make_url(url)
+    return parsed.get_backend_name() == "sqlite" and parsed.database not in (None, "", ":memory:")
+
+
+def sqlite_pragmas(read_only: bool = False) -> List[str]:
+    """PRAGMA statements run on each new connection"""
+    pragmas = [
+        f"PRAGMA busy_timeout={settings.SQLITE_BUSY_TIMEOUT_MS}",
+        f"PRAGMA cache_size={settings.SQLITE_CACHE_SIZE}",
+        f"PRAGMA mmap_size={settings.SQLITE_MMAP_SIZE}",
+        "PRAGMA temp_store=MEMORY",
+    ]
+    if read_only:
+        pragmas.append("PRAGMA query_only=ON")
+    else:
+        # The journal mode is stored in the file; switching needs a writer
+        pragmas.insert(0, f"PRAGMA journal_mode={settings.SQLITE_JOURNAL_MODE}")
+        pragmas.insert(1, f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}")
+    return pragmas
+
+
+def pool_options(url: Union[str, URL], read_only: bool = False) -> Dict[str, Any]:
+    """create_engine pool arguments for the writer or reader engine"""
+    if not is_sqlite_file(url):
+        return {}
+    if read_only:
+        return {"pool_size": settings.SQLITE_READ_POOL_SIZE, "max_overflow": 0}
+    return {"pool_size": 1, "max_overflow": 0}
+
+
+def apply_sqlite_profile(engine: Engine, read_only: bool = False) -> None:
+    """Run the profile pragmas on every connection the engine opens"""
+    if not is_sqlite_file(engine.url):
+        return
+    pragmas = sqlite_pragmas(read_only)
+
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+        if not read_only:
+            # Transactions are begun by begin_immediate below, not the driver
+            dbapi_connection.isolation_level = None
+
+    if not read_only:
+        @event.listens_for(engine, "begin")
+        def begin_immediate(connection):
+            connection.exec_driver_sql("BEGIN IMMEDIATE")
@@ -0,0 +1,164 @@
+"""
+Read replica routing
+
+With DATABASE_REPLICA_URLS set, the database runner sends reads
+(``runner.run``) to the replicas in turn and keeps writes (``runner.write``)
+on the primary. A background thread pings every replica each
+REPLICA_HEALTH_CHECK_SECONDS; a replica that fails a ping, or a query with a
+connection error, is skipped until a later ping succeeds, and the failed read
+is retried on the primary. With no healthy replica reads use the primary.
+
+Read-your-writes: a successful non-GET request sets a cookie that sends the
+client's reads to the primary for READ_YOUR_WRITES_SECONDS, so it doesn't read
+a replica that hasn't caught up with its own write yet. Clients that need
+current data can also send ``X-Read-Consistency: primary``.
+"""
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional, Sequence
+from fastapi import Request, Response
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session, sessionmaker
+from config import settings
+from database.profile import apply_sqlite_profile, pool_options
+from utils.logging import logger
+from utils.metrics import instrument_engine
+
+PRIMARY_COOKIE = "db_primary_until"
+CONSISTENCY_HEADER = "x-read-consistency"
+
+# Set for the duration of a request whose reads must see the primary
+_prefer_primary: ContextVar[bool] = ContextVar("prefer_primary", default=False)
+
+
+class Replica:
+    """One replica engine and its health"""
+
+    def __init__(self, url: str):
+        self.name = make_url(url).render_as_string(hide_password=True)
+        self.engine = create_engine(
+            url,
+            echo=settings.DEBUG,
+            pool_pre_ping=True,
+            pool_recycle=3600,
+            **pool_options(url, read_only=True)
+        )
+        apply_sqlite_profile(self.engine, read_only=True)
+        instrument_engine(self.engine, self.name)
+        self.session_factory = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+        self.healthy = True
+        self.failures = 0
+        self.last_error: Optional[str] = None
+
+    def ping(self) -> bool:
+        """Run a trivial query; updates and returns the health flag"""
+        try:
+            with self.engine.connect() as connection:
+                connection.execute(text("SELECT 1"))
+        except Exception as e:
+            self.mark_down(e)
+            return False
+        if not self.healthy:
+            logger.info(f"Replica {self.name} is back")
+        self.healthy = True
+        return True
+
+    def mark_down(self, error: Exception) -> None:
+        if self.healthy:
+            logger.warning(f"Replica {self.name} marked down: {error}")
+        self.healthy = False
+        self.failures += 1
+        self.last_error = str(error)
+
+
+class ReplicaRouter:
+    """Round-robin over the healthy replicas"""
+
+    def __init__(self, urls: Sequence[str], check_interval: float):
+        self.replicas: List[Replica] = [Replica(url) for url in urls]
+        self.check_interval = check_interval
+        self._next = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __bool__(self) -> bool:
+        return bool(self.replicas)
+
+    def choose(self) -> Optional[Replica]:
+        """Next healthy replica, None when there is none"""
+        with self._lock:
+            for _ in range(len(self.replicas)):
+                replica = self.replicas[self._next % len(self.replicas)]
+                self._next += 1
+                if replica.healthy:
+                    return replica
+        return None
+
+    def check_all(self) -> None:
+        for replica in self.replicas:
+            replica.ping()
+
+    def _check_loop(self) -> None:
+        while not self._stop.wait(self.check_interval):
+            self.check_all()
+
+    def start_health_checks(self) -> threading.Thread:
+        """Ping the replicas in the background until stop() is called"""
+        self.check_all()
+        self._thread = threading.Thread(target=self._check_loop, name="replica-health", daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def stop(self) -> None:
+        self._stop.set()
+        for replica in self.replicas:
+            replica.engine.dispose()
+
+    def stats(self) -> List[Dict[str, Any]]:
+        return [
+            {
+                "replica": replica.name,
+                "healthy": replica.healthy,
+                "failures": replica.failures,
+                "last_error": replica.last_error
+            }
+            for replica in self.replicas
+        ]
+
+
+replica_router = ReplicaRouter(settings.DATABASE_REPLICA_URLS, settings.REPLICA_HEALTH_CHECK_SECONDS)
+
+
+def prefer_primary() -> bool:
+    """Whether the current request's reads must go to the primary"""
+    return _prefer_primary.get()
+
+
+async def read_your_writes(request: Request, call_next: Callable) -> Response:
+    """HTTP middleware pinning a client's reads to the primary after it writes"""
+    if not replica_router:
+        return await call_next(request)
+
+    try:
+        primary_until = float(request.cookies.get(PRIMARY_COOKIE, 0))
+    except ValueError:
+        primary_until = 0
+    token = _prefer_primary.set(
+        primary_until > time.time()
+        or request.headers.get(CONSISTENCY_HEADER, "").lower() == "primary"
+    )
+    try:
+        response = await call_next(request)
+    finally:
+        _prefer_primary.reset(token)
+
+    if request.method not in ("GET", "HEAD", "OPTIONS") and response.status_code < 400:
+        seconds = settings.READ_YOUR_WRITES_SECONDS
+        response.set_cookie(
+            PRIMARY_COOKIE, str(int(time.time() + seconds) + 1),
+            max_age=int(seconds) + 1, httponly=True, samesite="lax"
+        )
+    return response
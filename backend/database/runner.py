@@ -0,0 +1,331 @@
+"""
+Where the route handlers' database work runs
+
+Handlers are ``async def`` but their queries are written against a
+synchronous Session, in plain functions taking the session as first argument.
+Handlers pass those functions to the DatabaseRunner from ``get_db_runner``,
+which runs them according to DB_EXECUTION_MODE:
+
+- ``sync``: directly on the event loop with a regular Session. Every query
+  blocks the loop, so a worker serves one request at a time.
+- ``async``: inside ``AsyncSession.run_sync`` on an asyncio driver (aiosqlite
+  for SQLite, asyncpg for PostgreSQL). The same code runs unchanged, but while
+  a query waits on the database the loop keeps serving other requests.
+- ``threadpool``: in a thread pool no larger than the read connection pool,
+  so every running read holds a connection without waiting for one.
+  Calls beyond the pool size queue up to DB_THREADPOOL_QUEUE_LIMIT; past that
+  the request is refused with 503 instead of piling up. Time spent queued and
+  time spent running are measured separately (``stats()``).
+
+``run`` is for reads and uses the read engine, or a replica (see
+database/replicas.py); handlers that change data use ``write``, which goes
+through the writer engine (see database/profile.py).
+Work functions must return plain data or Pydantic models, never ORM objects:
+the session is closed by the time the response is serialized.
+"""
+import asyncio
+import contextvars
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, TypeVar
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.exc import DBAPIError, OperationalError
+from sqlalchemy.orm import Session
+from config import settings
+from database.db import ReadSessionLocal, SessionLocal, read_engine
+from database.profile import apply_sqlite_profile, pool_options
+from database.replicas import ReplicaRouter, prefer_primary, replica_router
+from utils.exceptions import DatabaseBusyError
+from utils.logging import logger
+from utils.metrics import MetricFamily, collector, instrument_engine
+
+T = TypeVar("T")
+
+# Sync driver -> asyncio driver used in async mode
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "sqlite+pysqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+}
+
+
+def async_database_url(url: str) -> str:
+    """DATABASE_URL with its driver swapped for the asyncio one"""
+    parsed = make_url(url)
+    driver = ASYNC_DRIVERS.get(parsed.drivername)
+    if driver is None:
+        if parsed.drivername.split("+")[-1] in ("aiosqlite", "asyncpg"):
+            return url
+        raise ValueError(f"No asyncio driver known for {parsed.drivername}, set ASYNC_DATABASE_URL")
+    return parsed.set(drivername=driver).render_as_string(hide_password=False)
+
+
+class DatabaseRunner:
+    """Runs database work with a sync Session on the calling thread"""
+
+    mode = "sync"
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        read_session_factory: Callable[[], Session] = ReadSessionLocal,
+        replicas: Optional[ReplicaRouter] = None
+    ):
+        self.session_factory = session_factory
+        self.read_session_factory = read_session_factory
+        self.replicas = replicas
+
+    def call(self, session_factory: Callable[[], Session], work: Callable[..., T], args: tuple, kwargs: dict) -> T:
+        """Run work(session, *args, **kwargs) in a new session, blocking"""
+        db = session_factory()
+        try:
+            return work(db, *args, **kwargs)
+        except Exception as e:
+            logger.error(f"Database session error: {str(e)}")
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    async def _execute(self, session_factory, work: Callable[..., T], args: tuple, kwargs: dict) -> T:
+        return self.call(session_factory, work, args, kwargs)
+
+    async def run(self, work: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Call work(session, *args, **kwargs) in a read session and return its result"""
+        replica = self.replicas.choose() if self.replicas and not prefer_primary() else None
+        if replica is None:
+            return await self._execute(self.read_session_factory, work, args, kwargs)
+        try:
+            return await self._execute(replica.session_factory, work, args, kwargs)
+        except DBAPIError as e:
+            if not (e.connection_invalidated or isinstance(e, OperationalError)):
+                raise
+            # Reads are safe to repeat: take the replica out and use the primary
+            replica.mark_down(e)
+            return await self._execute(self.read_session_factory, work, args, kwargs)
+
+    async def write(self, work: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Same as run, in a session on the writer connection"""
+        return await self._execute(self.session_factory, work, args, kwargs)
+
+    def read_session(self) -> Session:
+        """New sync read session for work outliving a run call, e.g. a streamed response"""
+        replica = self.replicas.choose() if self.replicas and not prefer_primary() else None
+        return (replica.session_factory if replica else self.read_session_factory)()
+
+    def stats(self) -> Dict[str, Any]:
+        stats: Dict[str, Any] = {"mode": self.mode}
+        if self.replicas:
+            stats["replicas"] = self.replicas.stats()
+        return stats
+
+    def metrics(self) -> List[MetricFamily]:
+        """Runner gauges and counters for GET /metrics"""
+        return []
+
+    async def close(self) -> None:
+        pass
+
+
+class AsyncDatabaseRunner(DatabaseRunner):
+    """Runs database work through AsyncSession.run_sync on an asyncio driver"""
+
+    mode = "async"
+
+    def __init__(self, url: str):
+        # Imported here: the asyncio extension pulls in greenlet, only
+        # needed in this mode
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+        from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+        self.engines = []
+        factories = []
+        for read_only in (False, True):
+            options = pool_options(url, read_only=read_only)
+            if options:
+                # aiosqlite doesn't pool file connections by default
+                options["poolclass"] = AsyncAdaptedQueuePool
+            async_engine = create_async_engine(
+                url,
+                echo=settings.DEBUG,
+                pool_pre_ping=True,
+                pool_recycle=3600,
+                **options
+            )
+            apply_sqlite_profile(async_engine.sync_engine, read_only=read_only)
+            instrument_engine(async_engine.sync_engine, "async-reader" if read_only else "async-writer")
+            self.engines.append(async_engine)
+            factories.append(async_sessionmaker(async_engine, autoflush=False, expire_on_commit=True))
+        super().__init__(*factories)
+
+    async def _execute(self, session_factory, work: Callable[..., T], args: tuple, kwargs: dict) -> T:
+        async with session_factory() as session:
+            try:
+                return await session.run_sync(work, *args, **kwargs)
+            except Exception as e:
+                logger.error(f"Database session error: {str(e)}")
+                await session.rollback()
+                raise
+
+    def read_session(self) -> Session:
+        # Streams iterate in a worker thread, which needs the sync engine
+        return ReadSessionLocal()
+
+    async def close(self) -> None:
+        for async_engine in self.engines:
+            await async_engine.dispose()
+
+
+class _Timing:
+    """Count, total and maximum of a duration"""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "avg_ms": round(self.total / self.count * 1000, 3) if self.count else 0.0,
+            "max_ms": round(self.max * 1000, 3)
+        }
+
+
+class ThreadPoolDatabaseRunner(DatabaseRunner):
+    """Runs database work in a bounded thread pool with a bounded queue"""
+
+    mode = "threadpool"
+
+    def __init__(self, workers: int, queue_limit: int, replicas: Optional[ReplicaRouter] = None):
+        super().__init__(replicas=replicas)
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="db-runner")
+        self._in_flight = 0
+        self._running = 0
+        self._rejected = 0
+        self._errors = 0
+        self._wait = _Timing()
+        self._execution = _Timing()
+        self._lock = threading.Lock()
+
+    def _admit(self) -> None:
+        with self._lock:
+            if self._in_flight >= self.workers + self.queue_limit:
+                self._rejected += 1
+                raise DatabaseBusyError()
+            self._in_flight += 1
+
+    def _release(self, future: Future) -> None:
+        # Also called for calls cancelled before they started
+        with self._lock:
+            self._in_flight -= 1
+
+    def _timed_call(self, submitted: float, session_factory, work: Callable[..., T], args: tuple, kwargs: dict) -> T:
+        started = time.perf_counter()
+        with self._lock:
+            self._wait.add(started - submitted)
+            self._running += 1
+        failed = False
+        try:
+            return self.call(session_factory, work, args, kwargs)
+        except Exception:
+            failed = True
+            raise
+        finally:
+            with self._lock:
+                self._execution.add(time.perf_counter() - started)
+                self._running -= 1
+                if failed:
+                    self._errors += 1
+
+    async def _execute(self, session_factory, work: Callable[..., T], args: tuple, kwargs: dict) -> T:
+        self._admit()
+        # In the request's context, so its SQL statements count towards it
+        future = self.executor.submit(
+            contextvars.copy_context().run,
+            self._timed_call, time.perf_counter(), session_factory, work, args, kwargs
+        )
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue occupancy and wait vs. execution times since startup"""
+        with self._lock:
+            return {
+                **super().stats(),
+                "workers": self.workers,
+                "queue_limit": self.queue_limit,
+                "running": self._running,
+                "queued": self._in_flight - self._running,
+                "rejected": self._rejected,
+                "errors": self._errors,
+                "wait": self._wait.as_dict(),
+                "execution": self._execution.as_dict()
+            }
+
+    def metrics(self) -> List[MetricFamily]:
+        with self._lock:
+            return [
+                ("db_runner_running", "gauge", "Database calls running", [({}, self._running)]),
+                ("db_runner_queued", "gauge", "Database calls waiting for a thread",
+                 [({}, self._in_flight - self._running)]),
+                ("db_runner_rejected_total", "counter", "Database calls refused with 503", [({}, self._rejected)]),
+                ("db_runner_wait_seconds_total", "counter", "Time database calls spent queued",
+                 [({}, self._wait.total)]),
+                ("db_runner_execution_seconds_total", "counter", "Time database calls spent running",
+                 [({}, self._execution.total)]),
+            ]
+
+    async def close(self) -> None:
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+def pool_size(bind: Engine) -> int:
+    """Persistent connections the engine's pool keeps, 1 for pools without a size"""
+    size = getattr(bind.pool, "size", None)
+    return size() if callable(size) else 1
+
+
+def create_runner(mode: str) -> DatabaseRunner:
+    """Runner for a DB_EXECUTION_MODE value"""
+    mode = mode.lower()
+    if mode == "sync":
+        return DatabaseRunner(replicas=replica_router)
+    if mode == "threadpool":
+        # More threads than pooled connections would only move the queue
+        # into the pool checkout
+        workers = min(settings.DB_THREADPOOL_WORKERS or pool_size(read_engine), pool_size(read_engine))
+        logger.info(f"Database work runs in {workers} threads")
+        return ThreadPoolDatabaseRunner(workers, settings.DB_THREADPOOL_QUEUE_LIMIT, replica_router)
+    if mode == "async":
+        if replica_router:
+            logger.warning("Read replicas are not used in async mode, all queries go to the primary")
+        url = settings.ASYNC_DATABASE_URL or async_database_url(settings.DATABASE_URL)
+        try:
+            runner = AsyncDatabaseRunner(url)
+        except ImportError as e:
+            raise RuntimeError(
+                f"DB_EXECUTION_MODE=async needs an asyncio database driver "
+                f"(pip install aiosqlite / asyncpg): {e}"
+            ) from e
+        logger.info(f"Database work runs on the asyncio driver {make_url(url).drivername}")
+        return runner
+    raise ValueError(f"Unknown database execution mode: {mode}")
+
+
+db_runner = create_runner(settings.DB_EXECUTION_MODE)
+collector(db_runner.metrics)
+
+
+def get_db_runner() -> DatabaseRunner:
+    """Database runner dependency for FastAPI"""
+    return db_runner
@@ -0,0 +1,333 @@
+"""
+Seed datasets for the Movies API
+
+Describes the CSV files shipped in ``database/`` and how each one maps onto
+its table. Loading is driven by ``database.bootstrap``; nothing here runs on
+import.
+"""
+import contextlib
+import csv
+import os
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterator, List, Mapping, Optional, Sequence
+from sqlalchemy import Select, Table, delete, or_, select
+from sqlalchemy.engine import Connection
+from config import settings
+from models import Movie, Genre, GenreCatalog, Rating
+from services.genre_catalog import GenreIdConverter
+from utils.logging import logger
+
+SEED_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def _optional_int(value: str) -> Optional[int]:
+    """Convert an empty CSV cell to None"""
+    return int(value) if value else None
+
+
+@dataclass(frozen=True)
+class SeedDataset:
+    """A CSV seed file and the table it populates"""
+    name: str
+    table: Table
+    csv_file: str
+    # (csv header, table column, converter) in table column order
+    columns: Sequence[tuple]
+    key_columns: Sequence[str] = ("id",)
+    # table column -> factory for a converter that needs the load's
+    # connection (e.g. resolving genre names to catalog IDs)
+    bound_converters: Mapping[str, Callable[[Connection], Callable]] = field(default_factory=dict)
+    # Builds the export query when the file columns aren't plain table columns
+    export_query: Optional[Callable[[], Select]] = None
+
+    @property
+    def csv_path(self) -> str:
+        return os.path.join(SEED_DIR, self.csv_file)
+
+    @property
+    def column_names(self) -> List[str]:
+        return [column for _, column, _ in self.columns]
+
+    def converters(self, connection: Optional[Connection] = None) -> List[Callable]:
+        """Value converters in column order, bound to connection where needed"""
+        converters = []
+        for _, column, converter in self.columns:
+            factory = self.bound_converters.get(column)
+            if factory is not None:
+                if connection is None:
+                    raise ValueError(f"Loading {self.name} needs a database connection")
+                converter = factory(connection)
+            converters.append(converter)
+        return converters
+
+    def select_for_export(self) -> Select:
+        """Query returning the file columns, in file order"""
+        if self.export_query is not None:
+            return self.export_query()
+        table = self.table
+        return select(*[table.c[column] for column in self.column_names]).order_by(
+            *[table.c[key] for key in self.key_columns]
+        )
+
+
+def _genre_export_query() -> Select:
+    return select(Genre.movie_id, GenreCatalog.name).join(
+        GenreCatalog, Genre.genre_id == GenreCatalog.id
+    ).order_by(Genre.movie_id, Genre.genre_id)
+
+
+# Order matters: genres and ratings reference movies
+SEED_DATASETS: List[SeedDataset] = [
+    SeedDataset(
+        name="movies",
+        table=Movie.__table__,
+        csv_file="peliculas_10000.csv",
+        columns=(
+            ("id_pelicula", "id", int),
+            ("titulo", "title", str),
+            ("año", "year", _optional_int),
+            ("duracion", "duration", _optional_int),
+        ),
+    ),
+    SeedDataset(
+        name="genres",
+        table=Genre.__table__,
+        csv_file="generos_10000.csv",
+        # The file's own id column is ignored: a movie/genre pair is the key
+        columns=(
+            ("id_pelicula", "movie_id", int),
+            ("genero", "genre_id", str),
+        ),
+        key_columns=("movie_id", "genre_id"),
+        bound_converters={"genre_id": GenreIdConverter},
+        export_query=_genre_export_query,
+    ),
+    SeedDataset(
+        name="ratings",
+        table=Rating.__table__,
+        csv_file="rating_10000.csv",
+        columns=(
+            ("id", "id", int),
+            ("id_pelicula", "movie_id", int),
+            ("rating", "rating", float),
+            ("nro_votos", "vote_count", int),
+        ),
+    ),
+]
+
+
+def upsert_rows(
+    connection: Connection,
+    table: Table,
+    rows: List[Dict[str, object]],
+    key_columns: Sequence[str] = ("id",)
+) -> None:
+    """Insert rows, replacing any existing row with the same key
+
+    Existing rows whose columns all hold the written values are left alone, so
+    re-importing unchanged data doesn't fire the version triggers.
+    """
+    if not rows:
+        return
+
+    dialect = connection.dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+
+        stmt = insert(table)
+        # Only the columns being written: the others (versions, timestamps)
+        # are maintained by the database
+        update_columns = {
+            column.name: stmt.excluded[column.name]
+            for column in table.columns
+            if column.name not in key_columns and column.name in rows[0]
+        }
+        if update_columns:
+            stmt = stmt.on_conflict_do_update(
+                index_elements=list(key_columns),
+                set_=update_columns,
+                where=or_(*[
+                    table.c[name].is_distinct_from(excluded)
+                    for name, excluded in update_columns.items()
+                ])
+            )
+        else:
+            # Link tables: the key is the whole row
+            stmt = stmt.on_conflict_do_nothing(index_elements=list(key_columns))
+        connection.execute(stmt, rows)
+        return
+
+    # Portable fallback: delete the keys being written, then insert them again
+    if len(key_columns) == 1:
+        key = key_columns[0]
+        connection.execute(
+            delete(table).where(table.c[key].in_([row[key] for row in rows]))
+        )
+    else:
+        for row in rows:
+            connection.execute(
+                delete(table).where(*[table.c[key] == row[key] for key in key_columns])
+            )
+    connection.execute(table.insert(), rows)
+
+
+@contextlib.contextmanager
+def sqlite_load_window(connection: Connection):
+    """
+    Relax SQLite durability while bulk loading
+
+    Sets synchronous=OFF and journal_mode=MEMORY for the duration of the block
+    and restores the previous values afterwards. Must be entered outside of a
+    transaction; does nothing on other databases or when the database is in
+    WAL mode (switching out of WAL needs exclusive access).
+    """
+    if connection.dialect.name != "sqlite":
+        yield
+        return
+
+    # Straight through the driver: a SQLAlchemy statement would begin a
+    # transaction (BEGIN IMMEDIATE on the writer), where these can't be set
+    driver_connection = connection.connection.driver_connection
+
+    def pragma(statement: str):
+        return driver_connection.execute(statement).fetchone()
+
+    if pragma("PRAGMA journal_mode")[0] == "wal":
+        # Other connections may be using the database: leave it as it is
+        yield
+        return
+
+    if connection.in_transaction():
+        connection.commit()
+    synchronous = pragma("PRAGMA synchronous")[0]
+    journal_mode = pragma("PRAGMA journal_mode")[0]
+    pragma("PRAGMA synchronous=OFF")
+    pragma("PRAGMA journal_mode=MEMORY")
+    try:
+        yield
+    finally:
+        if connection.in_transaction():
+            connection.rollback()
+        pragma(f"PRAGMA synchronous={synchronous}")
+        pragma(f"PRAGMA journal_mode={journal_mode}")
+
+
+def iter_dataset_chunks(
+    dataset: SeedDataset,
+    csv_path: Optional[str] = None,
+    batch_size: Optional[int] = None,
+    converters: Optional[Sequence[Callable]] = None
+) -> Iterator[List[tuple]]:
+    """
+    Stream a seed CSV file as lists of converted row tuples
+
+    Rows are read with a plain csv.reader and converted positionally, in the
+    column order of dataset.columns. Invalid rows are logged and skipped.
+
+    Args:
+        dataset: Dataset describing the file layout
+        csv_path: File to read (dataset.csv_path by default)
+        batch_size: Rows per chunk (settings.SEED_BATCH_SIZE by default)
+        converters: Value converters (dataset.converters() by default)
+    """
+    csv_path = csv_path or dataset.csv_path
+    batch_size = batch_size or settings.SEED_BATCH_SIZE
+
+    with open(csv_path, 'r', encoding="utf-8", newline="") as file:
+        reader = csv.reader(file)
+        header = next(reader, None)
+        if header is None:
+            return
+        try:
+            positions = [header.index(csv_header) for csv_header, _, _ in dataset.columns]
+        except ValueError as e:
+            raise ValueError(f"Unexpected header in {dataset.name} CSV: {e}") from e
+        converted = list(zip(positions, converters or dataset.converters()))
+
+        chunk = []
+        for line_number, row in enumerate(reader, start=2):
+            try:
+                chunk.append(tuple(converter(row[position]) for position, converter in converted))
+            except (ValueError, IndexError) as e:
+                logger.warning(f"Skipping invalid row {line_number} in {dataset.name} CSV: {e}")
+                continue
+            if len(chunk) >= batch_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+
+def _positional_insert_sql(connection: Connection, table: Table, columns: Sequence[str]) -> Optional[str]:
+    """Driver-level INSERT taking positional parameters, if the driver supports it"""
+    paramstyle = connection.dialect.paramstyle
+    if paramstyle == "qmark":
+        placeholder = "?"
+    elif paramstyle in ("format", "pyformat"):
+        placeholder = "%s"
+    else:
+        return None
+
+    preparer = connection.dialect.identifier_preparer
+    return "INSERT INTO {} ({}) VALUES ({})".format(
+        preparer.format_table(table),
+        ", ".join(preparer.quote(column) for column in columns),
+        ", ".join([placeholder] * len(columns)),
+    )
+
+
+def insert_chunk(connection: Connection, table: Table, columns: Sequence[str], rows: List[tuple]) -> None:
+    """Insert a chunk of row tuples with a single executemany"""
+    sql = _positional_insert_sql(connection, table, columns)
+    if sql is not None:
+        # Fast path: hand the tuples straight to the driver
+        connection.exec_driver_sql(sql, rows)
+    else:
+        connection.execute(table.insert(), [dict(zip(columns, row)) for row in rows])
+
+
+def load_dataset(
+    connection: Connection,
+    dataset: SeedDataset,
+    upsert: bool = False,
+    csv_path: Optional[str] = None,
+    batch_size: Optional[int] = None
+) -> int:
+    """
+    Load a seed dataset from its CSV file in fixed-size chunks
+
+    Each chunk is written with its own executemany, so memory use depends on
+    the batch size rather than on the size of the file.
+
+    Args:
+        connection: Connection to load the rows through
+        dataset: Dataset to load
+        upsert: Replace rows with the same key instead of plain inserts
+        csv_path: File to read (dataset.csv_path by default)
+        batch_size: Rows per chunk (settings.SEED_BATCH_SIZE by default)
+
+    Returns:
+        Number of rows written
+    """
+    csv_path = csv_path or dataset.csv_path
+    logger.info(f"Loading {dataset.name} data from {csv_path}")
+
+    columns = dataset.column_names
+    converters = dataset.converters(connection)
+    total = 0
+    for chunk in iter_dataset_chunks(dataset, csv_path, batch_size, converters):
+        if upsert:
+            upsert_rows(connection, dataset.table, [dict(zip(columns, row)) for row in chunk], dataset.key_columns)
+        else:
+            insert_chunk(connection, dataset.table, columns, chunk)
+        total += len(chunk)
+        logger.debug(f"Loaded {total} {dataset.name} so far")
+
+    if total:
+        logger.info(f"Loaded {total} {dataset.name}")
+    else:
+        logger.warning(f"No valid {dataset.name} data found in CSV")
+    return total
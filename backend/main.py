@@ -1,31 +1,64 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.exc import SQLAlchemyError
 from models import Movie, Genre, Rating  # Importa todos los modelos aquí
 from routes.movie import router as movie_router
 from routes.genre import router as genre_router
 from routes.rating import router as rating_router
-from database.db import Base, engine
+from database.db import engine, ReadSessionLocal, SessionLocal
+from database.replicas import read_your_writes, replica_router
+from database.runner import db_runner
+from database.bootstrap import bootstrap_database
 from config import settings
+from services.cache import response_cache
+from services.facets import start_facet_index
+from services.leaderboard import start_leaderboard
+from services.suggest import start_title_suggestions
+from services.versions import catalog_watcher, track_commit_versions
 from utils.logging import logger
 from utils.exceptions import database_exception_handler, general_exception_handler
+from utils.cache_control import CacheControlMiddleware
+from utils.compression import CompressionMiddleware, compression_stats
+from utils.metrics import MetricsMiddleware, render_metrics
 import uvicorn
 
-# Create database tables
+# Create missing tables and seed data (see DB_BOOTSTRAP_MODE)
 try:
-    Base.metadata.drop_all(bind=engine)
-    Base.metadata.create_all(bind=engine)
-    logger.info("Database tables created successfully")
+    bootstrap_database(engine)
 except Exception as e:
-    logger.error(f"Error creating database tables: {e}")
+    logger.error(f"Error bootstrapping database: {e}")
     raise
 
+# Change events of API writes carry the catalog versions they moved between
+track_commit_versions(SessionLocal)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Build in-memory indexes without holding up startup, release the
+    database runner on shutdown"""
+    catalog_watcher.start(ReadSessionLocal)
+    start_title_suggestions(ReadSessionLocal)
+    start_leaderboard(ReadSessionLocal)
+    if settings.FACET_ENGINE_ENABLED:
+        start_facet_index(ReadSessionLocal)
+    if replica_router:
+        replica_router.start_health_checks()
+    yield
+    catalog_watcher.stop()
+    replica_router.stop()
+    await db_runner.close()
+
+
 app = FastAPI(
     title="Movies API",
     description="REST API for managing movies, genres, and ratings",
     version="2.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan
 )
 
 # Health check endpoint
@@ -40,15 +73,55 @@ async def health_check():
         "version": "2.0.0"
     }
 
+# Response cache statistics, for sizing RESPONSE_CACHE_MAX_ENTRIES / TTL
+@app.get("/cache/stats")
+async def cache_stats():
+    """Hit, miss and eviction counters of the response cache"""
+    return response_cache.stats()
+
+# Database runner queue and timings (see DB_EXECUTION_MODE)
+@app.get("/database/stats")
+async def database_stats():
+    """Queued/running calls, wait vs. execution times and replica health"""
+    return db_runner.stats()
+
+# Bytes saved and CPU spent by response compression, per encoding
+@app.get("/compression/stats")
+async def compression_statistics():
+    """Bytes in/out, ratio and CPU time of response compression"""
+    return compression_stats.stats()
+
+# Prometheus scrape target: latency and SQL statements per route, pool
+# checkout waits, cache / runner / compression counters
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Request and database metrics in the Prometheus text format"""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 # Add exception handlers
 app.add_exception_handler(SQLAlchemyError, database_exception_handler)
 app.add_exception_handler(Exception, general_exception_handler)
 
+# Read-your-writes pinning for read replicas (DATABASE_REPLICA_URLS)
+app.middleware("http")(read_your_writes)
+
 # Include routers
 app.include_router(movie_router)
 app.include_router(genre_router)
 app.include_router(rating_router)
 
+# Cache-Control by route (CACHE_CONTROL_POLICIES)
+app.add_middleware(CacheControlMiddleware, policies=settings.CACHE_CONTROL_POLICIES)
+
+# gzip / brotli for large responses (COMPRESSION_*)
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+        gzip_level=settings.GZIP_LEVEL,
+        brotli_quality=settings.BROTLI_QUALITY
+    )
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],  # Mejor práctica: lista en vez de string
@@ -57,6 +130,10 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Outermost, so latency covers every other middleware (METRICS_ENABLED)
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
 
 @app.get("/")
 def root():
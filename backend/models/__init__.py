@@ -1,7 +1,7 @@
 # Import all models to make them available when importing from models
 from .movie import Movie
-from .genre import Genre  
+from .genre import Genre, GenreCatalog
 from .rating import Rating
 
 # Make models available at the package level
-__all__ = ['Movie', 'Genre', 'Rating']
+__all__ = ['Movie', 'Genre', 'GenreCatalog', 'Rating']
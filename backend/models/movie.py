@@ -1,10 +1,6 @@
 from database.db import Base
-from sqlalchemy import Column, event, Integer, String, Index
+from sqlalchemy import Column, DateTime, Integer, String, Index, func
 from sqlalchemy.orm import relationship
-from config import settings
-from utils.logging import logger
-import csv
-import os
 
 
 class Movie(Base):
@@ -14,6 +10,10 @@ class Movie(Base):
     title = Column(String(500), nullable=False, index=True)  # Add index for search
     year = Column(Integer, nullable=True, index=True)  # Add index for filtering
     duration = Column(Integer, nullable=True)
+    # Maintained by database triggers (services/versions.py) on every change
+    # to the movie, its genres or its rating
+    version = Column(Integer, nullable=False, server_default="1")
+    updated_at = Column(DateTime, nullable=True, server_default=func.current_timestamp())
     
     # Relationships
     genres = relationship("Genre", back_populates="movie", cascade="all, delete-orphan")
@@ -24,44 +24,3 @@ class Movie(Base):
         Index('idx_movie_title_year', 'title', 'year'),
         Index('idx_movie_year_duration', 'year', 'duration'),
     )
-
-
-# Event to load data from CSV files after creating the tables
-@event.listens_for(Movie.__table__, 'after_create')
-def load_movies_data(target, connection, **kw):
-    """Load movies data from CSV"""
-    csv_path = "database/peliculas_10000.csv"
-    logger.info(f"Loading movies data from {csv_path}")
-    
-    if os.path.exists(csv_path):
-        try:
-            with open(csv_path, 'r', encoding="utf-8") as file:
-                csv_reader = csv.DictReader(file)
-                data = []
-                
-                for row in csv_reader:
-                    try:
-                        # Handle empty values
-                        year_val = None if not row['año'] else int(row['año'])
-                        duration_val = None if not row['duracion'] else int(row['duracion'])
-                        
-                        data.append({
-                            'id': int(row['id_pelicula']),
-                            'title': row['titulo'],
-                            'year': year_val,
-                            'duration': duration_val
-                        })
-                    except (ValueError, KeyError) as e:
-                        logger.warning(f"Skipping invalid row in movies CSV: {e}")
-                        continue
-                
-                if data:
-                    connection.execute(target.insert(), data)
-                    logger.info(f"Loaded {len(data)} movies")
-                else:
-                    logger.warning("No valid movie data found in CSV")
-                    
-        except Exception as e:
-            logger.error(f"Error loading movies data: {e}")
-    else:
-        logger.warning(f"Movies CSV file not found: {csv_path}")
@@ -1,10 +1,6 @@
 from database.db import Base
-from sqlalchemy import Column, event, ForeignKey, Float, Integer, Index
+from sqlalchemy import Column, DateTime, ForeignKey, Float, Integer, Index, func
 from sqlalchemy.orm import relationship
-from config import settings
-from utils.logging import logger
-import csv
-import os
 
 
 class Rating(Base):
@@ -14,6 +10,7 @@ class Rating(Base):
     movie_id = Column(Integer, ForeignKey("movies.id"), nullable=False, unique=True, index=True)
     rating = Column(Float, nullable=False, index=True)  # Add index for filtering
     vote_count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, nullable=True, server_default=func.current_timestamp())
     
     # Relationships
     movie = relationship("Movie", back_populates="rating")
@@ -22,39 +19,3 @@ class Rating(Base):
     __table_args__ = (
         Index('idx_rating_vote_count', 'rating', 'vote_count'),
     )
-
-
-@event.listens_for(Rating.__table__, 'after_create')
-def load_ratings_data(target, connection, **kw):
-    """Load ratings data from CSV"""
-    csv_path = "database/rating_10000.csv"
-    logger.info(f"Loading ratings data from {csv_path}")
-    
-    if os.path.exists(csv_path):
-        try:
-            with open(csv_path, 'r', encoding="utf-8") as file:
-                csv_reader = csv.DictReader(file)
-                data = []
-                
-                for row in csv_reader:
-                    try:
-                        data.append({
-                            'id': int(row['id']),
-                            'movie_id': int(row['id_pelicula']),
-                            'rating': float(row['rating']),
-                            'vote_count': int(row['nro_votos'])
-                        })
-                    except (ValueError, KeyError) as e:
-                        logger.warning(f"Skipping invalid row in ratings CSV: {e}")
-                        continue
-                
-                if data:
-                    connection.execute(target.insert(), data)
-                    logger.info(f"Loaded {len(data)} ratings")
-                else:
-                    logger.warning("No valid rating data found in CSV")
-                    
-        except Exception as e:
-            logger.error(f"Error loading ratings data: {e}")
-    else:
-        logger.warning(f"Ratings CSV file not found: {csv_path}")
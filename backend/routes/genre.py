@@ -1,9 +1,14 @@
-from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response
 from sqlalchemy.orm import Session
-from sqlalchemy import func
 from typing import List, Optional
-from database.db import get_db
+from database.runner import DatabaseRunner, get_db_runner
 from models import Genre, Movie
+from services.cache import cached_response
+from services.genre_catalog import genre_catalog
+from services.genre_counts import genre_counts
+from services.versions import conditional_response
+from utils.etag import compute_etag, etag_matches, not_modified
+from utils.pagination import encode_cursor, resolve_after_id
 
 router = APIRouter(
     prefix="/genres",
@@ -13,50 +18,73 @@ router = APIRouter(
 
 @router.get("/", response_model=List[dict])
 async def get_all_genres(
+    request: Request,
+    response: Response,
     limit: Optional[int] = Query(None, ge=1, description="Limit the number of genres"),
-    db: Session = Depends(get_db)
+    db: DatabaseRunner = Depends(get_db_runner)
 ):
-    """Get all unique genres with movie count"""
-    query = db.query(
-        Genre.genre,
-        func.count(Genre.id).label('movie_count')
-    ).group_by(Genre.genre).order_by(Genre.genre)
-    
+    """Get all unique genres with movie count
+
+    Counts come from the maintained genre count map. The response carries an
+    ETag; sending it back in If-None-Match returns 304 while the counts are
+    unchanged.
+    """
+    genres, etag = await db.run(genre_counts.listing)
     if limit:
-        query = query.limit(limit)
-    
-    results = query.all()
+        genres = genres[:limit]
+        etag = compute_etag(etag, limit)
     
-    return [
-        {
-            "genre": result.genre,
-            "movie_count": result.movie_count
-        }
-        for result in results
-    ]
+    # Cache-Control comes from the /genres policy (CACHE_CONTROL_POLICIES)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
+    return genres
 
 
 @router.get("/{genre_name}/movies")
+@conditional_response()
+@cached_response("movies")
 async def get_movies_by_genre(
     genre_name: str,
     page: int = Query(1, ge=1),
     page_size: int = Query(50, ge=1, le=100),
-    db: Session = Depends(get_db)
+    after_id: Optional[int] = Query(None, ge=0, description="Keyset pagination: return movies after this ID"),
+    cursor: Optional[str] = Query(None, description="Keyset pagination: next_cursor from a previous page"),
+    db: DatabaseRunner = Depends(get_db_runner)
 ):
-    """Get all movies for a specific genre"""
+    """Get all movies for a specific genre, ordered by movie ID"""
+    after_id = resolve_after_id(after_id, cursor)
+    return await db.run(_movies_by_genre, genre_name, page, page_size, after_id)
+
+
+def _movies_by_genre(
+    db: Session,
+    genre_name: str,
+    page: int,
+    page_size: int,
+    after_id: Optional[int]
+) -> dict:
     # Check if genre exists
-    genre_exists = db.query(Genre).filter(Genre.genre.ilike(genre_name)).first()
-    if not genre_exists:
+    genre = genre_catalog.lookup(db, genre_name)
+    if genre is None:
         raise HTTPException(status_code=404, detail="Genre not found")
+    genre_id, _ = genre
     
-    # Get movies with pagination
-    offset = (page - 1) * page_size
-    movies_query = db.query(Movie).join(Genre).filter(
-        Genre.genre.ilike(genre_name)
+    # Get movies with pagination (EXISTS rather than a join, so a movie
+    # is listed once)
+    movies_query = db.query(Movie).filter(
+        Movie.genres.any(Genre.genre_id == genre_id)
     )
     
     total = movies_query.count()
-    movies = movies_query.offset(offset).limit(page_size).all()
+    movies_query = movies_query.order_by(Movie.id)
+    if after_id is not None:
+        movies_query = movies_query.filter(Movie.id > after_id)
+    else:
+        movies_query = movies_query.offset((page - 1) * page_size)
+    movies = movies_query.limit(page_size + 1).all()
+    has_more = len(movies) > page_size
+    movies = movies[:page_size]
     
     return {
         "genre": genre_name,
@@ -71,5 +99,6 @@ async def get_movies_by_genre(
         ],
         "total": total,
         "page": page,
-        "page_size": page_size
+        "page_size": page_size,
+        "next_cursor": encode_cursor(movies[-1].id) if has_more else None
     }
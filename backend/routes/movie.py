@@ -1,97 +1,319 @@
 from fastapi import APIRouter, HTTPException, Depends, Query
-from sqlalchemy.orm import Session, joinedload
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session, joinedload, selectinload
 from sqlalchemy import and_
 from typing import List, Optional
-from database.db import get_db
+from config import settings
+from database.runner import DatabaseRunner, get_db_runner
 from models import Movie, Genre, Rating
 from schemas import (
-    MovieCreate, MovieUpdate, MovieResponse, MovieList, MovieSummary,
-    GenreResponse, RatingResponse, RatingCreate, RatingUpdate
+    MovieCreate, MovieUpdate, MovieResponse, MovieList, MovieFilter, MovieSuggestion,
+    MovieBatchUpdate, BatchResult, MovieLookupRequest, MovieLookup, GenreResponse, RatingResponse, RatingCreate, RatingUpdate
 )
+from services.batch_writes import add_genres, create_movies, update_movies
+from services.cache import cached_response
+from services.counts import count_movies
+from services.events import publish_movie_change, snapshot_from_movie, snapshot_movie
+from services.export import MEDIA_TYPES, iter_movie_export
+from services.facets import facet_page
+from services.genre_catalog import genre_catalog
+from services.movie_filters import build_movie_predicates
+from services.movie_pages import fetch_page_ids, load_movie_detail, load_movie_summaries
+from services.search import search_page_ids
+from services.suggest import suggest_from_database, suggestions_ready, title_suggester
+from services.versions import conditional_response
 from utils.logging import logger
+from utils.pagination import encode_cursor, resolve_after_id
+from utils.responses import json_response
 
 router = APIRouter(
     prefix="/movies",
     tags=["movies"]
 )
 
+# Handlers validate their input and hand the queries to the database runner
+# (see database/runner.py): db.run for reads, db.write for changes. The sync
+# functions below each handler do the work and return response models, never
+# ORM objects.
+
 
 @router.get("/", response_model=MovieList)
+@conditional_response()
+@cached_response("movies")
 async def get_movies(
     page: int = Query(1, ge=1, description="Page number"),
     page_size: int = Query(50, ge=1, le=100, description="Items per page"),
-    title: Optional[str] = Query(None, description="Filter by title (partial match)"),
+    title: Optional[str] = Query(None, description="Filter by title (words starting with each search term)"),
     year: Optional[int] = Query(None, description="Filter by year"),
     genre: Optional[str] = Query(None, description="Filter by genre"),
+    genre_id: Optional[int] = Query(None, description="Filter by genre catalog ID"),
     min_rating: Optional[float] = Query(None, ge=0, le=10, description="Minimum rating"),
     max_rating: Optional[float] = Query(None, ge=0, le=10, description="Maximum rating"),
-    db: Session = Depends(get_db)
+    sort: str = Query("id", pattern="^(id|relevance)$", description="Order by ID or, with title, by search relevance"),
+    after_id: Optional[int] = Query(None, ge=0, description="Keyset pagination: return movies after this ID"),
+    cursor: Optional[str] = Query(None, description="Keyset pagination: next_cursor from a previous page"),
+    include_total: bool = Query(True, description="Compute the total number of matching movies"),
+    estimate_total: bool = Query(False, description="Accept a cached total that may predate recent writes"),
+    db: DatabaseRunner = Depends(get_db_runner)
 ):
-    """Get all movies with pagination and filtering"""
-    query = db.query(Movie).options(
-        joinedload(Movie.genres),
-        joinedload(Movie.rating)
+    """Get all movies with pagination and filtering
+
+    Pages are ordered by movie ID. Passing after_id or cursor switches to
+    keyset pagination, which costs the same on every page; page is then
+    ignored. Totals are counted without eager loads and cached per filter
+    set; include_total=false skips the count altogether.
+    """
+    after_id = resolve_after_id(after_id, cursor)
+    filters = MovieFilter(
+        title=title, year=year, genre=genre, genre_id=genre_id,
+        min_rating=min_rating, max_rating=max_rating
     )
-    
-    # Apply filters
-    if title:
-        query = query.filter(Movie.title.ilike(f"%{title}%"))
-    if year:
-        query = query.filter(Movie.year == year)
-    if genre:
-        query = query.join(Genre).filter(Genre.genre.ilike(f"%{genre}%"))
-    if min_rating is not None or max_rating is not None:
-        query = query.join(Rating)
-        if min_rating is not None:
-            query = query.filter(Rating.rating >= min_rating)
-        if max_rating is not None:
-            query = query.filter(Rating.rating <= max_rating)
-
-    # Get total count
-    total = query.count()
-    
-    # Apply pagination
-    offset = (page - 1) * page_size
-    movies = query.offset(offset).limit(page_size).all()
-    
-    # Convert to MovieSummary format
-    movie_summaries = []
-    for movie in movies:
-        summary = MovieSummary(
-            id=movie.id,
-            title=movie.title,
-            year=movie.year,
-            duration=movie.duration,
-            average_rating=movie.rating.rating if movie.rating else None,
-            vote_count=movie.rating.vote_count if movie.rating else None,
-            genres=[g.genre for g in movie.genres]
+    by_relevance = sort == "relevance" and bool(title)
+    if by_relevance and after_id is not None:
+        raise HTTPException(status_code=400, detail="Keyset pagination requires sort=id")
+
+    return json_response(await db.run(
+        _list_movies, filters, page, page_size, after_id,
+        by_relevance=by_relevance, include_total=include_total, estimate_total=estimate_total
+    ))
+
+
+def _list_movies(
+    db: Session,
+    filters: MovieFilter,
+    page: int,
+    page_size: int,
+    after_id: Optional[int],
+    by_relevance: bool,
+    include_total: bool,
+    estimate_total: bool
+) -> dict:
+    # Filters without a title can be answered from the in-memory facet
+    # bitmaps (FACET_ENGINE_ENABLED), with an exact total
+    faceted = None if by_relevance else facet_page(db, filters, page, page_size, after_id)
+    if faceted is not None:
+        movie_ids, has_more, total = faceted
+        if not include_total:
+            total = None
+    else:
+        # Get total count
+        total = count_movies(db, filters, estimated=estimate_total) if include_total else None
+
+        # Select the page of IDs first, then load those movies with their
+        # genres and rating in batched queries
+        if by_relevance:
+            other_predicates = build_movie_predicates(db, filters.model_copy(update={"title": None}))
+            movie_ids, has_more = search_page_ids(db, filters.title, other_predicates, page, page_size)
+        else:
+            predicates = build_movie_predicates(db, filters)
+            movie_ids, has_more = fetch_page_ids(db, predicates, page, page_size, after_id)
+    movie_summaries = load_movie_summaries(db, movie_ids)
+
+    return {
+        "movies": movie_summaries,
+        "total": total,
+        "total_estimated": include_total and estimate_total and faceted is None,
+        "page": page,
+        "page_size": page_size,
+        "next_cursor": encode_cursor(movie_ids[-1]) if has_more and not by_relevance else None
+    }
+
+
+@router.get("/search", response_model=MovieList)
+@conditional_response()
+@cached_response("movies")
+async def search_movies(
+    q: str = Query(..., min_length=1, description="Search terms"),
+    mode: str = Query("prefix", pattern="^(prefix|token)$", description="prefix: words starting with each term, token: whole words"),
+    page: int = Query(1, ge=1, description="Page number"),
+    page_size: int = Query(50, ge=1, le=100, description="Items per page"),
+    year: Optional[int] = Query(None, description="Filter by year"),
+    genre: Optional[str] = Query(None, description="Filter by genre"),
+    min_rating: Optional[float] = Query(None, ge=0, le=10, description="Minimum rating"),
+    max_rating: Optional[float] = Query(None, ge=0, le=10, description="Maximum rating"),
+    include_total: bool = Query(True, description="Compute the total number of matches"),
+    db: DatabaseRunner = Depends(get_db_runner)
+):
+    """Search movie titles, best matches first"""
+    filters = MovieFilter(
+        title=q, title_match=mode, year=year, genre=genre,
+        min_rating=min_rating, max_rating=max_rating
+    )
+    return json_response(await db.run(_search_movies, filters, page, page_size, include_total))
+
+
+def _search_movies(
+    db: Session,
+    filters: MovieFilter,
+    page: int,
+    page_size: int,
+    include_total: bool
+) -> dict:
+    total = count_movies(db, filters) if include_total else None
+
+    other_predicates = build_movie_predicates(db, filters.model_copy(update={"title": None}))
+    movie_ids, _ = search_page_ids(db, filters.title, other_predicates, page, page_size, filters.title_match)
+
+    return {
+        "movies": load_movie_summaries(db, movie_ids),
+        "total": total,
+        "total_estimated": False,
+        "page": page,
+        "page_size": page_size,
+        "next_cursor": None
+    }
+
+
+@router.get("/suggest", response_model=List[MovieSuggestion])
+async def suggest_movies(
+    q: str = Query(..., min_length=1, description="Beginning of a title"),
+    limit: int = Query(10, ge=1, le=50, description="Number of suggestions"),
+    db: DatabaseRunner = Depends(get_db_runner)
+):
+    """Title typeahead: titles starting with q, most voted first
+
+    Served from the in-memory prefix index; the database is only queried
+    while the index is being built, at startup or after the catalog changed
+    elsewhere.
+    """
+    if suggestions_ready():
+        return title_suggester.suggest(q, limit)
+    return await db.run(suggest_from_database, q, limit)
+
+
+# Export, lookup and batch endpoints (declared before /{movie_id} so these
+# paths aren't taken for an ID)
+@router.get("/export")
+async def export_movies(
+    file_format: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$", description="ndjson or csv"),
+    title: Optional[str] = Query(None, description="Filter by title (words starting with each search term)"),
+    year: Optional[int] = Query(None, description="Filter by year"),
+    genre: Optional[str] = Query(None, description="Filter by genre"),
+    genre_id: Optional[int] = Query(None, description="Filter by genre catalog ID"),
+    min_rating: Optional[float] = Query(None, ge=0, le=10, description="Minimum rating"),
+    max_rating: Optional[float] = Query(None, ge=0, le=10, description="Maximum rating"),
+    db: DatabaseRunner = Depends(get_db_runner)
+):
+    """Stream every movie matching the filters, with genres and rating
+
+    Ordered by movie ID. Takes the same filters as GET /movies, without
+    pagination: the whole result is streamed in one response.
+    """
+    filters = MovieFilter(
+        title=title, year=year, genre=genre, genre_id=genre_id,
+        min_rating=min_rating, max_rating=max_rating
+    )
+    return StreamingResponse(
+        iter_movie_export(db.read_session, filters, file_format, settings.EXPORT_CHUNK_SIZE),
+        media_type=MEDIA_TYPES[file_format],
+        headers={"Content-Disposition": f'attachment; filename="movies.{file_format}"'}
+    )
+
+
+@router.get("/lookup", response_model=MovieLookup)
+@conditional_response()
+@cached_response("movies")
+async def lookup_movies(
+    ids: str = Query(..., description="Comma separated movie IDs"),
+    db: DatabaseRunner = Depends(get_db_runner)
+):
+    """Get several movies with full details in one call
+
+    Movies come back in the order requested; IDs without a movie are listed
+    in missing. POST /movies/lookup takes the IDs in the body instead.
+    """
+    try:
+        movie_ids = [int(value) for value in ids.split(",") if value.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ids must be comma separated integers")
+    return await db.run(_lookup_movies, _checked_lookup_ids(movie_ids))
+
+
+@router.post("/lookup", response_model=MovieLookup)
+async def lookup_movies_by_body(request: MovieLookupRequest, db: DatabaseRunner = Depends(get_db_runner)):
+    """Same as GET /movies/lookup, for ID lists too long for a URL"""
+    return await db.run(_lookup_movies, _checked_lookup_ids(request.ids))
+
+
+def _checked_lookup_ids(movie_ids: List[int]) -> List[int]:
+    # Repeated IDs are returned once, at their first position
+    movie_ids = list(dict.fromkeys(movie_ids))
+    if not movie_ids:
+        raise HTTPException(status_code=400, detail="No movie IDs given")
+    if len(movie_ids) > settings.LOOKUP_MAX_IDS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Too many IDs, at most {settings.LOOKUP_MAX_IDS} per request"
         )
-        movie_summaries.append(summary)
-    
-    return MovieList(
-        movies=movie_summaries,
-        total=total,
-        page=page,
-        page_size=page_size
+    return movie_ids
+
+
+def _lookup_movies(db: Session, movie_ids: List[int]) -> MovieLookup:
+    # One IN query, then one query per relationship for the whole set
+    movies = db.query(Movie).options(
+        selectinload(Movie.genres),
+        selectinload(Movie.rating)
+    ).filter(Movie.id.in_(movie_ids)).all()
+    by_id = {movie.id: movie for movie in movies}
+    return MovieLookup(
+        movies=[MovieResponse.model_validate(by_id[movie_id]) for movie_id in movie_ids if movie_id in by_id],
+        missing=[movie_id for movie_id in movie_ids if movie_id not in by_id]
     )
 
 
+def _check_batch_size(items: list) -> None:
+    if not items:
+        raise HTTPException(status_code=400, detail="Batch is empty")
+    if len(items) > settings.BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch too large, at most {settings.BATCH_MAX_ITEMS} items per request"
+        )
+
+
+@router.post("/batch", response_model=BatchResult, status_code=201)
+async def create_movies_batch(movies: List[MovieCreate], db: DatabaseRunner = Depends(get_db_runner)):
+    """Create several movies with their genres and ratings in one transaction
+
+    Returns the new ID of each item, in request order.
+    """
+    _check_batch_size(movies)
+    return await db.write(create_movies, movies)
+
+
+@router.put("/batch", response_model=BatchResult)
+async def update_movies_batch(movies: List[MovieBatchUpdate], db: DatabaseRunner = Depends(get_db_runner)):
+    """Update several movies (each item carries its id) in one transaction
+
+    Items for unknown IDs are reported as not_found, later items for an ID
+    already in the batch as duplicate; the other items are applied.
+    """
+    _check_batch_size(movies)
+    return await db.write(update_movies, movies)
+
+
 @router.get("/{movie_id}", response_model=MovieResponse)
-async def get_movie(movie_id: int, db: Session = Depends(get_db)):
+@conditional_response("movie_id")
+@cached_response("movies")
+async def get_movie(movie_id: int, db: DatabaseRunner = Depends(get_db_runner)):
     """Get a movie by ID with full details"""
-    movie = db.query(Movie).options(
-        joinedload(Movie.genres),
-        joinedload(Movie.rating)
-    ).filter(Movie.id == movie_id).first()
-    
+    return json_response(await db.run(_get_movie, movie_id))
+
+
+def _get_movie(db: Session, movie_id: int) -> dict:
+    movie = load_movie_detail(db, movie_id)
     if movie is None:
         raise HTTPException(status_code=404, detail="Movie not found")
     return movie
 
 
 @router.post("/", response_model=MovieResponse, status_code=201)
-async def create_movie(movie_data: MovieCreate, db: Session = Depends(get_db)):
+async def create_movie(movie_data: MovieCreate, db: DatabaseRunner = Depends(get_db_runner)):
     """Create a new movie with optional genres and rating"""
+    return await db.write(_create_movie, movie_data)
+
+
+def _create_movie(db: Session, movie_data: MovieCreate) -> MovieResponse:
     # Create the movie
     db_movie = Movie(
         title=movie_data.title,
@@ -100,13 +322,14 @@ async def create_movie(movie_data: MovieCreate, db: Session = Depends(get_db)):
     )
     db.add(db_movie)
     db.flush()  # Flush to get the ID
-    
+
     # Add genres
     if movie_data.genres:
-        for genre_name in movie_data.genres:
-            genre = Genre(movie_id=db_movie.id, genre=genre_name)
+        genre_ids = genre_catalog.get_or_create_ids(db, movie_data.genres)
+        for genre_id in set(genre_ids.values()):
+            genre = Genre(movie_id=db_movie.id, genre_id=genre_id)
             db.add(genre)
-    
+
     # Add rating
     if movie_data.rating:
         rating = Rating(
@@ -115,28 +338,35 @@ async def create_movie(movie_data: MovieCreate, db: Session = Depends(get_db)):
             vote_count=movie_data.rating.vote_count
         )
         db.add(rating)
-    
+
     db.commit()
     db.refresh(db_movie)
-    
+
     # Return the movie with all relationships
-    return db.query(Movie).options(
+    movie = db.query(Movie).options(
         joinedload(Movie.genres),
         joinedload(Movie.rating)
     ).filter(Movie.id == db_movie.id).first()
+    publish_movie_change(None, snapshot_from_movie(movie))
+    return MovieResponse.model_validate(movie)
 
 
 @router.put("/{movie_id}", response_model=MovieResponse)
 async def update_movie(
-    movie_id: int, 
-    movie_update: MovieUpdate, 
-    db: Session = Depends(get_db)
+    movie_id: int,
+    movie_update: MovieUpdate,
+    db: DatabaseRunner = Depends(get_db_runner)
 ):
     """Update an existing movie"""
+    return await db.write(_update_movie, movie_id, movie_update)
+
+
+def _update_movie(db: Session, movie_id: int, movie_update: MovieUpdate) -> MovieResponse:
     movie = db.query(Movie).filter(Movie.id == movie_id).first()
     if movie is None:
         raise HTTPException(status_code=404, detail="Movie not found")
-    
+    before = snapshot_movie(db, movie_id)
+
     # Update basic fields
     if movie_update.title is not None:
         movie.title = movie_update.title
@@ -144,27 +374,28 @@ async def update_movie(
         movie.year = movie_update.year
     if movie_update.duration is not None:
         movie.duration = movie_update.duration
-    
+
     # Update genres if provided
     if movie_update.genres is not None:
         # Get existing genres
-        existing_genres = db.query(Genre).filter(Genre.movie_id == movie_id).all()
-        existing_genre_names = {genre.genre for genre in existing_genres}
-        new_genre_names = set(movie_update.genres)
-        
+        existing_genre_ids = {
+            genre_id for (genre_id,) in db.query(Genre.genre_id).filter(Genre.movie_id == movie_id)
+        }
+        new_genre_ids = set(genre_catalog.get_or_create_ids(db, movie_update.genres).values())
+
         # Remove genres that are no longer in the new list
-        genres_to_remove = existing_genre_names - new_genre_names
+        genres_to_remove = existing_genre_ids - new_genre_ids
         if genres_to_remove:
             db.query(Genre).filter(
-                and_(Genre.movie_id == movie_id, Genre.genre.in_(genres_to_remove))
+                and_(Genre.movie_id == movie_id, Genre.genre_id.in_(genres_to_remove))
             ).delete(synchronize_session=False)
-        
+
         # Add new genres that don't exist yet
-        genres_to_add = new_genre_names - existing_genre_names
-        for genre_name in genres_to_add:
-            genre = Genre(movie_id=movie_id, genre=genre_name)
+        genres_to_add = new_genre_ids - existing_genre_ids
+        for genre_id in genres_to_add:
+            genre = Genre(movie_id=movie_id, genre_id=genre_id)
             db.add(genre)
-    
+
     # Update rating if provided
     if movie_update.rating is not None:
         existing_rating = db.query(Rating).filter(Rating.movie_id == movie_id).first()
@@ -180,124 +411,191 @@ async def update_movie(
                 vote_count=movie_update.rating.vote_count
             )
             db.add(rating)
-    
+
     db.commit()
     db.refresh(movie)
-    
+
     # Return the movie with all relationships
-    return db.query(Movie).options(
+    movie = db.query(Movie).options(
         joinedload(Movie.genres),
         joinedload(Movie.rating)
     ).filter(Movie.id == movie_id).first()
+    publish_movie_change(before, snapshot_from_movie(movie))
+    return MovieResponse.model_validate(movie)
 
 
 @router.delete("/{movie_id}")
-async def delete_movie(movie_id: int, db: Session = Depends(get_db)):
+async def delete_movie(movie_id: int, db: DatabaseRunner = Depends(get_db_runner)):
     """Delete a movie"""
+    return await db.write(_delete_movie, movie_id)
+
+
+def _delete_movie(db: Session, movie_id: int) -> dict:
     movie = db.query(Movie).filter(Movie.id == movie_id).first()
     if movie is None:
         raise HTTPException(status_code=404, detail="Movie not found")
-    
+
+    before = snapshot_from_movie(movie)
     movie_title = movie.title
     db.delete(movie)
     db.commit()
+    publish_movie_change(before, None)
     return {"message": f"Movie '{movie_title}' deleted successfully"}
 
 
 # Genre endpoints
 @router.get("/{movie_id}/genres", response_model=List[GenreResponse])
-async def get_movie_genres(movie_id: int, db: Session = Depends(get_db)):
+@conditional_response("movie_id")
+@cached_response("movies")
+async def get_movie_genres(movie_id: int, db: DatabaseRunner = Depends(get_db_runner)):
     """Get all genres for a specific movie"""
+    return await db.run(_get_movie_genres, movie_id)
+
+
+def _get_movie_genres(db: Session, movie_id: int) -> List[GenreResponse]:
     movie = db.query(Movie).filter(Movie.id == movie_id).first()
     if movie is None:
         raise HTTPException(status_code=404, detail="Movie not found")
-    
+
     genres = db.query(Genre).filter(Genre.movie_id == movie_id).all()
-    return genres
+    return [GenreResponse.model_validate(genre) for genre in genres]
 
 
 @router.post("/{movie_id}/genres", response_model=GenreResponse, status_code=201)
 async def add_genre_to_movie(
-    movie_id: int, 
-    genre_name: str, 
-    db: Session = Depends(get_db)
+    movie_id: int,
+    genre_name: str,
+    db: DatabaseRunner = Depends(get_db_runner)
 ):
     """Add a genre to a movie"""
+    if not genre_name.strip():
+        raise HTTPException(status_code=400, detail="Genre name must not be empty")
+    return await db.write(_add_genre_to_movie, movie_id, genre_name)
+
+
+def _add_genre_to_movie(db: Session, movie_id: int, genre_name: str) -> GenreResponse:
     movie = db.query(Movie).filter(Movie.id == movie_id).first()
     if movie is None:
         raise HTTPException(status_code=404, detail="Movie not found")
-    
+
+    genre_id = genre_catalog.get_or_create_ids(db, [genre_name])[genre_name.strip()]
+
     # Check if genre already exists for this movie
     existing_genre = db.query(Genre).filter(
-        and_(Genre.movie_id == movie_id, Genre.genre == genre_name)
+        and_(Genre.movie_id == movie_id, Genre.genre_id == genre_id)
     ).first()
-    
+
     if existing_genre:
         raise HTTPException(status_code=400, detail="Genre already exists for this movie")
-    
-    genre = Genre(movie_id=movie_id, genre=genre_name)
+
+    before = snapshot_movie(db, movie_id)
+    genre = Genre(movie_id=movie_id, genre_id=genre_id)
     db.add(genre)
     db.commit()
     db.refresh(genre)
-    return genre
+    publish_movie_change(before, snapshot_movie(db, movie_id))
+    return GenreResponse.model_validate(genre)
+
+
+@router.post("/{movie_id}/genres/batch", response_model=BatchResult, status_code=201)
+async def add_genres_to_movie(
+    movie_id: int,
+    genre_names: List[str],
+    db: DatabaseRunner = Depends(get_db_runner)
+):
+    """Add several genres to a movie; genres it already has are reported as exists"""
+    _check_batch_size(genre_names)
+    return await db.write(_add_genres_to_movie, movie_id, genre_names)
+
+
+def _add_genres_to_movie(db: Session, movie_id: int, genre_names: List[str]) -> BatchResult:
+    movie = db.query(Movie.id).filter(Movie.id == movie_id).first()
+    if movie is None:
+        raise HTTPException(status_code=404, detail="Movie not found")
+    return add_genres(db, movie_id, genre_names)
 
 
 @router.delete("/{movie_id}/genres/{genre_id}")
 async def remove_genre_from_movie(
-    movie_id: int, 
-    genre_id: int, 
-    db: Session = Depends(get_db)
+    movie_id: int,
+    genre_id: int,
+    db: DatabaseRunner = Depends(get_db_runner)
 ):
-    """Remove a genre from a movie"""
+    """Remove a genre (by catalog ID) from a movie
+
+    genre_id is the genre's catalog ID: the ``id`` returned by GET /genres and
+    the ``genre_id`` returned by GET /movies/{movie_id}/genres. Before the
+    genre catalog (schema version 2) it was the ID of the movie's genre row;
+    those rows no longer have an ID of their own, so old IDs are not accepted.
+    """
+    return await db.write(_remove_genre_from_movie, movie_id, genre_id)
+
+
+def _remove_genre_from_movie(db: Session, movie_id: int, genre_id: int) -> dict:
     genre = db.query(Genre).filter(
-        and_(Genre.id == genre_id, Genre.movie_id == movie_id)
+        and_(Genre.genre_id == genre_id, Genre.movie_id == movie_id)
     ).first()
-    
+
     if genre is None:
         raise HTTPException(status_code=404, detail="Genre not found for this movie")
-    
+
+    before = snapshot_movie(db, movie_id)
     genre_name = genre.genre
     db.delete(genre)
     db.commit()
+    publish_movie_change(before, snapshot_movie(db, movie_id))
     return {"message": f"Genre '{genre_name}' removed from movie"}
 
 
 # Rating endpoints
 @router.get("/{movie_id}/rating", response_model=RatingResponse)
-async def get_movie_rating(movie_id: int, db: Session = Depends(get_db)):
+@conditional_response("movie_id")
+@cached_response("movies")
+async def get_movie_rating(movie_id: int, db: DatabaseRunner = Depends(get_db_runner)):
     """Get rating for a specific movie"""
+    return await db.run(_get_movie_rating, movie_id)
+
+
+def _get_movie_rating(db: Session, movie_id: int) -> RatingResponse:
     movie = db.query(Movie).filter(Movie.id == movie_id).first()
     if movie is None:
         raise HTTPException(status_code=404, detail="Movie not found")
-    
+
     rating = db.query(Rating).filter(Rating.movie_id == movie_id).first()
     if rating is None:
         raise HTTPException(status_code=404, detail="Rating not found for this movie")
-    
-    return rating
+
+    return RatingResponse.model_validate(rating)
 
 
 @router.post("/{movie_id}/rating", response_model=RatingResponse, status_code=201)
 async def add_rating_to_movie(
-    movie_id: int, 
-    rating_data: RatingCreate, 
-    db: Session = Depends(get_db)
+    movie_id: int,
+    rating_data: RatingCreate,
+    db: DatabaseRunner = Depends(get_db_runner)
 ):
     """Add or update rating for a movie"""
+    return await db.write(_add_rating_to_movie, movie_id, rating_data)
+
+
+def _add_rating_to_movie(db: Session, movie_id: int, rating_data: RatingCreate) -> RatingResponse:
     movie = db.query(Movie).filter(Movie.id == movie_id).first()
     if movie is None:
         raise HTTPException(status_code=404, detail="Movie not found")
-    
+
+    before = snapshot_movie(db, movie_id)
+
     # Check if rating already exists
     existing_rating = db.query(Rating).filter(Rating.movie_id == movie_id).first()
-    
+
     if existing_rating:
         # Update existing rating
         existing_rating.rating = rating_data.rating
         existing_rating.vote_count = rating_data.vote_count
         db.commit()
         db.refresh(existing_rating)
-        return existing_rating
+        publish_movie_change(before, snapshot_movie(db, movie_id))
+        return RatingResponse.model_validate(existing_rating)
     else:
         # Create new rating
         rating = Rating(
@@ -308,37 +606,50 @@ async def add_rating_to_movie(
         db.add(rating)
         db.commit()
         db.refresh(rating)
-        return rating
+        publish_movie_change(before, snapshot_movie(db, movie_id))
+        return RatingResponse.model_validate(rating)
 
 
 @router.put("/{movie_id}/rating", response_model=RatingResponse)
 async def update_movie_rating(
-    movie_id: int, 
-    rating_update: RatingUpdate, 
-    db: Session = Depends(get_db)
+    movie_id: int,
+    rating_update: RatingUpdate,
+    db: DatabaseRunner = Depends(get_db_runner)
 ):
     """Update rating for a movie"""
+    return await db.write(_update_movie_rating, movie_id, rating_update)
+
+
+def _update_movie_rating(db: Session, movie_id: int, rating_update: RatingUpdate) -> RatingResponse:
     rating = db.query(Rating).filter(Rating.movie_id == movie_id).first()
     if rating is None:
         raise HTTPException(status_code=404, detail="Rating not found for this movie")
-    
+
+    before = snapshot_movie(db, movie_id)
     if rating_update.rating is not None:
         rating.rating = rating_update.rating
     if rating_update.vote_count is not None:
         rating.vote_count = rating_update.vote_count
-    
+
     db.commit()
     db.refresh(rating)
-    return rating
+    publish_movie_change(before, snapshot_movie(db, movie_id))
+    return RatingResponse.model_validate(rating)
 
 
 @router.delete("/{movie_id}/rating")
-async def remove_movie_rating(movie_id: int, db: Session = Depends(get_db)):
+async def remove_movie_rating(movie_id: int, db: DatabaseRunner = Depends(get_db_runner)):
     """Remove rating from a movie"""
+    return await db.write(_remove_movie_rating, movie_id)
+
+
+def _remove_movie_rating(db: Session, movie_id: int) -> dict:
     rating = db.query(Rating).filter(Rating.movie_id == movie_id).first()
     if rating is None:
         raise HTTPException(status_code=404, detail="Rating not found for this movie")
-    
+
+    before = snapshot_movie(db, movie_id)
     db.delete(rating)
     db.commit()
-    return {"message": "Rating removed from movie"}
\ No newline at end of file
+    publish_movie_change(before, snapshot_movie(db, movie_id))
+    return {"message": "Rating removed from movie"}
@@ -1,8 +1,13 @@
 from fastapi import APIRouter, Depends, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import func, desc
-from database.db import get_db
+from typing import Optional
+from database.runner import DatabaseRunner, get_db_runner
 from models import Rating, Movie
+from services.cache import cached_response
+from services.genre_catalog import genre_catalog
+from services.leaderboard import top_rated
+from services.rating_stats import rating_aggregates
+from services.versions import conditional_response
 
 router = APIRouter(
     prefix="/ratings",
@@ -11,72 +16,53 @@ router = APIRouter(
 
 
 @router.get("/top-rated")
+@conditional_response()
+@cached_response("movies")
 async def get_top_rated_movies(
     limit: int = Query(10, ge=1, le=100, description="Number of top rated movies"),
     min_votes: int = Query(50, ge=1, description="Minimum number of votes required"),
-    db: Session = Depends(get_db)
+    genre: Optional[str] = Query(None, description="Only movies of this genre"),
+    decade: Optional[int] = Query(None, ge=0, multiple_of=10, description="Only movies of this decade, e.g. 1990"),
+    ranking: str = Query("rating", pattern="^(rating|weighted)$", description="Order by rating or by Bayesian weighted rating"),
+    db: DatabaseRunner = Depends(get_db_runner)
 ):
-    """Get top rated movies with minimum vote threshold"""
-    top_movies = db.query(
-        Movie.id,
-        Movie.title,
-        Movie.year,
-        Movie.duration,
-        Rating.rating,
-        Rating.vote_count
-    ).join(Rating).filter(
-        Rating.vote_count >= min_votes
-    ).order_by(
-        desc(Rating.rating)
-    ).limit(limit).all()
-    
-    return [
-        {
-            "id": movie.id,
-            "title": movie.title,
-            "year": movie.year,
-            "duration": movie.duration,
-            "average_rating": movie.rating,
-            "vote_count": movie.vote_count
-        }
-        for movie in top_movies
-    ]
+    """Get top rated movies with minimum vote threshold
+
+    Served from the precomputed leaderboards. ranking=weighted pulls ratings
+    with few votes towards the mean rating and adds weighted_rating to each
+    movie.
+    """
+    return await db.run(_top_rated, limit, min_votes, genre, decade, ranking)
+
+
+def _top_rated(
+    db: Session,
+    limit: int,
+    min_votes: int,
+    genre: Optional[str],
+    decade: Optional[int],
+    ranking: str
+) -> list:
+    genre_id = None
+    if genre:
+        match = genre_catalog.lookup(db, genre)
+        if match is None:
+            return []
+        genre_id, _ = match
+    return top_rated(db, limit, min_votes, genre_id=genre_id, decade=decade, ranking=ranking)
 
 
 @router.get("/statistics")
-async def get_rating_statistics(db: Session = Depends(get_db)):
-    """Get overall rating statistics"""
-    stats = db.query(
-        func.avg(Rating.rating).label('average_rating'),
-        func.min(Rating.rating).label('min_rating'),
-        func.max(Rating.rating).label('max_rating'),
-        func.count(Rating.id).label('total_ratings'),
-        func.sum(Rating.vote_count).label('total_votes')
-    ).first()
-    
-    return {
-        "average_rating": round(float(stats.average_rating), 2) if stats.average_rating else 0,
-        "min_rating": float(stats.min_rating) if stats.min_rating else 0,
-        "max_rating": float(stats.max_rating) if stats.max_rating else 0,
-        "total_movies_with_ratings": stats.total_ratings,
-        "total_votes": stats.total_votes
-    }
+@conditional_response()
+@cached_response("ratings")
+async def get_rating_statistics(db: DatabaseRunner = Depends(get_db_runner)):
+    """Get overall rating statistics (from the maintained aggregates)"""
+    return await db.run(rating_aggregates.statistics)
 
 
 @router.get("/distribution")
-async def get_rating_distribution(db: Session = Depends(get_db)):
+@conditional_response()
+@cached_response("ratings")
+async def get_rating_distribution(db: DatabaseRunner = Depends(get_db_runner)):
     """Get rating distribution (how many movies in each rating range)"""
-    distribution = db.query(
-        func.floor(Rating.rating).label('rating_floor'),
-        func.count(Rating.id).label('count')
-    ).group_by(
-        func.floor(Rating.rating)
-    ).order_by('rating_floor').all()
-    
-    return [
-        {
-            "rating_range": f"{int(item.rating_floor)}-{int(item.rating_floor) + 1}",
-            "count": item.count
-        }
-        for item in distribution
-    ]
+    return await db.run(rating_aggregates.distribution)
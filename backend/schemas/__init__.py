@@ -3,18 +3,22 @@ from .genre import GenreBase, GenreCreate, GenreResponse
 from .rating import RatingBase, RatingCreate, RatingUpdate, RatingResponse
 from .movie import (
     MovieBase, MovieCreate, MovieUpdate, MovieResponse, 
-    MovieSummary, MovieList, MovieFilter
+    MovieSummary, MovieList, MovieFilter, MovieSuggestion,
+    MovieBatchUpdate, BatchItemResult, BatchResult, MovieLookupRequest, MovieLookup
 )
 
 # Rebuild models to resolve forward references after all imports
 MovieCreate.model_rebuild()
 MovieUpdate.model_rebuild()
+MovieBatchUpdate.model_rebuild()
 MovieResponse.model_rebuild()
+MovieLookup.model_rebuild()
 
 # Make schemas available at the package level
 __all__ = [
     'MovieBase', 'MovieCreate', 'MovieUpdate', 'MovieResponse', 
-    'MovieSummary', 'MovieList', 'MovieFilter',
+    'MovieSummary', 'MovieList', 'MovieFilter', 'MovieSuggestion',
+    'MovieBatchUpdate', 'BatchItemResult', 'BatchResult', 'MovieLookupRequest', 'MovieLookup',
     'GenreBase', 'GenreCreate', 'GenreResponse',
     'RatingBase', 'RatingCreate', 'RatingUpdate', 'RatingResponse'
 ]
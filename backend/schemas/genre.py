@@ -1,4 +1,4 @@
-from pydantic import BaseModel, ConfigDict
+from pydantic import AliasChoices, BaseModel, ConfigDict, Field
 
 
 class GenreBase(BaseModel):
@@ -13,8 +13,15 @@ class GenreCreate(GenreBase):
 
 class GenreResponse(GenreBase):
     """Schema for genre response"""
-    id: int
+    # Catalog ID of the genre, the ID DELETE /movies/{id}/genres/{genre_id} takes
+    genre_id: int
     movie_id: int
     genre: str
+    # Used to be the movie's genre row ID, which no longer exists; same as genre_id
+    id: int = Field(
+        validation_alias=AliasChoices("id", "genre_id"),
+        deprecated=True,
+        description="Deprecated: same as genre_id"
+    )
     
     model_config = ConfigDict(from_attributes=True)
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, ConfigDict
-from typing import Optional, List, TYPE_CHECKING
+from typing import Optional, List, Literal, TYPE_CHECKING
 
 if TYPE_CHECKING:
     from .rating import RatingCreate, RatingResponse
@@ -28,6 +28,26 @@ class MovieUpdate(BaseModel):
     rating: Optional['RatingCreate'] = None
 
 
+class MovieBatchUpdate(MovieUpdate):
+    """Schema for one item of a batch update"""
+    id: int
+
+
+class BatchItemResult(BaseModel):
+    """Outcome of one item of a batch request"""
+    index: int = Field(..., description="Position of the item in the request")
+    status: str = Field(..., description="created, updated, added, or why the item was skipped")
+    id: Optional[int] = None
+    detail: Optional[str] = None
+
+
+class BatchResult(BaseModel):
+    """Schema for a batch request response"""
+    results: List[BatchItemResult]
+    succeeded: int
+    failed: int
+
+
 class MovieResponse(MovieBase):
     """Schema for movie response"""
     id: int
@@ -37,6 +57,17 @@ class MovieResponse(MovieBase):
     model_config = ConfigDict(from_attributes=True)
 
 
+class MovieLookupRequest(BaseModel):
+    """Schema for fetching movies by ID"""
+    ids: List[int] = Field(..., min_length=1, description="Movie IDs, in the order to return them")
+
+
+class MovieLookup(BaseModel):
+    """Schema for movies fetched by ID"""
+    movies: List[MovieResponse]
+    missing: List[int] = Field([], description="Requested IDs with no movie")
+
+
 class MovieSummary(BaseModel):
     """Schema for movie summary (without genres and rating details)"""
     id: int
@@ -53,15 +84,28 @@ class MovieSummary(BaseModel):
 class MovieList(BaseModel):
     """Schema for listing movies"""
     movies: List[MovieSummary]
-    total: int
+    total: Optional[int] = Field(None, description="Matching movies; null when include_total=false")
+    total_estimated: bool = False
     page: int = 1
     page_size: int = 50
+    next_cursor: Optional[str] = Field(None, description="Pass as cursor to fetch the next page")
+
+
+class MovieSuggestion(BaseModel):
+    """Schema for a title typeahead suggestion"""
+    id: int
+    title: str
+    year: Optional[int] = None
+    vote_count: int = 0
 
 
 class MovieFilter(BaseModel):
     """Schema for filtering movies"""
     title: Optional[str] = None
+    # prefix: words starting with each search token, token: whole words
+    title_match: Literal["prefix", "token"] = "prefix"
     year: Optional[int] = None
     genre: Optional[str] = None
+    genre_id: Optional[int] = None
     min_rating: Optional[float] = Field(None, ge=0, le=10)
     max_rating: Optional[float] = Field(None, ge=0, le=10)
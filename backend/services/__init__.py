@@ -0,0 +1 @@
+# Services package: in-process caches and indexes kept in sync with the database
@@ -0,0 +1,152 @@
+"""
+Batch movie writes
+
+Each batch is written in one transaction: movies and ratings are inserted
+with executemany (RETURNING gives the new movie IDs in input order), genre
+names of the whole batch are resolved against the catalog once, and updates
+load every targeted movie in one query and let the unit of work flush the
+changes grouped per table. Snapshots for the change feed are loaded in one
+query after the commit.
+
+Payloads are validated before anything is written, so a batch either fails as
+a whole (422) or is committed; per-item results report what happened to each
+item (created, updated, not_found, ...).
+"""
+from typing import Dict, List, Sequence
+from sqlalchemy import insert
+from sqlalchemy.orm import Session, selectinload
+from models import Movie, Genre, Rating
+from schemas import BatchItemResult, BatchResult, MovieBatchUpdate, MovieCreate
+from services.events import (
+    MovieSnapshot, publish_movie_change, snapshot_from_movie, snapshot_movie, snapshot_movies
+)
+from services.genre_catalog import genre_catalog
+
+
+def _result(results: List[BatchItemResult], succeeded: Sequence[str]) -> BatchResult:
+    ok = sum(1 for item in results if item.status in succeeded)
+    return BatchResult(results=results, succeeded=ok, failed=len(results) - ok)
+
+
+def _genre_ids(db: Session, names_per_item: Sequence[Sequence[str]]) -> List[List[int]]:
+    """Catalog IDs of each item's genre names, resolving the batch's names once"""
+    ids = genre_catalog.get_or_create_ids(db, [name for names in names_per_item for name in names])
+    return [
+        sorted({ids[name.strip()] for name in names if name.strip()})
+        for names in names_per_item
+    ]
+
+
+def create_movies(db: Session, items: Sequence[MovieCreate]) -> BatchResult:
+    """Insert movies with their genres and ratings"""
+    movie_ids = db.scalars(
+        insert(Movie).returning(Movie.id, sort_by_parameter_order=True),
+        [{"title": item.title, "year": item.year, "duration": item.duration} for item in items]
+    ).all()
+
+    genre_ids = _genre_ids(db, [item.genres or [] for item in items])
+    links = [
+        {"movie_id": movie_id, "genre_id": genre_id}
+        for movie_id, item_genre_ids in zip(movie_ids, genre_ids)
+        for genre_id in item_genre_ids
+    ]
+    if links:
+        db.execute(insert(Genre), links)
+
+    ratings = [
+        {"movie_id": movie_id, "rating": item.rating.rating, "vote_count": item.rating.vote_count}
+        for movie_id, item in zip(movie_ids, items)
+        if item.rating
+    ]
+    if ratings:
+        db.execute(insert(Rating), ratings)
+    db.commit()
+
+    for snapshot in snapshot_movies(db, movie_ids).values():
+        publish_movie_change(None, snapshot)
+    return _result(
+        [BatchItemResult(index=index, status="created", id=movie_id) for index, movie_id in enumerate(movie_ids)],
+        succeeded=("created",)
+    )
+
+
+def update_movies(db: Session, items: Sequence[MovieBatchUpdate]) -> BatchResult:
+    """Apply partial updates; unknown or repeated IDs are reported, not written"""
+    movies: Dict[int, Movie] = {
+        movie.id: movie
+        for movie in db.query(Movie).options(
+            selectinload(Movie.genres),
+            selectinload(Movie.rating)
+        ).filter(Movie.id.in_({item.id for item in items}))
+    }
+    before: Dict[int, MovieSnapshot] = {}
+    results: List[BatchItemResult] = []
+    to_apply: List[MovieBatchUpdate] = []
+    for index, item in enumerate(items):
+        if item.id not in movies:
+            results.append(BatchItemResult(index=index, status="not_found", id=item.id, detail="Movie not found"))
+        elif item.id in before:
+            results.append(BatchItemResult(index=index, status="duplicate", id=item.id, detail="Movie already updated by an earlier item"))
+        else:
+            before[item.id] = snapshot_from_movie(movies[item.id])
+            results.append(BatchItemResult(index=index, status="updated", id=item.id))
+            to_apply.append(item)
+
+    genre_ids = _genre_ids(db, [item.genres or [] for item in to_apply])
+    for item, new_genre_ids in zip(to_apply, genre_ids):
+        movie = movies[item.id]
+        if item.title is not None:
+            movie.title = item.title
+        if item.year is not None:
+            movie.year = item.year
+        if item.duration is not None:
+            movie.duration = item.duration
+
+        if item.genres is not None:
+            existing = {link.genre_id: link for link in movie.genres}
+            for genre_id, link in existing.items():
+                if genre_id not in new_genre_ids:
+                    movie.genres.remove(link)
+            for genre_id in new_genre_ids:
+                if genre_id not in existing:
+                    movie.genres.append(Genre(genre_id=genre_id))
+
+        if item.rating is not None:
+            if movie.rating is not None:
+                movie.rating.rating = item.rating.rating
+                movie.rating.vote_count = item.rating.vote_count
+            else:
+                movie.rating = Rating(rating=item.rating.rating, vote_count=item.rating.vote_count)
+    db.commit()
+
+    after = snapshot_movies(db, before)
+    for movie_id, snapshot in before.items():
+        publish_movie_change(snapshot, after.get(movie_id))
+    return _result(results, succeeded=("updated",))
+
+
+def add_genres(db: Session, movie_id: int, names: Sequence[str]) -> BatchResult:
+    """Link genre names to an existing movie; names it already has are reported"""
+    before = snapshot_movie(db, movie_id)
+    existing = set(before.genre_ids)
+    ids = genre_catalog.get_or_create_ids(db, names)
+
+    results: List[BatchItemResult] = []
+    added: List[int] = []
+    for index, name in enumerate(names):
+        genre_id = ids.get(name.strip())
+        if genre_id is None:
+            results.append(BatchItemResult(index=index, status="invalid", detail="Genre name must not be empty"))
+        elif genre_id in existing:
+            results.append(BatchItemResult(index=index, status="exists", id=genre_id, detail="Genre already exists for this movie"))
+        else:
+            existing.add(genre_id)
+            added.append(genre_id)
+            results.append(BatchItemResult(index=index, status="added", id=genre_id))
+
+    if added:
+        db.execute(insert(Genre), [{"movie_id": movie_id, "genre_id": genre_id} for genre_id in added])
+    db.commit()
+    if added:
+        publish_movie_change(before, snapshot_movie(db, movie_id))
+    return _result(results, succeeded=("added",))
@@ -0,0 +1,284 @@
+"""
+Response cache for read endpoints
+
+Handlers decorated with ``cached_response`` store their JSON-ready result
+under the route plus its normalized parameters. Each cached route names the
+tags its data depends on ("movies", "genres", "ratings"); keys include the
+current version of those tags, and the movie change feed bumps the versions
+on every committed write, so stale entries are simply never looked up again
+and age out of the cache. Tag versions only see this worker's writes: behind
+``conditional_response``, keys also include the catalog or movie version from
+the database, which moves on every write.
+
+The default backend is an in-process LRU with a TTL and a size bound. With
+RESPONSE_CACHE_BACKEND=redis, entries and tag versions live in a Redis
+compatible server (``redis`` package required) and are shared by all workers.
+"""
+import functools
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+from fastapi.encoders import jsonable_encoder
+from config import settings
+from database.runner import DatabaseRunner
+from services.events import MovieSnapshot, subscribe
+from services.versions import response_version
+from utils.logging import logger
+from utils.metrics import MetricFamily, collector
+from utils.responses import FastJSONResponse, json_response
+
+try:
+    import redis
+except ImportError:  # Optional: only needed for RESPONSE_CACHE_BACKEND=redis
+    redis = None
+
+TAGS = ("movies", "genres", "ratings")
+
+# Returned by backends for keys they don't hold (None is a valid response)
+MISSING = object()
+
+
+class MemoryCacheBackend:
+    """In-process LRU cache with per-entry expiry"""
+
+    name = "memory"
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.evictions = 0
+        # key -> (value, expires_at)
+        self._entries: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        self._tags: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return MISSING
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return MISSING
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def tag_versions(self, tags: Sequence[str]) -> Tuple[int, ...]:
+        return tuple(self._tags.get(tag, 0) for tag in tags)
+
+    def bump_tags(self, tags: Sequence[str]) -> None:
+        with self._lock:
+            for tag in tags:
+                self._tags[tag] = self._tags.get(tag, 0) + 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class RedisCacheBackend:
+    """Cache shared by every worker through a Redis compatible server"""
+
+    name = "redis"
+
+    def __init__(self, url: str, prefix: str = "movies-api:cache:"):
+        if redis is None:
+            raise RuntimeError("RESPONSE_CACHE_BACKEND=redis needs the redis package (pip install redis)")
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+        # Expiry and eviction happen in the server
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self.client.scan_iter(match=f"{self.prefix}entry:*", count=1000))
+
+    def get(self, key: str) -> Any:
+        raw = self.client.get(f"{self.prefix}entry:{key}")
+        return MISSING if raw is None else json.loads(raw)
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        self.client.set(
+            f"{self.prefix}entry:{key}", json.dumps(value, separators=(",", ":")),
+            px=max(1, int(ttl * 1000))
+        )
+
+    def tag_versions(self, tags: Sequence[str]) -> Tuple[int, ...]:
+        if not tags:
+            return ()
+        values = self.client.mget([f"{self.prefix}tag:{tag}" for tag in tags])
+        return tuple(int(value) if value is not None else 0 for value in values)
+
+    def bump_tags(self, tags: Sequence[str]) -> None:
+        pipeline = self.client.pipeline()
+        for tag in tags:
+            pipeline.incr(f"{self.prefix}tag:{tag}")
+        pipeline.execute()
+
+    def clear(self) -> None:
+        keys = list(self.client.scan_iter(match=f"{self.prefix}entry:*", count=1000))
+        if keys:
+            self.client.delete(*keys)
+
+
+class ResponseCache:
+    """Keying, statistics and invalidation on top of a cache backend"""
+
+    def __init__(self, backend, ttl: float):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def key(self, route: str, params: Dict[str, Any], tags: Sequence[str], version: Optional[str] = None) -> str:
+        """Cache key for a route call under the current tag versions and resource version"""
+        normalized = json.dumps(
+            sorted((name, value) for name, value in params.items() if value is not None),
+            default=str, separators=(",", ":")
+        )
+        versions = ",".join(
+            f"{tag}={version}" for tag, version in zip(tags, self.backend.tag_versions(tags))
+        )
+        digest = hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+        return f"{route}:{versions}:{version or ''}:{digest}"
+
+    def get(self, key: str) -> Any:
+        try:
+            value = self.backend.get(key)
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Response cache read failed: {e}")
+            return MISSING
+        if value is MISSING:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        try:
+            self.backend.set(key, value, ttl if ttl is not None else self.ttl)
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Response cache write failed: {e}")
+
+    def invalidate(self, *tags: str) -> None:
+        """Make every entry depending on one of the tags unreachable"""
+        try:
+            self.backend.bump_tags(tags)
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"Response cache invalidation failed: {e}")
+
+    def clear(self) -> None:
+        self.backend.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        try:
+            entries = len(self.backend)
+        except Exception:
+            entries = None
+        return {
+            "enabled": settings.RESPONSE_CACHE_ENABLED,
+            "backend": self.backend.name,
+            "entries": entries,
+            "max_entries": getattr(self.backend, "max_entries", None),
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.backend.evictions,
+            "errors": self.errors,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+        }
+
+    def metrics(self) -> List[MetricFamily]:
+        """Counters for GET /metrics"""
+        stats = self.stats()
+        families: List[MetricFamily] = [
+            (f"response_cache_{name}_total", "counter", f"Response cache {name}", [({}, stats[name])])
+            for name in ("hits", "misses", "evictions", "errors")
+        ]
+        if stats["entries"] is not None:
+            families.append(("response_cache_entries", "gauge", "Entries in the response cache", [({}, stats["entries"])]))
+        return families
+
+
+def _create_backend():
+    if settings.RESPONSE_CACHE_BACKEND == "redis":
+        return RedisCacheBackend(settings.REDIS_URL)
+    if settings.RESPONSE_CACHE_BACKEND != "memory":
+        raise ValueError(f"Unknown response cache backend: {settings.RESPONSE_CACHE_BACKEND}")
+    return MemoryCacheBackend(settings.RESPONSE_CACHE_MAX_ENTRIES)
+
+
+response_cache = ResponseCache(_create_backend(), ttl=settings.RESPONSE_CACHE_TTL)
+collector(response_cache.metrics)
+
+
+def cached_response(*tags: str, ttl: Optional[float] = None) -> Callable:
+    """
+    Cache the result of an async route handler
+
+    Goes between ``@router.get`` and the handler. Handler parameters other
+    than the database runner make up the key, after FastAPI has applied
+    defaults, so equivalent query strings share an entry. Entries are already
+    JSON-ready, so with LEAN_SERIALIZATION they are sent without going
+    through the response model again.
+
+    Args:
+        tags: Data the response depends on (see TAGS)
+        ttl: Seconds to keep entries (settings.RESPONSE_CACHE_TTL by default)
+    """
+    def decorator(handler: Callable) -> Callable:
+        route = f"{handler.__module__}.{handler.__name__}"
+
+        @functools.wraps(handler)
+        async def wrapper(*args, **kwargs):
+            if not settings.RESPONSE_CACHE_ENABLED:
+                return await handler(*args, **kwargs)
+
+            params = {name: value for name, value in kwargs.items() if not isinstance(value, DatabaseRunner)}
+            key = response_cache.key(route, params, tags, response_version.get())
+            cached = response_cache.get(key)
+            if cached is not MISSING:
+                return json_response(cached)
+
+            result = await handler(*args, **kwargs)
+            if isinstance(result, FastJSONResponse):
+                response_cache.set(key, result.content, ttl)
+                return result
+            value = jsonable_encoder(result)
+            response_cache.set(key, value, ttl)
+            return json_response(value)
+
+        return wrapper
+
+    return decorator
+
+
+@subscribe
+def invalidate_responses(before: Optional[MovieSnapshot], after: Optional[MovieSnapshot]) -> None:
+    """Bump the tags a committed movie change affects"""
+    tags = ["movies"]
+    old = before or MovieSnapshot(id=0, title="")
+    new = after or MovieSnapshot(id=0, title="")
+    if old.genres != new.genres:
+        tags.append("genres")
+    if (old.rating, old.vote_count) != (new.rating, new.vote_count):
+        tags.append("ratings")
+    response_cache.invalidate(*tags)
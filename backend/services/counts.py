@@ -0,0 +1,116 @@
+"""
+Total counts for filtered movie listings
+
+Counts are computed from the bare filter predicates (no eager loads, no
+row-multiplying joins) and cached per normalized filter set. Entries record
+the catalog version (services/versions.py) they were counted at, and every
+committed movie change in this worker also bumps a generation number. Exact
+counts are only served while both still match, so writes made through other
+workers or imports are seen at once. Estimated counts may be served from an
+older version until they expire.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Hashable, Optional, Tuple
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from config import settings
+from models import Movie
+from schemas import MovieFilter
+from services.events import subscribe
+from services.movie_filters import build_movie_predicates, normalize_filter
+from services.versions import catalog_tag
+
+
+class CountCache:
+    """LRU cache of listing totals with write-driven invalidation"""
+
+    def __init__(self, ttl: float, estimate_ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.estimate_ttl = estimate_ttl
+        self.max_entries = max_entries
+        self.generation = 0
+        # key -> (count, generation, catalog version, stored_at)
+        self._entries: "OrderedDict[Hashable, Tuple[int, int, Optional[str], float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, estimated: bool = False, version: Optional[str] = None) -> Optional[int]:
+        """Return a cached count, or None if there is no usable entry
+
+        version is the current catalog version; exact counts must have been
+        taken at it
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            count, generation, counted_at, stored_at = entry
+            age = time.monotonic() - stored_at
+            if estimated:
+                usable = age < self.estimate_ttl
+            else:
+                usable = generation == self.generation and counted_at == version and age < self.ttl
+            if not usable:
+                return None
+            self._entries.move_to_end(key)
+            return count
+
+    def set(self, key: Hashable, count: int, version: Optional[str] = None) -> None:
+        with self._lock:
+            self._entries[key] = (count, self.generation, version, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self) -> None:
+        """Mark every cached count as out of date"""
+        with self._lock:
+            self.generation += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+count_cache = CountCache(
+    ttl=settings.COUNT_CACHE_TTL,
+    estimate_ttl=settings.COUNT_ESTIMATE_TTL,
+    max_entries=settings.COUNT_CACHE_MAX_ENTRIES
+)
+
+
+@subscribe
+def invalidate_counts(before, after) -> None:
+    """Any movie change can move listing totals"""
+    count_cache.invalidate()
+
+
+def count_movies(db: Session, filters: MovieFilter, estimated: bool = False) -> int:
+    """
+    Count the movies matching a filter set
+
+    Args:
+        db: Database session
+        filters: Listing filters
+        estimated: Accept a cached count from before the latest writes
+
+    Returns:
+        Number of distinct matching movies
+    """
+    key = normalize_filter(filters)
+    if estimated:
+        cached = count_cache.get(key, estimated=True)
+        if cached is not None:
+            return cached
+    # Read before counting: a write in between only makes the entry miss
+    version = catalog_tag(db)
+    if not estimated:
+        cached = count_cache.get(key, version=version)
+        if cached is not None:
+            return cached
+
+    query = select(func.count()).select_from(Movie).where(*build_movie_predicates(db, filters))
+    count = db.execute(query).scalar_one()
+    count_cache.set(key, count, version)
+    return count
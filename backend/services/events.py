@@ -0,0 +1,88 @@
+"""
+Catalog change notifications
+
+Write handlers publish a before/after snapshot of every movie they touch once
+the transaction is committed. Caches and indexes subscribe to keep themselves
+in sync without each route knowing about them.
+"""
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from sqlalchemy.orm import Session, joinedload, selectinload
+from models import Movie
+from utils.logging import logger
+
+
+@dataclass(frozen=True)
+class MovieSnapshot:
+    """State of a movie, its genres and its rating at one point in time"""
+    id: int
+    title: str
+    year: Optional[int] = None
+    duration: Optional[int] = None
+    genres: Tuple[str, ...] = ()
+    genre_ids: Tuple[int, ...] = ()
+    rating: Optional[float] = None
+    vote_count: Optional[int] = None
+
+
+MovieChangeCallback = Callable[[Optional[MovieSnapshot], Optional[MovieSnapshot]], None]
+
+_subscribers: List[MovieChangeCallback] = []
+
+
+def snapshot_from_movie(movie: Movie) -> MovieSnapshot:
+    """Build a snapshot from a loaded Movie"""
+    return MovieSnapshot(
+        id=movie.id,
+        title=movie.title,
+        year=movie.year,
+        duration=movie.duration,
+        genres=tuple(sorted(genre.genre for genre in movie.genres)),
+        genre_ids=tuple(sorted(genre.genre_id for genre in movie.genres)),
+        rating=movie.rating.rating if movie.rating else None,
+        vote_count=movie.rating.vote_count if movie.rating else None,
+    )
+
+
+def snapshot_movie(db: Session, movie_id: int) -> Optional[MovieSnapshot]:
+    """Load a snapshot of a movie, or None if it doesn't exist"""
+    movie = db.query(Movie).options(
+        selectinload(Movie.genres),
+        joinedload(Movie.rating)
+    ).filter(Movie.id == movie_id).first()
+    return snapshot_from_movie(movie) if movie else None
+
+
+def snapshot_movies(db: Session, movie_ids: Iterable[int]) -> Dict[int, MovieSnapshot]:
+    """Load snapshots of several movies at once; missing IDs are left out"""
+    movie_ids = list(movie_ids)
+    if not movie_ids:
+        return {}
+    movies = db.query(Movie).options(
+        selectinload(Movie.genres),
+        selectinload(Movie.rating)
+    ).filter(Movie.id.in_(movie_ids)).all()
+    return {movie.id: snapshot_from_movie(movie) for movie in movies}
+
+
+def subscribe(callback: MovieChangeCallback) -> MovieChangeCallback:
+    """Register a callback(before, after) for committed movie changes"""
+    _subscribers.append(callback)
+    return callback
+
+
+def publish_movie_change(before: Optional[MovieSnapshot], after: Optional[MovieSnapshot]) -> None:
+    """
+    Notify subscribers of a committed change
+
+    before is None for a created movie and after is None for a deleted one.
+    Subscriber errors are logged and never fail the request that made the
+    change.
+    """
+    if before is None and after is None:
+        return
+    for callback in _subscribers:
+        try:
+            callback(before, after)
+        except Exception as e:
+            logger.error(f"Error in movie change subscriber {callback.__name__}: {e}")
@@ -0,0 +1,363 @@
+"""
+In-memory facet index for movie listings
+
+Keeps one bitmap of movie IDs per genre, per year and per distinct rating
+value, using Python ints as the bitmaps (bit n is set when movie n has the
+facet). Genre, year and rating filters are combined with a few AND/OR
+operations, totals come from int.bit_count() and the start of a page is found
+by bisecting on popcounts, so only the page's IDs go to the database
+(services.movie_pages). A bitmap costs max(movie id) / 8 bytes.
+
+Title filters need the search index and are left to SQL. The index is built in
+a background thread at startup and kept current by the movie change feed;
+listings are served from SQL until it is ready. It also tracks the catalog
+version (services/versions.py) it is current at, moving it along with the
+changes it applies; once catalog_watcher sees the catalog past it, because of
+a write from another worker or an import, listings go to SQL again while the
+index is rebuilt in the background. Enabled with FACET_ENGINE_ENABLED.
+"""
+import bisect
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from config import settings
+from models import Movie, Genre, Rating
+from schemas import MovieFilter
+from services.events import MovieSnapshot, subscribe
+from services.genre_catalog import genre_catalog
+from services.versions import advance_version, catalog_tag, catalog_watcher, committed_versions
+from utils.logging import logger
+
+# (year, genre_ids, rating) of one movie
+FacetValues = Tuple[Optional[int], Tuple[int, ...], Optional[float]]
+
+
+def bitmap_from_ids(ids: Iterable[int]) -> int:
+    """Bitmap with the bit of every ID set"""
+    ids = list(ids)
+    if not ids:
+        return 0
+    buffer = bytearray(max(ids) // 8 + 1)
+    for movie_id in ids:
+        buffer[movie_id >> 3] |= 1 << (movie_id & 7)
+    return int.from_bytes(buffer, "little")
+
+
+def page_from_bitmap(
+    bits: int,
+    page: int,
+    page_size: int,
+    after_id: Optional[int] = None
+) -> Tuple[List[int], bool]:
+    """
+    Pick one page of IDs, in ascending order, out of a bitmap
+
+    Returns:
+        The page's IDs and whether more IDs follow
+    """
+    if after_id is not None:
+        start = after_id + 1
+    else:
+        skip = (page - 1) * page_size
+        if skip >= bits.bit_count():
+            return [], False
+        # Smallest bit position with `skip` IDs below it
+        low, high = 0, bits.bit_length()
+        while low < high:
+            middle = (low + high) // 2
+            if (bits & ((1 << middle) - 1)).bit_count() < skip:
+                low = middle + 1
+            else:
+                high = middle
+        start = low
+    bits = bits >> start << start
+
+    ids = []
+    while bits and len(ids) <= page_size:
+        lowest = bits & -bits
+        ids.append(lowest.bit_length() - 1)
+        bits ^= lowest
+    return ids[:page_size], len(ids) > page_size
+
+
+class FacetIndex:
+    """Genre, year and rating bitmaps over movie IDs"""
+
+    def __init__(self):
+        self._all = 0
+        self._by_genre: Dict[int, int] = {}
+        self._by_year: Dict[int, int] = {}
+        self._by_rating: Dict[float, int] = {}
+        # Sorted keys of _by_rating
+        self._rating_values: List[float] = []
+        self._movies: Dict[int, FacetValues] = {}
+        # Changes committed while a build is running, with their commit's
+        # catalog versions, replayed once it ends
+        self._pending: List[Tuple[int, Optional[FacetValues], Optional[Tuple[str, str]]]] = []
+        self._building = False
+        self._lock = threading.RLock()
+        self.ready = False
+        # Catalog version the index is current at
+        self.version: Optional[str] = None
+
+    def __len__(self) -> int:
+        return len(self._movies)
+
+    def begin_build(self) -> None:
+        """Start queueing changes; call before reading the build rows"""
+        with self._lock:
+            self._building = True
+
+    def begin_rebuild(self) -> bool:
+        """Like begin_build, but False if a build is already running or the
+        last one has just caught up"""
+        with self._lock:
+            if self._building or not self.stale():
+                return False
+            self._building = True
+            return True
+
+    def stale(self) -> bool:
+        """Whether the catalog has changed in ways the index hasn't seen"""
+        return catalog_watcher.moved_since(self.version)
+
+    def cancel_build(self) -> None:
+        """Drop the changes queued for a build that failed"""
+        with self._lock:
+            self._building = False
+            self._pending = []
+
+    def build(self, movie_rows, genre_rows, version: Optional[str] = None) -> None:
+        """
+        Replace the index
+
+        Args:
+            movie_rows: (id, year, rating) rows, rating None when unrated
+            genre_rows: (movie_id, genre_id) rows
+            version: Catalog version read before the rows
+        """
+        movies = {}
+        by_year: Dict[int, List[int]] = {}
+        by_rating: Dict[float, List[int]] = {}
+        for movie_id, year, rating in movie_rows:
+            movies[movie_id] = [year, [], rating]
+            if year is not None:
+                by_year.setdefault(year, []).append(movie_id)
+            if rating is not None:
+                by_rating.setdefault(rating, []).append(movie_id)
+        by_genre: Dict[int, List[int]] = {}
+        for movie_id, genre_id in genre_rows:
+            if movie_id in movies:
+                movies[movie_id][1].append(genre_id)
+                by_genre.setdefault(genre_id, []).append(movie_id)
+
+        with self._lock:
+            self._all = bitmap_from_ids(movies)
+            self._by_genre = {key: bitmap_from_ids(ids) for key, ids in by_genre.items()}
+            self._by_year = {key: bitmap_from_ids(ids) for key, ids in by_year.items()}
+            self._by_rating = {key: bitmap_from_ids(ids) for key, ids in by_rating.items()}
+            self._rating_values = sorted(self._by_rating)
+            self._movies = {
+                movie_id: (year, tuple(sorted(genre_ids)), rating)
+                for movie_id, (year, genre_ids, rating) in movies.items()
+            }
+            self.version = version
+            self.ready = True
+            self._building = False
+            pending, self._pending = self._pending, []
+            for movie_id, values, versions in pending:
+                self._apply(movie_id, values, versions)
+
+    def _apply(self, movie_id: int, values: Optional[FacetValues], versions: Optional[Tuple[str, str]]) -> None:
+        if values is None:
+            self.remove(movie_id)
+        else:
+            self.add(movie_id, *values)
+        self.version = advance_version(self.version, versions)
+
+    def record_change(
+        self,
+        movie_id: int,
+        values: Optional[FacetValues],
+        versions: Optional[Tuple[str, str]] = None
+    ) -> None:
+        """
+        Apply (year, genre_ids, rating), or a removal when values is None
+
+        Args:
+            movie_id: Changed movie
+            values: The movie's new (year, genre_ids, rating)
+            versions: Catalog versions of the commit that made the change
+        """
+        with self._lock:
+            if self._building:
+                self._pending.append((movie_id, values, versions))
+            elif self.ready:
+                self._apply(movie_id, values, versions)
+
+    def add(self, movie_id: int, year: Optional[int], genre_ids: Sequence[int], rating: Optional[float]) -> None:
+        with self._lock:
+            if self._movies.get(movie_id) == (year, tuple(genre_ids), rating):
+                return
+            self.remove(movie_id)
+            bit = 1 << movie_id
+            self._movies[movie_id] = (year, tuple(genre_ids), rating)
+            self._all |= bit
+            for genre_id in genre_ids:
+                self._by_genre[genre_id] = self._by_genre.get(genre_id, 0) | bit
+            if year is not None:
+                self._by_year[year] = self._by_year.get(year, 0) | bit
+            if rating is not None:
+                if rating not in self._by_rating:
+                    bisect.insort(self._rating_values, rating)
+                self._by_rating[rating] = self._by_rating.get(rating, 0) | bit
+
+    def remove(self, movie_id: int) -> None:
+        with self._lock:
+            existing = self._movies.pop(movie_id, None)
+            if existing is None:
+                return
+            year, genre_ids, rating = existing
+            mask = ~(1 << movie_id)
+            self._all &= mask
+            for genre_id in genre_ids:
+                self._by_genre[genre_id] &= mask
+            if year is not None:
+                self._by_year[year] &= mask
+            if rating is not None:
+                self._by_rating[rating] &= mask
+                if not self._by_rating[rating]:
+                    del self._by_rating[rating]
+                    self._rating_values.remove(rating)
+
+    def match(
+        self,
+        genre_groups: Sequence[Sequence[int]] = (),
+        year: Optional[int] = None,
+        min_rating: Optional[float] = None,
+        max_rating: Optional[float] = None
+    ) -> int:
+        """
+        Bitmap of the movies matching every filter
+
+        Args:
+            genre_groups: Lists of genre IDs; a movie must have a genre from
+                each list
+            year: Release year
+            min_rating: Minimum rating (inclusive)
+            max_rating: Maximum rating (inclusive)
+        """
+        with self._lock:
+            bits = self._all
+            for genre_ids in genre_groups:
+                union = 0
+                for genre_id in genre_ids:
+                    union |= self._by_genre.get(genre_id, 0)
+                bits &= union
+            if year is not None:
+                bits &= self._by_year.get(year, 0)
+            if min_rating is not None or max_rating is not None:
+                values = self._rating_values
+                low = bisect.bisect_left(values, min_rating) if min_rating is not None else 0
+                high = bisect.bisect_right(values, max_rating) if max_rating is not None else len(values)
+                union = 0
+                for value in values[low:high]:
+                    union |= self._by_rating[value]
+                bits &= union
+            return bits
+
+
+facet_index = FacetIndex()
+
+_session_factory: Optional[Callable[[], Session]] = None
+
+
+def facet_page(
+    db: Session,
+    filters: MovieFilter,
+    page: int,
+    page_size: int,
+    after_id: Optional[int] = None
+) -> Optional[Tuple[List[int], bool, int]]:
+    """
+    Answer an ID-ordered listing from the facet index
+
+    Args:
+        db: Database session (genre name lookups only)
+        filters: Listing filters
+        page: Page number, used when after_id is None
+        page_size: Movies per page
+        after_id: Keyset pagination: only IDs greater than this
+
+    Returns:
+        The page's IDs, whether more follow and the total number of matches,
+        or None when the listing has to go to SQL (engine disabled, still
+        building or out of date, or a title filter)
+    """
+    if not settings.FACET_ENGINE_ENABLED or not facet_index.ready or filters.title:
+        return None
+    if facet_index.stale():
+        _rebuild_in_background()
+        return None
+
+    genre_groups = []
+    if filters.genre:
+        genre_groups.append(genre_catalog.matching_ids(db, filters.genre))
+    if filters.genre_id is not None:
+        genre_groups.append([filters.genre_id])
+    bits = facet_index.match(
+        genre_groups,
+        year=filters.year or None,
+        min_rating=filters.min_rating,
+        max_rating=filters.max_rating
+    )
+    ids, has_more = page_from_bitmap(bits, page, page_size, after_id)
+    return ids, has_more, bits.bit_count()
+
+
+def build_facet_index(session_factory: Callable[[], Session]) -> None:
+    """Load every movie's year, genres and rating into the facet index"""
+    facet_index.begin_build()
+    db = session_factory()
+    try:
+        version = catalog_tag(db)
+        movie_rows = db.execute(
+            select(Movie.id, Movie.year, Rating.rating).outerjoin(Rating)
+        ).all()
+        genre_rows = db.execute(select(Genre.movie_id, Genre.genre_id)).all()
+        facet_index.build(movie_rows, genre_rows, version)
+        logger.info(f"Facet index ready ({len(facet_index)} movies)")
+    except Exception as e:
+        facet_index.cancel_build()
+        logger.error(f"Error building facet index: {e}")
+    finally:
+        db.close()
+
+
+def start_facet_index(session_factory: Callable[[], Session]) -> threading.Thread:
+    """Build the facet index in the background so startup doesn't wait on it"""
+    global _session_factory
+    _session_factory = session_factory
+    thread = threading.Thread(
+        target=build_facet_index, args=(session_factory,),
+        name="facet-index", daemon=True
+    )
+    thread.start()
+    return thread
+
+
+def _rebuild_in_background() -> None:
+    """Rebuild the out-of-date index unless a build is already running"""
+    if _session_factory is not None and facet_index.begin_rebuild():
+        start_facet_index(_session_factory)
+
+
+@subscribe
+def update_facet_index(before: Optional[MovieSnapshot], after: Optional[MovieSnapshot]) -> None:
+    """Keep the facet bitmaps in line with committed movie changes"""
+    # Also for changes that leave the facets alone, to move the index's version
+    if after is None:
+        facet_index.record_change(before.id, None, committed_versions())
+    else:
+        facet_index.record_change(after.id, (after.year, after.genre_ids, after.rating), committed_versions())
@@ -0,0 +1,153 @@
+"""
+Genre name <-> ID resolution
+
+The genre catalog holds a few dozen rows, so each worker keeps it in memory
+and filters on genre names turn into integer ID lookups. Names are matched
+case-insensitively. Only committed rows read from the database are cached:
+``lookup`` (read routes) keeps the rows it finds, while genres created inside
+a write transaction are resolved from the database until they are committed
+and reloaded; a committed movie change naming an unknown genre triggers that
+reload.
+"""
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+from sqlalchemy import func, insert, select
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+from models import GenreCatalog
+from services.events import MovieSnapshot, subscribe
+
+# Seconds before substring lookups reload the catalog (genres created by
+# other workers)
+CATALOG_REFRESH_SECONDS = 60
+
+Executor = Union[Session, Connection]
+
+
+def _insert_ignoring_duplicates(db: Executor, name: str) -> None:
+    """Insert a catalog name, doing nothing if another writer already did"""
+    dialect = db.get_bind().dialect.name if isinstance(db, Session) else db.dialect.name
+    table = GenreCatalog.__table__
+    if dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        db.execute(dialect_insert(table).values(name=name).on_conflict_do_nothing())
+    elif dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        db.execute(dialect_insert(table).values(name=name).on_conflict_do_nothing())
+    else:
+        db.execute(insert(table).values(name=name))
+
+
+class GenreCatalogCache:
+    """In-memory copy of the genre catalog"""
+
+    def __init__(self):
+        # lowercase name -> (id, name)
+        self._by_name: Dict[str, Tuple[int, str]] = {}
+        self._loaded_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def load(self, db: Executor) -> None:
+        rows = db.execute(select(GenreCatalog.id, GenreCatalog.name)).all()
+        with self._lock:
+            self._by_name = {name.lower(): (genre_id, name) for genre_id, name in rows}
+            self._loaded_at = time.monotonic()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._by_name = {}
+            self._loaded_at = None
+
+    def expire(self) -> None:
+        """Reload the catalog on the next substring lookup"""
+        with self._lock:
+            self._loaded_at = None
+
+    def __contains__(self, name: str) -> bool:
+        return name.strip().lower() in self._by_name
+
+    def _find(self, db: Executor, key: str) -> Optional[Tuple[int, str]]:
+        entry = self._by_name.get(key)
+        if entry is None:
+            row = db.execute(
+                select(GenreCatalog.id, GenreCatalog.name).where(func.lower(GenreCatalog.name) == key)
+            ).first()
+            if row is not None:
+                entry = (row.id, row.name)
+        return entry
+
+    def lookup(self, db: Executor, name: str) -> Optional[Tuple[int, str]]:
+        """
+        (id, canonical name) of a genre, or None if it isn't in the catalog
+
+        Genres found in the database (created by another worker since the
+        last load) are added to the cache, so db must not hold uncommitted
+        catalog rows: read sessions only.
+        """
+        key = name.strip().lower()
+        if key in self._by_name:
+            return self._by_name[key]
+        entry = self._find(db, key)
+        if entry is not None:
+            with self._lock:
+                self._by_name = {**self._by_name, key: entry}
+        return entry
+
+    def matching_ids(self, db: Executor, fragment: str) -> List[int]:
+        """IDs of the genres whose name contains fragment"""
+        if self._loaded_at is None or time.monotonic() - self._loaded_at > CATALOG_REFRESH_SECONDS:
+            self.load(db)
+        fragment = fragment.strip().lower()
+        return sorted(genre_id for key, (genre_id, _) in self._by_name.items() if fragment in key)
+
+    def get_or_create_ids(self, db: Executor, names: Iterable[str]) -> Dict[str, int]:
+        """
+        Resolve genre names to IDs, adding missing names to the catalog
+
+        The new rows are written through db and become permanent when its
+        transaction commits.
+
+        Returns:
+            Mapping of each distinct requested name to its genre ID
+        """
+        resolved = {}
+        for name in names:
+            name = name.strip()
+            if not name or name in resolved:
+                continue
+            # Not cached: the row may be this transaction's own
+            entry = self._find(db, name.lower())
+            if entry is None:
+                _insert_ignoring_duplicates(db, name)
+                entry = self._find(db, name.lower())
+            resolved[name] = entry[0]
+        return resolved
+
+
+genre_catalog = GenreCatalogCache()
+
+
+@subscribe
+def expire_genre_catalog(before: Optional[MovieSnapshot], after: Optional[MovieSnapshot]) -> None:
+    """Pick up genres created by a committed write"""
+    if after is not None and any(name not in genre_catalog for name in after.genres):
+        genre_catalog.expire()
+
+
+class GenreIdConverter:
+    """Seed/import converter from genre names to catalog IDs"""
+
+    def __init__(self, db: Executor):
+        self.db = db
+        self._ids: Dict[str, int] = {}
+
+    def __call__(self, name: str) -> int:
+        key = name.strip()
+        if not key:
+            raise ValueError("empty genre name")
+        genre_id = self._ids.get(key)
+        if genre_id is None:
+            genre_id = genre_catalog.get_or_create_ids(self.db, [key])[key]
+            self._ids[key] = genre_id
+        return genre_id
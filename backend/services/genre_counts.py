@@ -0,0 +1,132 @@
+"""
+Maintained movie counts per genre
+
+``GET /genres`` is answered from an in-memory genre -> movie count map instead
+of a GROUP BY over movie_genres. Genre changes made through the API adjust the
+counts via the movie change feed, which also moves the catalog version
+(services/versions.py) the map is current at. The map is rebuilt from the
+database on the first read after GENRE_COUNTS_RECONCILE_SECONDS, as soon as a
+write uses a genre the map doesn't know yet, or once catalog_watcher sees the
+catalog past that version (a write from another worker or an import). The
+rendered list and its ETag are kept until the counts change.
+"""
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from config import settings
+from models import Genre, GenreCatalog
+from services.events import MovieSnapshot, subscribe
+from services.versions import advance_version, catalog_tag, catalog_watcher, committed_versions
+from utils.etag import compute_etag
+
+
+class GenreCounts:
+    """genre_id -> (name, movie count), kept in step with writes"""
+
+    def __init__(self, reconcile_interval: float):
+        self.reconcile_interval = reconcile_interval
+        self._counts: Dict[int, List] = {}
+        self._reconciled_at: Optional[float] = None
+        # Catalog version the counts are current at
+        self._version: Optional[str] = None
+        # Rendered list sorted by name and its ETag, None after a change
+        self._listing: Optional[Tuple[List[dict], str]] = None
+        # Changes committed while a reconcile is reading the table, with
+        # their commit's catalog versions
+        self._pending: List[Tuple[Sequence[int], Sequence[int], Optional[Tuple[str, str]]]] = []
+        self._reconciling = False
+        self._lock = threading.Lock()
+
+    def reconcile(self, db: Session) -> None:
+        """Recount every genre from movie_genres"""
+        with self._lock:
+            self._reconciling = True
+        try:
+            version = catalog_tag(db)
+            rows = db.execute(
+                select(GenreCatalog.id, GenreCatalog.name, func.count(Genre.movie_id))
+                .join(Genre, Genre.genre_id == GenreCatalog.id)
+                .group_by(GenreCatalog.id, GenreCatalog.name)
+            ).all()
+        except Exception:
+            with self._lock:
+                self._reconciling = False
+                self._pending = []
+            raise
+
+        with self._lock:
+            self._counts = {genre_id: [name, count] for genre_id, name, count in rows}
+            self._reconciled_at = time.monotonic()
+            self._version = version
+            self._listing = None
+            self._reconciling = False
+            pending, self._pending = self._pending, []
+            for removed, added, versions in pending:
+                self._apply(removed, added, versions)
+
+    def _apply(self, removed: Sequence[int], added: Sequence[int], versions: Optional[Tuple[str, str]]) -> None:
+        self._version = advance_version(self._version, versions)
+        if not removed and not added:
+            return
+        for genre_id in removed:
+            if genre_id in self._counts:
+                self._counts[genre_id][1] -= 1
+        for genre_id in added:
+            if genre_id in self._counts:
+                self._counts[genre_id][1] += 1
+            else:
+                # New to the map: its name comes with the next reconcile
+                self._reconciled_at = None
+        self._listing = None
+
+    def record_change(
+        self,
+        removed: Sequence[int],
+        added: Sequence[int],
+        versions: Optional[Tuple[str, str]] = None
+    ) -> None:
+        """
+        Move one movie out of the removed genres and into the added ones
+
+        Args:
+            removed: Genre IDs the movie left
+            added: Genre IDs the movie joined
+            versions: Catalog versions of the commit that made the change
+        """
+        with self._lock:
+            if self._reconciling:
+                self._pending.append((removed, added, versions))
+            elif self._reconciled_at is not None:
+                self._apply(removed, added, versions)
+
+    def listing(self, db: Session) -> Tuple[List[dict], str]:
+        """Genres with at least one movie, sorted by name, and their ETag"""
+        if (
+            self._reconciled_at is None
+            or time.monotonic() - self._reconciled_at > self.reconcile_interval
+            or catalog_watcher.moved_since(self._version)
+        ):
+            self.reconcile(db)
+        with self._lock:
+            if self._listing is None:
+                genres = [
+                    {"id": genre_id, "genre": name, "movie_count": count}
+                    for genre_id, (name, count) in sorted(self._counts.items(), key=lambda item: item[1][0])
+                    if count > 0
+                ]
+                self._listing = (genres, compute_etag(genres))
+            return self._listing
+
+
+genre_counts = GenreCounts(settings.GENRE_COUNTS_RECONCILE_SECONDS)
+
+
+@subscribe
+def update_genre_counts(before: Optional[MovieSnapshot], after: Optional[MovieSnapshot]) -> None:
+    """Apply the genres a committed change added to or removed from a movie"""
+    old = set(before.genre_ids) if before is not None else set()
+    new = set(after.genre_ids) if after is not None else set()
+    # Also for changes that leave the genres alone, to move the map's version
+    genre_counts.record_change(sorted(old - new), sorted(new - old), committed_versions())
@@ -0,0 +1,398 @@
+"""
+Precomputed top-rated leaderboards
+
+Rated movies are kept in ranked lists, one per ranking (plain rating or
+Bayesian weighted rating), scope (all movies, each genre, each decade) and
+minimum-votes bucket (LEADERBOARD_VOTE_BUCKETS). A top-N request reads the
+list of the closest bucket at or below its min_votes from the start and stops
+after N matches, instead of filtering and sorting the ratings table.
+
+Each list only keeps its best LEADERBOARD_LIST_SIZE entries, so a write costs
+a binary search per list and an insert into a short list. Once a list has
+dropped entries it remembers the last key it kept: movies ranking below it
+are left out, and a request that walks past the end of such a list without
+finding N matches goes to SQL.
+
+The weighted rating is IMDb's ``v / (v + m) * R + m / (v + m) * C``: R is the
+movie's rating, v its votes, m LEADERBOARD_PRIOR_VOTES and C the mean rating.
+C is taken when the lists are built and refreshed by a background rebuild every
+LEADERBOARD_REFRESH_SECONDS, so a single write never re-sorts the lists.
+
+The lists are built in a background thread at startup and updated by the
+movie change feed; requests are answered from SQL until they are ready. They
+also track the catalog version (services/versions.py) they are current at,
+moving it along with the changes they apply; once catalog_watcher sees the
+catalog past it, because of a write from another worker or an import,
+requests go to SQL while the lists are rebuilt in the background.
+"""
+import bisect
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Hashable, List, Optional, Sequence, Tuple
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from config import settings
+from models import Movie, Genre, Rating
+from services.events import MovieSnapshot, subscribe
+from services.versions import advance_version, catalog_tag, catalog_watcher, committed_versions
+from utils.logging import logger
+
+RANKINGS = ("rating", "weighted")
+
+
+@dataclass(frozen=True)
+class RankedMovie:
+    """What a leaderboard needs to know about one rated movie"""
+    id: int
+    title: str
+    year: Optional[int]
+    duration: Optional[int]
+    rating: float
+    vote_count: int
+    genre_ids: Tuple[int, ...] = ()
+
+    @property
+    def decade(self) -> Optional[int]:
+        return self.year // 10 * 10 if self.year is not None else None
+
+
+def weighted_rating(rating: float, votes: int, prior_votes: int, mean: float) -> float:
+    """Bayesian average of a rating towards the mean rating"""
+    return (votes * rating + prior_votes * mean) / (votes + prior_votes)
+
+
+class Leaderboard:
+    """Ranked lists of rated movies per ranking, scope and vote bucket"""
+
+    def __init__(self, vote_buckets: Sequence[int], prior_votes: int, list_size: int, refresh_seconds: float):
+        # 0 keeps a list of every rated movie
+        self.vote_buckets = sorted(set(vote_buckets) | {0})
+        self.prior_votes = prior_votes
+        self.list_size = list_size
+        self.refresh_seconds = refresh_seconds
+        self.mean = 0.0
+        self._movies: Dict[int, RankedMovie] = {}
+        # (ranking, scope, bucket) -> sorted (-score, -votes, id) keys
+        self._lists: Dict[Tuple[str, Hashable, int], List[tuple]] = {}
+        # Lists that dropped entries -> last key kept; every movie left out
+        # of the list ranks below it
+        self._cutoffs: Dict[Tuple[str, Hashable, int], tuple] = {}
+        # Changes committed while a build is running, with their commit's
+        # catalog versions, replayed once it ends
+        self._pending: List[Tuple[int, Optional[RankedMovie], Optional[Tuple[str, str]]]] = []
+        self._building = False
+        self._lock = threading.RLock()
+        self.built_at: Optional[float] = None
+        self.ready = False
+        # Catalog version the lists are current at
+        self.version: Optional[str] = None
+
+    def __len__(self) -> int:
+        return len(self._movies)
+
+    def _score(self, ranking: str, movie: RankedMovie) -> float:
+        if ranking == "weighted":
+            return weighted_rating(movie.rating, movie.vote_count, self.prior_votes, self.mean)
+        return movie.rating
+
+    def _placements(self, movie: RankedMovie):
+        """(list key, sort key) of every list the movie belongs to"""
+        scopes: List[Hashable] = [None]
+        scopes.extend(("genre", genre_id) for genre_id in movie.genre_ids)
+        if movie.decade is not None:
+            scopes.append(("decade", movie.decade))
+        buckets = [bucket for bucket in self.vote_buckets if movie.vote_count >= bucket]
+        for ranking in RANKINGS:
+            sort_key = (-self._score(ranking, movie), -movie.vote_count, movie.id)
+            for scope in scopes:
+                for bucket in buckets:
+                    yield (ranking, scope, bucket), sort_key
+
+    def begin_build(self) -> None:
+        """Start queueing changes; call before reading the build rows"""
+        with self._lock:
+            self._building = True
+
+    def claim_refresh(self) -> bool:
+        """
+        Start queueing changes for a rebuild when one is due
+
+        Returns:
+            True when the caller should run the rebuild: the lists are stale
+            or older than refresh_seconds, and no build is running
+        """
+        with self._lock:
+            if self._building or not self.ready:
+                return False
+            if not self.stale() and time.monotonic() - self.built_at <= self.refresh_seconds:
+                return False
+            self._building = True
+            return True
+
+    def stale(self) -> bool:
+        """Whether the catalog has changed in ways the lists haven't seen"""
+        return catalog_watcher.moved_since(self.version)
+
+    def cancel_build(self) -> None:
+        """Drop the changes queued for a build that failed"""
+        with self._lock:
+            self._building = False
+            self._pending = []
+
+    def build(self, movies: Sequence[RankedMovie], version: Optional[str] = None) -> None:
+        """Replace every list with movies read at the given catalog version"""
+        mean = sum(movie.rating for movie in movies) / len(movies) if movies else 0.0
+        with self._lock:
+            self.mean = mean
+            lists: Dict[Tuple[str, Hashable, int], List[tuple]] = {}
+            for movie in movies:
+                for list_key, sort_key in self._placements(movie):
+                    lists.setdefault(list_key, []).append(sort_key)
+            cutoffs = {}
+            for list_key, ranked in lists.items():
+                ranked.sort()
+                if len(ranked) > self.list_size:
+                    del ranked[self.list_size:]
+                    cutoffs[list_key] = ranked[-1]
+            self._lists = lists
+            self._cutoffs = cutoffs
+            self._movies = {movie.id: movie for movie in movies}
+            self.built_at = time.monotonic()
+            self.version = version
+            self.ready = True
+            self._building = False
+            pending, self._pending = self._pending, []
+            for movie_id, movie, versions in pending:
+                self._apply(movie_id, movie, versions)
+
+    def _apply(self, movie_id: int, movie: Optional[RankedMovie], versions: Optional[Tuple[str, str]]) -> None:
+        if self._movies.get(movie_id) != movie:
+            self.remove(movie_id)
+            if movie is not None:
+                self.add(movie)
+        self.version = advance_version(self.version, versions)
+
+    def record_change(
+        self,
+        movie_id: int,
+        movie: Optional[RankedMovie],
+        versions: Optional[Tuple[str, str]] = None
+    ) -> None:
+        """
+        Replace a movie's entry; None removes it (deleted or unrated)
+
+        Args:
+            movie_id: Changed movie
+            movie: The movie's new entry
+            versions: Catalog versions of the commit that made the change
+        """
+        with self._lock:
+            if self._building:
+                self._pending.append((movie_id, movie, versions))
+            elif self.ready:
+                self._apply(movie_id, movie, versions)
+
+    def add(self, movie: RankedMovie) -> None:
+        with self._lock:
+            self._movies[movie.id] = movie
+            for list_key, sort_key in self._placements(movie):
+                cutoff = self._cutoffs.get(list_key)
+                if cutoff is not None and sort_key > cutoff:
+                    continue
+                ranked = self._lists.setdefault(list_key, [])
+                bisect.insort(ranked, sort_key)
+                if len(ranked) > self.list_size:
+                    ranked.pop()
+                    self._cutoffs[list_key] = ranked[-1]
+
+    def remove(self, movie_id: int) -> None:
+        with self._lock:
+            movie = self._movies.pop(movie_id, None)
+            if movie is None:
+                return
+            for list_key, sort_key in self._placements(movie):
+                ranked = self._lists.get(list_key, [])
+                position = bisect.bisect_left(ranked, sort_key)
+                if position < len(ranked) and ranked[position] == sort_key:
+                    del ranked[position]
+
+    def top(
+        self,
+        limit: int,
+        min_votes: int,
+        genre_id: Optional[int] = None,
+        decade: Optional[int] = None,
+        ranking: str = "rating"
+    ) -> Optional[List[dict]]:
+        """
+        Best ranked movies
+
+        Args:
+            limit: Number of movies
+            min_votes: Minimum vote count
+            genre_id: Only movies with this catalog genre
+            decade: Only movies released in this decade (e.g. 1990)
+            ranking: "rating" or "weighted"
+
+        Returns:
+            The movies, or None when the kept entries run out before limit
+            matches and the rest of the list has to come from SQL
+        """
+        bucket = self.vote_buckets[bisect.bisect_right(self.vote_buckets, min_votes) - 1]
+        if genre_id is not None:
+            scope = ("genre", genre_id)
+        elif decade is not None:
+            scope = ("decade", decade)
+        else:
+            scope = None
+
+        list_key = (ranking, scope, bucket)
+        results = []
+        with self._lock:
+            for sort_key in self._lists.get(list_key, []):
+                movie = self._movies[sort_key[-1]]
+                if movie.vote_count < min_votes:
+                    continue
+                if decade is not None and movie.decade != decade:
+                    continue
+                result = {
+                    "id": movie.id,
+                    "title": movie.title,
+                    "year": movie.year,
+                    "duration": movie.duration,
+                    "average_rating": movie.rating,
+                    "vote_count": movie.vote_count
+                }
+                if ranking == "weighted":
+                    result["weighted_rating"] = round(-sort_key[0], 3)
+                results.append(result)
+                if len(results) >= limit:
+                    return results
+            if list_key in self._cutoffs:
+                return None
+        return results
+
+
+leaderboard = Leaderboard(
+    settings.LEADERBOARD_VOTE_BUCKETS, settings.LEADERBOARD_PRIOR_VOTES,
+    settings.LEADERBOARD_LIST_SIZE, settings.LEADERBOARD_REFRESH_SECONDS
+)
+
+_session_factory: Optional[Callable[[], Session]] = None
+
+
+def build_leaderboard(session_factory: Callable[[], Session]) -> None:
+    """Load every rated movie into the leaderboard"""
+    leaderboard.begin_build()
+    db = session_factory()
+    try:
+        version = catalog_tag(db)
+        rows = db.execute(
+            select(Movie.id, Movie.title, Movie.year, Movie.duration, Rating.rating, Rating.vote_count).join(Rating)
+        ).all()
+        genre_ids: Dict[int, List[int]] = {}
+        for movie_id, genre_id in db.execute(select(Genre.movie_id, Genre.genre_id)):
+            genre_ids.setdefault(movie_id, []).append(genre_id)
+        leaderboard.build([
+            RankedMovie(
+                id=movie_id, title=title, year=year, duration=duration,
+                rating=rating, vote_count=vote_count or 0,
+                genre_ids=tuple(sorted(genre_ids.get(movie_id, ())))
+            )
+            for movie_id, title, year, duration, rating, vote_count in rows
+        ], version)
+        logger.info(f"Leaderboards ready ({len(leaderboard)} rated movies)")
+    except Exception as e:
+        leaderboard.cancel_build()
+        logger.error(f"Error building leaderboards: {e}")
+    finally:
+        db.close()
+
+
+def start_leaderboard(session_factory: Callable[[], Session]) -> threading.Thread:
+    """Build the leaderboards in the background so startup doesn't wait on it"""
+    global _session_factory
+    _session_factory = session_factory
+    thread = threading.Thread(
+        target=build_leaderboard, args=(session_factory,),
+        name="leaderboard", daemon=True
+    )
+    thread.start()
+    return thread
+
+
+def top_from_database(
+    db: Session,
+    limit: int,
+    min_votes: int,
+    genre_id: Optional[int] = None,
+    decade: Optional[int] = None,
+    ranking: str = "rating"
+) -> List[dict]:
+    """Fallback used while the leaderboards are being built or out of date"""
+    query = select(
+        Movie.id, Movie.title, Movie.year, Movie.duration, Rating.rating, Rating.vote_count
+    ).join(Rating).where(Rating.vote_count >= min_votes)
+    if genre_id is not None:
+        query = query.where(Movie.genres.any(Genre.genre_id == genre_id))
+    if decade is not None:
+        query = query.where(Movie.year >= decade, Movie.year < decade + 10)
+
+    if ranking == "weighted":
+        mean = db.execute(select(func.avg(Rating.rating))).scalar() or 0.0
+        prior = settings.LEADERBOARD_PRIOR_VOTES
+        score = (Rating.vote_count * Rating.rating + prior * mean) / (Rating.vote_count + prior)
+        query = query.add_columns(score.label("score")).order_by(score.desc(), Rating.vote_count.desc(), Movie.id)
+    else:
+        query = query.order_by(Rating.rating.desc(), Rating.vote_count.desc(), Movie.id)
+
+    results = []
+    for row in db.execute(query.limit(limit)):
+        result = {
+            "id": row.id,
+            "title": row.title,
+            "year": row.year,
+            "duration": row.duration,
+            "average_rating": row.rating,
+            "vote_count": row.vote_count
+        }
+        if ranking == "weighted":
+            result["weighted_rating"] = round(row.score, 3)
+        results.append(result)
+    return results
+
+
+def top_rated(
+    db: Session,
+    limit: int,
+    min_votes: int,
+    genre_id: Optional[int] = None,
+    decade: Optional[int] = None,
+    ranking: str = "rating"
+) -> List[dict]:
+    """Top-N movies from the leaderboards, or from SQL when they can't answer"""
+    if not leaderboard.ready:
+        return top_from_database(db, limit, min_votes, genre_id, decade, ranking)
+    # Rebuilds also refresh the mean rating of the weighted ranking
+    if _session_factory is not None and leaderboard.claim_refresh():
+        start_leaderboard(_session_factory)
+    results = None if leaderboard.stale() else leaderboard.top(limit, min_votes, genre_id, decade, ranking)
+    if results is None:
+        return top_from_database(db, limit, min_votes, genre_id, decade, ranking)
+    return results
+
+
+@subscribe
+def update_leaderboard(before: Optional[MovieSnapshot], after: Optional[MovieSnapshot]) -> None:
+    """Keep the ranked lists in line with committed movie changes"""
+    if after is None:
+        leaderboard.record_change(before.id, None, committed_versions())
+        return
+    if after.rating is None:
+        leaderboard.record_change(after.id, None, committed_versions())
+        return
+    leaderboard.record_change(after.id, RankedMovie(
+        id=after.id, title=after.title, year=after.year, duration=after.duration,
+        rating=after.rating, vote_count=after.vote_count or 0, genre_ids=after.genre_ids
+    ), committed_versions())
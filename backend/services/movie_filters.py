@@ -0,0 +1,52 @@
+"""
+Filter predicates for movie listings
+
+Filters are expressed against Movie alone (genre and rating conditions become
+EXISTS subqueries), so they can be reused by count queries and ID-only page
+queries without joins that multiply rows. Genre names are resolved to catalog
+IDs first, so the database only compares integers.
+"""
+from typing import Hashable, List, Tuple
+from sqlalchemy import and_, false
+from sqlalchemy.orm import Session
+from models import Movie, Genre, Rating
+from schemas import MovieFilter
+from services.genre_catalog import genre_catalog
+from services.search import title_search_predicate
+
+
+def normalize_filter(filters: MovieFilter) -> Tuple[Hashable, ...]:
+    """Hashable key identifying a filter set (case-insensitive text filters)"""
+    return (
+        filters.title.strip().lower() if filters.title else None,
+        filters.title_match,
+        filters.year,
+        filters.genre.strip().lower() if filters.genre else None,
+        filters.genre_id,
+        filters.min_rating,
+        filters.max_rating,
+    )
+
+
+def build_movie_predicates(db: Session, filters: MovieFilter) -> List:
+    """SQL conditions on Movie matching the given filters"""
+    predicates = []
+    if filters.title:
+        # Word-prefix match through the full-text index
+        predicates.append(title_search_predicate(db, filters.title, filters.title_match))
+    if filters.year:
+        predicates.append(Movie.year == filters.year)
+    if filters.genre:
+        # Substring match on the catalog names, done in memory
+        genre_ids = genre_catalog.matching_ids(db, filters.genre)
+        predicates.append(Movie.genres.any(Genre.genre_id.in_(genre_ids)) if genre_ids else false())
+    if filters.genre_id is not None:
+        predicates.append(Movie.genres.any(Genre.genre_id == filters.genre_id))
+    if filters.min_rating is not None or filters.max_rating is not None:
+        conditions = []
+        if filters.min_rating is not None:
+            conditions.append(Rating.rating >= filters.min_rating)
+        if filters.max_rating is not None:
+            conditions.append(Rating.rating <= filters.max_rating)
+        predicates.append(Movie.rating.has(and_(*conditions)))
+    return predicates
@@ -0,0 +1,122 @@
+"""
+Two-phase page loading for movie listings
+
+Phase one selects only the page of Movie.id values, using the filter
+predicates and the primary key index. Phase two loads the movies of that page
+with their ratings and genres in batched IN queries. Page cost depends on the
+page size, not on how many genre rows the filters fan out to.
+
+Phase two fetches plain column tuples and shapes them into dicts ready for
+JSON encoding, without building ORM objects or per-row Pydantic models.
+"""
+from typing import Dict, List, Optional, Sequence, Tuple
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from models import Movie, Genre, GenreCatalog, Rating
+
+
+def fetch_page_ids(
+    db: Session,
+    predicates: Sequence,
+    page: int,
+    page_size: int,
+    after_id: Optional[int] = None
+) -> Tuple[List[int], bool]:
+    """
+    Select the movie IDs of one page, ordered by ID
+
+    Args:
+        db: Database session
+        predicates: Conditions on Movie (see services.movie_filters)
+        page: Page number, used when after_id is None
+        page_size: Movies per page
+        after_id: Keyset pagination: only IDs greater than this
+
+    Returns:
+        The page's IDs and whether more movies follow
+    """
+    query = select(Movie.id).where(*predicates).order_by(Movie.id)
+    if after_id is not None:
+        query = query.where(Movie.id > after_id)
+    else:
+        query = query.offset((page - 1) * page_size)
+
+    # One extra row tells whether another page follows
+    ids = list(db.execute(query.limit(page_size + 1)).scalars())
+    return ids[:page_size], len(ids) > page_size
+
+
+def _genre_rows(db: Session, ids: Sequence[int]) -> Dict[int, List[Tuple[int, str]]]:
+    """(genre ID, name) pairs of each movie, by genre ID"""
+    genres: Dict[int, List[Tuple[int, str]]] = {}
+    rows = db.execute(
+        select(Genre.movie_id, Genre.genre_id, GenreCatalog.name)
+        .join(GenreCatalog, GenreCatalog.id == Genre.genre_id)
+        .where(Genre.movie_id.in_(ids))
+        .order_by(Genre.movie_id, Genre.genre_id)
+    )
+    for movie_id, genre_id, name in rows:
+        genres.setdefault(movie_id, []).append((genre_id, name))
+    return genres
+
+
+def load_movie_summaries(db: Session, ids: Sequence[int]) -> List[dict]:
+    """MovieSummary-shaped dicts for the given IDs, preserving their order"""
+    if not ids:
+        return []
+    rows = db.execute(
+        select(Movie.id, Movie.title, Movie.year, Movie.duration, Rating.rating, Rating.vote_count)
+        .outerjoin(Rating)
+        .where(Movie.id.in_(ids))
+    ).all()
+    genres = _genre_rows(db, ids)
+    by_id = {
+        movie_id: {
+            "id": movie_id,
+            "title": title,
+            "year": year,
+            "duration": duration,
+            "average_rating": rating,
+            "vote_count": vote_count,
+            "genres": [name for _, name in genres.get(movie_id, ())]
+        }
+        for movie_id, title, year, duration, rating, vote_count in rows
+    }
+    return [by_id[movie_id] for movie_id in ids if movie_id in by_id]
+
+
+def load_movie_detail(db: Session, movie_id: int) -> Optional[dict]:
+    """MovieResponse-shaped dict of one movie, None if it doesn't exist"""
+    # One row per genre (one row without genres), in a single query
+    rows = db.execute(
+        select(
+            Movie.title, Movie.year, Movie.duration,
+            Rating.id, Rating.rating, Rating.vote_count,
+            Genre.genre_id, GenreCatalog.name
+        )
+        .outerjoin(Rating)
+        .outerjoin(Genre, Genre.movie_id == Movie.id)
+        .outerjoin(GenreCatalog, GenreCatalog.id == Genre.genre_id)
+        .where(Movie.id == movie_id)
+        .order_by(Genre.genre_id)
+    ).all()
+    if not rows:
+        return None
+    title, year, duration, rating_id, rating, vote_count, _, _ = rows[0]
+    return {
+        "title": title,
+        "year": year,
+        "duration": duration,
+        "id": movie_id,
+        "genres": [
+            {"genre": name, "genre_id": genre_id, "movie_id": movie_id, "id": genre_id}
+            for *_, genre_id, name in rows
+            if genre_id is not None
+        ],
+        "rating": {
+            "rating": rating,
+            "vote_count": vote_count,
+            "id": rating_id,
+            "movie_id": movie_id
+        } if rating_id is not None else None
+    }
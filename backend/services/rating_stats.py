@@ -0,0 +1,162 @@
+"""
+Maintained rating aggregates
+
+Keeps how many ratings have each distinct rating value, plus the running
+vote total, in memory. Statistics (count, average, min, max) and the
+per-point distribution are derived from those few dozen counters instead of
+scanning the ratings table. Rating changes made through the API adjust the
+counters via the movie change feed, which also moves the catalog version
+(services/versions.py) the counters are current at. A full reconcile from the
+database runs on the first read after RATING_STATS_RECONCILE_SECONDS, or once
+catalog_watcher sees the catalog past that version, which picks up bulk
+imports and writes handled by other workers.
+"""
+import math
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from config import settings
+from models import Rating
+from services.events import MovieSnapshot, subscribe
+from services.versions import advance_version, catalog_tag, catalog_watcher, committed_versions
+
+
+class RatingAggregates:
+    """Rating value counts and vote total, kept in step with writes"""
+
+    def __init__(self, reconcile_interval: float):
+        self.reconcile_interval = reconcile_interval
+        # rating value -> number of movies with that rating
+        self._values: Counter = Counter()
+        self._votes = 0
+        self._reconciled_at: Optional[float] = None
+        # Catalog version the counters are current at
+        self._version: Optional[str] = None
+        # Changes committed while a reconcile is reading the table, with
+        # their commit's catalog versions
+        self._pending: List[Tuple[Optional[tuple], Optional[tuple], Optional[Tuple[str, str]]]] = []
+        self._reconciling = False
+        self._lock = threading.Lock()
+
+    def reconcile(self, db: Session) -> None:
+        """Recompute every counter from the ratings table"""
+        with self._lock:
+            self._reconciling = True
+        try:
+            version = catalog_tag(db)
+            rows = db.execute(
+                select(Rating.rating, func.count(), func.sum(Rating.vote_count)).group_by(Rating.rating)
+            ).all()
+        except Exception:
+            with self._lock:
+                self._reconciling = False
+                self._pending = []
+            raise
+
+        with self._lock:
+            self._values = Counter({rating: count for rating, count, _ in rows})
+            self._votes = sum(votes or 0 for _, _, votes in rows)
+            self._reconciled_at = time.monotonic()
+            self._version = version
+            self._reconciling = False
+            pending, self._pending = self._pending, []
+            for before, after, versions in pending:
+                self._apply(before, after, versions)
+
+    def _stale(self) -> bool:
+        return (
+            self._reconciled_at is None
+            or time.monotonic() - self._reconciled_at > self.reconcile_interval
+            or catalog_watcher.moved_since(self._version)
+        )
+
+    def _apply(self, before: Optional[tuple], after: Optional[tuple], versions: Optional[Tuple[str, str]]) -> None:
+        self._version = advance_version(self._version, versions)
+        if before == after:
+            return
+        if before is not None:
+            rating, votes = before
+            self._values[rating] -= 1
+            if self._values[rating] <= 0:
+                del self._values[rating]
+            self._votes -= votes or 0
+        if after is not None:
+            rating, votes = after
+            self._values[rating] += 1
+            self._votes += votes or 0
+
+    def record_change(
+        self,
+        before: Optional[tuple],
+        after: Optional[tuple],
+        versions: Optional[Tuple[str, str]] = None
+    ) -> None:
+        """
+        Replace a (rating, vote_count) pair; None for no rating
+
+        Args:
+            before: The movie's old pair
+            after: The movie's new pair
+            versions: Catalog versions of the commit that made the change
+        """
+        with self._lock:
+            if self._reconciling:
+                self._pending.append((before, after, versions))
+            elif self._reconciled_at is not None:
+                self._apply(before, after, versions)
+
+    def _current(self, db: Session) -> Tuple[Dict[float, int], int]:
+        if self._stale():
+            self.reconcile(db)
+        with self._lock:
+            return dict(self._values), self._votes
+
+    def statistics(self, db: Session) -> dict:
+        """Same figures as an avg/min/max/count/sum over the ratings table"""
+        values, votes = self._current(db)
+        count = sum(values.values())
+        if not count:
+            return {
+                "average_rating": 0,
+                "min_rating": 0,
+                "max_rating": 0,
+                "total_movies_with_ratings": 0,
+                "total_votes": None
+            }
+        average = math.fsum(rating * movies for rating, movies in values.items()) / count
+        return {
+            "average_rating": round(average, 2) if average else 0,
+            "min_rating": float(min(values)) if min(values) else 0,
+            "max_rating": float(max(values)) if max(values) else 0,
+            "total_movies_with_ratings": count,
+            "total_votes": votes
+        }
+
+    def distribution(self, db: Session) -> List[dict]:
+        """Movie counts per whole rating point, lowest first"""
+        values, _ = self._current(db)
+        buckets: Counter = Counter()
+        for rating, movies in values.items():
+            buckets[math.floor(rating)] += movies
+        return [
+            {
+                "rating_range": f"{bucket}-{bucket + 1}",
+                "count": buckets[bucket]
+            }
+            for bucket in sorted(buckets)
+        ]
+
+
+rating_aggregates = RatingAggregates(settings.RATING_STATS_RECONCILE_SECONDS)
+
+
+@subscribe
+def update_rating_aggregates(before: Optional[MovieSnapshot], after: Optional[MovieSnapshot]) -> None:
+    """Move the counters from a movie's old rating to its new one"""
+    old = (before.rating, before.vote_count) if before is not None and before.rating is not None else None
+    new = (after.rating, after.vote_count) if after is not None and after.rating is not None else None
+    # Also for changes that leave the rating alone, to move the counters' version
+    rating_aggregates.record_change(old, new, committed_versions())
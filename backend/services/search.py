@@ -0,0 +1,186 @@
+"""
+Full-text title search
+
+On SQLite the titles are indexed in an FTS5 table (``movies_fts``) that uses
+``movies`` as its external content and is kept in sync by triggers, so every
+write path (API, seeding, bulk imports) updates it. Queries are split into
+word tokens; prefix mode matches words starting with each token, token mode
+matches whole words. Results can be ordered by bm25 relevance.
+
+Other databases, or SQLite builds without FTS5, fall back to word-prefix
+LIKE patterns with a simple exact/prefix/contains relevance order.
+"""
+import re
+from typing import List, Optional, Sequence, Tuple
+from sqlalchemy import and_, case, false, func, literal_column, or_, select, table, column, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+from models import Movie
+from utils.logging import logger
+
+SEARCH_MODES = ("prefix", "token")
+
+FTS_TABLE = "movies_fts"
+fts = table(FTS_TABLE, column("rowid"), column("title"), column("rank"))
+
+# None until checked: whether movies_fts exists in the database in use
+_fts_available: Optional[bool] = None
+
+_CREATE_FTS = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        title,
+        content='movies',
+        content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS movies_fts_insert AFTER INSERT ON movies BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title) VALUES (new.id, new.title);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS movies_fts_delete AFTER DELETE ON movies BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title) VALUES ('delete', old.id, old.title);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS movies_fts_update AFTER UPDATE OF title ON movies BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title) VALUES ('delete', old.id, old.title);
+        INSERT INTO {FTS_TABLE}(rowid, title) VALUES (new.id, new.title);
+    END""",
+]
+
+
+def ensure_search_index(connection: Connection, rebuild: bool = False) -> bool:
+    """
+    Create the FTS5 index and its sync triggers if they don't exist
+
+    Args:
+        connection: Connection inside the bootstrap transaction
+        rebuild: Re-index every title from the movies table
+
+    Returns:
+        Whether full-text search is available
+    """
+    global _fts_available
+    if connection.dialect.name != "sqlite":
+        _fts_available = False
+        return False
+
+    try:
+        for statement in _CREATE_FTS:
+            connection.exec_driver_sql(statement)
+    except Exception as e:
+        logger.warning(f"SQLite FTS5 unavailable, title search falls back to LIKE: {e}")
+        _fts_available = False
+        return False
+
+    if rebuild:
+        logger.info("Rebuilding the title search index")
+        connection.exec_driver_sql(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+    _fts_available = True
+    return True
+
+
+def search_index_available(db: Session) -> bool:
+    """Whether the movies_fts table can be used (checked once per process)"""
+    global _fts_available
+    if _fts_available is None:
+        bind = db.get_bind()
+        if bind.dialect.name != "sqlite":
+            _fts_available = False
+        else:
+            _fts_available = db.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                {"name": FTS_TABLE}
+            ).first() is not None
+    return _fts_available
+
+
+def tokenize_query(query: str) -> List[str]:
+    """Split a search string into lowercase word tokens"""
+    return re.findall(r"\w+", query.lower())
+
+
+def _fts_match_expression(tokens: Sequence[str], mode: str) -> str:
+    """FTS5 MATCH expression requiring every token"""
+    suffix = "*" if mode == "prefix" else ""
+    return " ".join(f'"{token}"{suffix}' for token in tokens)
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _fallback_predicate(tokens: Sequence[str], mode: str):
+    """Portable word-boundary LIKE conditions requiring every token"""
+    lowered = func.lower(Movie.title)
+    conditions = []
+    for token in tokens:
+        escaped = _escape_like(token)
+        if mode == "prefix":
+            patterns = [f"{escaped}%", f"% {escaped}%"]
+        else:
+            patterns = [escaped, f"{escaped} %", f"% {escaped}", f"% {escaped} %"]
+        conditions.append(or_(*[lowered.like(pattern, escape="\\") for pattern in patterns]))
+    return and_(*conditions)
+
+
+def title_search_predicate(db: Session, query: str, mode: str = "prefix"):
+    """
+    Condition on Movie matching a title search
+
+    A query without searchable words (only punctuation) matches nothing.
+    """
+    tokens = tokenize_query(query)
+    if not tokens:
+        return false()
+    if search_index_available(db):
+        matching_ids = select(fts.c.rowid).where(
+            literal_column(FTS_TABLE).op("MATCH")(_fts_match_expression(tokens, mode))
+        )
+        return Movie.id.in_(matching_ids)
+    return _fallback_predicate(tokens, mode)
+
+
+def search_page_ids(
+    db: Session,
+    query: str,
+    predicates: Sequence,
+    page: int,
+    page_size: int,
+    mode: str = "prefix"
+) -> Tuple[List[int], bool]:
+    """
+    Select one page of movie IDs matching a title search, best matches first
+
+    Args:
+        db: Database session
+        query: Search string
+        predicates: Additional conditions on Movie (other listing filters)
+        page: Page number
+        page_size: Movies per page
+        mode: "prefix" or "token"
+
+    Returns:
+        The page's IDs and whether more matches follow
+    """
+    tokens = tokenize_query(query)
+    if not tokens:
+        return [], False
+
+    if search_index_available(db):
+        statement = select(Movie.id).join(fts, fts.c.rowid == Movie.id).where(
+            literal_column(FTS_TABLE).op("MATCH")(_fts_match_expression(tokens, mode)),
+            *predicates
+        ).order_by(fts.c.rank, Movie.id)
+    else:
+        lowered_query = " ".join(tokens)
+        relevance = case(
+            (func.lower(Movie.title) == lowered_query, 0),
+            (func.lower(Movie.title).like(f"{_escape_like(lowered_query)}%", escape="\\"), 1),
+            else_=2
+        )
+        statement = select(Movie.id).where(
+            _fallback_predicate(tokens, mode),
+            *predicates
+        ).order_by(relevance, func.length(Movie.title), Movie.id)
+
+    statement = statement.offset((page - 1) * page_size).limit(page_size + 1)
+    ids = list(db.execute(statement).scalars())
+    return ids[:page_size], len(ids) > page_size
@@ -0,0 +1,266 @@
+"""
+Title typeahead backed by an in-process prefix index
+
+Normalized titles (lowercase, no accents, punctuation collapsed) are kept in a
+sorted list; a prefix lookup is a binary search plus a scan of the matching
+range, ranked by vote count. Titles starting with an article are also indexed
+without it, so "godfather" finds "The Godfather". The index is built from the
+database in a background thread at startup and then kept up to date by the
+movie change feed; until it is ready, suggestions come from the database. The
+index also tracks the catalog version (services/versions.py) it is current
+at, moving it along with the changes it applies; once catalog_watcher sees the
+catalog past it, because of a write from another worker or an import,
+suggestions come from the database again while the index is rebuilt in the
+background.
+"""
+import bisect
+import heapq
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from models import Movie, Rating
+from services.events import MovieSnapshot, subscribe
+from services.search import title_search_predicate, tokenize_query
+from services.versions import advance_version, catalog_tag, catalog_watcher, committed_versions
+from utils.logging import logger
+
+_LEADING_ARTICLES = ("the ", "a ", "an ", "la ", "el ", "le ", "les ", "los ", "las ", "l ", "il ", "der ", "die ", "das ")
+
+# Prefix results kept between writes
+_RESULT_CACHE_SIZE = 2048
+
+
+def normalize_title(title: str) -> str:
+    """Lowercase, strip accents and collapse everything but letters and digits"""
+    decomposed = unicodedata.normalize("NFKD", title.lower())
+    without_marks = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return re.sub(r"[^\w]+", " ", without_marks).strip()
+
+
+def _index_keys(normalized: str) -> List[str]:
+    keys = [normalized]
+    for article in _LEADING_ARTICLES:
+        if normalized.startswith(article) and len(normalized) > len(article):
+            keys.append(normalized[len(article):])
+            break
+    return keys
+
+
+class TitleSuggester:
+    """Sorted-array prefix index over movie titles"""
+
+    def __init__(self):
+        # Sorted (key, movie_id) pairs
+        self._entries: List[Tuple[str, int]] = []
+        # movie_id -> (title, year, vote_count, keys)
+        self._movies: Dict[int, Tuple[str, Optional[int], int, List[str]]] = {}
+        self._results: "OrderedDict[Tuple[str, int], List[dict]]" = OrderedDict()
+        # Changes committed while a build is running, with their commit's
+        # catalog versions, replayed once it ends
+        self._pending: List[Tuple[int, Optional[tuple], Optional[Tuple[str, str]]]] = []
+        self._building = False
+        self._lock = threading.RLock()
+        self.ready = False
+        # Catalog version the index is current at
+        self.version: Optional[str] = None
+
+    def __len__(self) -> int:
+        return len(self._movies)
+
+    def begin_rebuild(self) -> bool:
+        """Start queueing changes for a rebuild, False if one is already
+        running or the last one has just caught up"""
+        with self._lock:
+            if self._building or not self.stale():
+                return False
+            self._building = True
+            return True
+
+    def cancel_build(self) -> None:
+        """Drop the changes queued for a build that failed"""
+        with self._lock:
+            self._building = False
+            self._pending = []
+
+    def stale(self) -> bool:
+        """Whether the catalog has changed in ways the index hasn't seen"""
+        return catalog_watcher.moved_since(self.version)
+
+    def build(self, rows, version: Optional[str] = None) -> None:
+        """Replace the index with (id, title, year, vote_count) rows read at version"""
+        movies = {}
+        entries = []
+        for movie_id, title, year, vote_count in rows:
+            keys = _index_keys(normalize_title(title))
+            movies[movie_id] = (title, year, vote_count or 0, keys)
+            entries.extend((key, movie_id) for key in keys)
+        entries.sort()
+        with self._lock:
+            self._movies = movies
+            self._entries = entries
+            self._results.clear()
+            self.version = version
+            self.ready = True
+            self._building = False
+            pending, self._pending = self._pending, []
+            for movie_id, values, versions in pending:
+                self._apply(movie_id, values, versions)
+
+    def _apply(self, movie_id: int, values: Optional[tuple], versions: Optional[Tuple[str, str]]) -> None:
+        if values is None:
+            self.remove(movie_id)
+        else:
+            self.add(movie_id, *values)
+        self.version = advance_version(self.version, versions)
+
+    def record_change(
+        self,
+        movie_id: int,
+        values: Optional[tuple],
+        versions: Optional[Tuple[str, str]] = None
+    ) -> None:
+        """
+        Apply (title, year, vote_count), or a removal when values is None
+
+        Args:
+            movie_id: Changed movie
+            values: The movie's new (title, year, vote_count)
+            versions: Catalog versions of the commit that made the change
+        """
+        with self._lock:
+            if self._building or not self.ready:
+                self._pending.append((movie_id, values, versions))
+            else:
+                self._apply(movie_id, values, versions)
+
+    def add(self, movie_id: int, title: str, year: Optional[int], vote_count: Optional[int]) -> None:
+        with self._lock:
+            existing = self._movies.get(movie_id)
+            if existing is not None and existing[:3] == (title, year, vote_count or 0):
+                return
+            self.remove(movie_id)
+            keys = _index_keys(normalize_title(title))
+            self._movies[movie_id] = (title, year, vote_count or 0, keys)
+            for key in keys:
+                bisect.insort(self._entries, (key, movie_id))
+            self._results.clear()
+
+    def remove(self, movie_id: int) -> None:
+        with self._lock:
+            existing = self._movies.pop(movie_id, None)
+            if existing is None:
+                return
+            for key in existing[3]:
+                position = bisect.bisect_left(self._entries, (key, movie_id))
+                if position < len(self._entries) and self._entries[position] == (key, movie_id):
+                    del self._entries[position]
+            self._results.clear()
+
+    def suggest(self, query: str, limit: int = 10) -> List[dict]:
+        """Top titles starting with query, most voted first"""
+        prefix = normalize_title(query)
+        if not prefix:
+            return []
+        cache_key = (prefix, limit)
+        with self._lock:
+            cached = self._results.get(cache_key)
+            if cached is not None:
+                self._results.move_to_end(cache_key)
+                return cached
+
+            start = bisect.bisect_left(self._entries, (prefix,))
+            end = bisect.bisect_left(self._entries, (prefix + "\uffff",), lo=start)
+            movie_ids = {movie_id for _, movie_id in self._entries[start:end]}
+            best = heapq.nlargest(
+                limit, movie_ids,
+                key=lambda movie_id: (self._movies[movie_id][2], -movie_id)
+            )
+            results = [
+                {
+                    "id": movie_id,
+                    "title": self._movies[movie_id][0],
+                    "year": self._movies[movie_id][1],
+                    "vote_count": self._movies[movie_id][2],
+                }
+                for movie_id in best
+            ]
+            self._results[cache_key] = results
+            while len(self._results) > _RESULT_CACHE_SIZE:
+                self._results.popitem(last=False)
+            return results
+
+
+title_suggester = TitleSuggester()
+
+_session_factory: Optional[Callable[[], Session]] = None
+
+
+def _suggestion_rows_query():
+    return select(Movie.id, Movie.title, Movie.year, Rating.vote_count).outerjoin(Rating)
+
+
+def build_title_suggestions(session_factory: Callable[[], Session]) -> None:
+    """Load every title into the suggester"""
+    db = session_factory()
+    try:
+        version = catalog_tag(db)
+        rows = db.execute(_suggestion_rows_query().execution_options(yield_per=10000))
+        title_suggester.build(rows, version)
+        logger.info(f"Title suggestions ready ({len(title_suggester)} movies)")
+    except Exception as e:
+        title_suggester.cancel_build()
+        logger.error(f"Error building title suggestions: {e}")
+    finally:
+        db.close()
+
+
+def start_title_suggestions(session_factory: Callable[[], Session]) -> threading.Thread:
+    """Build the suggester in the background so startup doesn't wait on it"""
+    global _session_factory
+    _session_factory = session_factory
+    thread = threading.Thread(
+        target=build_title_suggestions, args=(session_factory,),
+        name="title-suggestions", daemon=True
+    )
+    thread.start()
+    return thread
+
+
+def suggest_from_database(db: Session, query: str, limit: int = 10) -> List[dict]:
+    """Fallback used while the in-memory index is being built or out of date"""
+    if not tokenize_query(query):
+        return []
+    rows = db.execute(
+        _suggestion_rows_query().where(title_search_predicate(db, query)).order_by(
+            Rating.vote_count.desc().nulls_last(), Movie.id
+        ).limit(limit)
+    )
+    return [
+        {"id": movie_id, "title": title, "year": year, "vote_count": vote_count or 0}
+        for movie_id, title, year, vote_count in rows
+    ]
+
+
+def suggestions_ready() -> bool:
+    """Whether the index can answer; starts a rebuild when it is out of date"""
+    if not title_suggester.ready:
+        return False
+    if not title_suggester.stale():
+        return True
+    if _session_factory is not None and title_suggester.begin_rebuild():
+        start_title_suggestions(_session_factory)
+    return False
+
+
+@subscribe
+def update_title_suggestions(before: Optional[MovieSnapshot], after: Optional[MovieSnapshot]) -> None:
+    """Keep the suggester in line with committed movie changes"""
+    # Also for changes that leave the titles alone, to move the index's version
+    if after is None:
+        title_suggester.record_change(before.id, None, committed_versions())
+    else:
+        title_suggester.record_change(after.id, (after.title, after.year, after.vote_count), committed_versions())
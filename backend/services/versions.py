@@ -0,0 +1,387 @@
+"""
+Resource versions for conditional GET requests
+
+On SQLite, triggers keep every movie's ``version`` and ``updated_at`` current
+whenever the movie, one of its genre links or its rating changes, and bump a
+``catalog_version`` counter in schema_meta on any change to those tables. Like
+the search index triggers they cover every write path (API, batch writes,
+seeding, bulk imports) and every worker sharing the database.
+
+Routes decorated with ``conditional_response`` read the version first (one
+primary key lookup) and answer a matching ``If-None-Match`` (or, without one,
+``If-Modified-Since``) with 304 before running their query or consulting the
+response cache. Single-movie routes use the movie's version; collections use
+the catalog version. The version is also part of the response cache key, so a
+cached body is never served under a newer version's ETag after a write made
+elsewhere (another worker, the CLI). Other databases have no triggers, so
+responses carry no validators there.
+
+In-memory state (indexes, counters) notes the catalog version it was loaded
+at. Each commit through a session factory passed to ``track_commit_versions``
+records the versions it moved the catalog between, and the change events it
+publishes carry them (``committed_versions``), so state that applies those
+events moves along with its own worker's writes. ``catalog_watcher`` polls the
+version in the background; state it finds behind has missed a change made
+elsewhere and reloads.
+"""
+import functools
+import inspect
+import threading
+from contextvars import ContextVar
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Callable, NamedTuple, Optional, Tuple, Union
+from fastapi import Request, Response
+from sqlalchemy import column, event, select, table, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session, sessionmaker
+from config import settings
+from database.runner import DatabaseRunner
+from models import Movie
+from utils.etag import compute_etag, etag_matches, not_modified
+from utils.logging import logger
+
+CATALOG_VERSION_KEY = "catalog_version"
+
+schema_meta = table("schema_meta", column("key"), column("value"))
+
+# None until checked: whether the version triggers exist in the database in use
+_versions_available: Optional[bool] = None
+
+# Version tag of the response being built, set by conditional_response so
+# cached_response can key the cached body on it
+response_version: ContextVar[Optional[str]] = ContextVar("response_version", default=None)
+
+# (before, after) catalog versions of the last commit made in this context,
+# None when the commit wasn't tracked
+_commit_versions: ContextVar[Optional[Tuple[str, str]]] = ContextVar("commit_versions", default=None)
+
+_NOW = "strftime('%Y-%m-%d %H:%M:%f', 'now')"
+_BUMP_CATALOG = f"UPDATE schema_meta SET value = CAST(value AS INTEGER) + 1 WHERE key = '{CATALOG_VERSION_KEY}';"
+
+
+def _touch_movie(row: str) -> str:
+    return f"UPDATE movies SET version = version + 1, updated_at = {_NOW} WHERE id = {row}.movie_id;"
+
+
+_CREATE_TRIGGERS = [
+    f"""CREATE TRIGGER IF NOT EXISTS movies_version_insert AFTER INSERT ON movies BEGIN
+        UPDATE movies SET updated_at = {_NOW} WHERE id = new.id;
+        {_BUMP_CATALOG}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS movies_version_update AFTER UPDATE OF title, year, duration ON movies BEGIN
+        UPDATE movies SET version = version + 1, updated_at = {_NOW} WHERE id = new.id;
+        {_BUMP_CATALOG}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS movies_version_delete AFTER DELETE ON movies BEGIN
+        {_BUMP_CATALOG}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS ratings_version_insert AFTER INSERT ON ratings BEGIN
+        UPDATE ratings SET updated_at = {_NOW} WHERE id = new.id;
+        {_touch_movie("new")}
+        {_BUMP_CATALOG}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS ratings_version_update AFTER UPDATE OF rating, vote_count ON ratings BEGIN
+        UPDATE ratings SET updated_at = {_NOW} WHERE id = new.id;
+        {_touch_movie("new")}
+        {_BUMP_CATALOG}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS ratings_version_delete AFTER DELETE ON ratings BEGIN
+        {_touch_movie("old")}
+        {_BUMP_CATALOG}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS movie_genres_version_insert AFTER INSERT ON movie_genres BEGIN
+        UPDATE movie_genres SET updated_at = {_NOW} WHERE movie_id = new.movie_id AND genre_id = new.genre_id;
+        {_touch_movie("new")}
+        {_BUMP_CATALOG}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS movie_genres_version_delete AFTER DELETE ON movie_genres BEGIN
+        {_touch_movie("old")}
+        {_BUMP_CATALOG}
+    END""",
+]
+
+
+class ResourceVersion(NamedTuple):
+    """What a response's validators are derived from"""
+    tag: str
+    modified: Optional[datetime] = None
+
+
+def ensure_version_triggers(connection: Connection) -> bool:
+    """
+    Create the version triggers and the catalog version if they don't exist
+
+    Args:
+        connection: Connection inside the bootstrap transaction
+
+    Returns:
+        Whether versions are maintained in this database
+    """
+    global _versions_available
+    if connection.dialect.name != "sqlite":
+        logger.info("Resource versions need SQLite triggers, conditional requests are disabled")
+        _versions_available = False
+        return False
+
+    connection.exec_driver_sql(
+        f"INSERT OR IGNORE INTO schema_meta (key, value) VALUES ('{CATALOG_VERSION_KEY}', '1')"
+    )
+    for statement in _CREATE_TRIGGERS:
+        connection.exec_driver_sql(statement)
+    _versions_available = True
+    return True
+
+
+def versions_available(db: Union[Session, Connection]) -> bool:
+    """Whether the version triggers exist (checked once per process)"""
+    global _versions_available
+    if _versions_available is None:
+        dialect = db.get_bind().dialect if isinstance(db, Session) else db.dialect
+        if dialect.name != "sqlite":
+            _versions_available = False
+        else:
+            _versions_available = db.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'movies_version_update'")
+            ).first() is not None
+    return _versions_available
+
+
+def catalog_version(db: Session) -> Optional[ResourceVersion]:
+    """Version of the whole catalog, None without version tracking"""
+    if not versions_available(db):
+        return None
+    value = db.execute(
+        select(schema_meta.c.value).where(schema_meta.c.key == CATALOG_VERSION_KEY)
+    ).scalar()
+    return ResourceVersion(tag=value) if value is not None else None
+
+
+def catalog_tag(db: Session) -> Optional[str]:
+    """Current catalog version tag, None without version tracking
+
+    In-memory aggregates and indexes keep the tag they were loaded at and
+    reload once it moves, which covers writes from other workers and imports.
+    Read it before the rows it describes: a write in between then only causes
+    one reload too many.
+    """
+    version = catalog_version(db)
+    return version.tag if version is not None else None
+
+
+def _read_catalog_version(connection: Connection) -> Optional[str]:
+    return connection.execute(
+        select(schema_meta.c.value).where(schema_meta.c.key == CATALOG_VERSION_KEY)
+    ).scalar()
+
+
+def track_commit_versions(session_factory: sessionmaker) -> None:
+    """
+    Record the catalog versions each commit of the factory's sessions moves between
+
+    The version is read when a transaction begins and again just before it
+    commits. On the SQLite writer both reads happen under the write lock
+    (BEGIN IMMEDIATE, see database/profile.py), so every change in between is
+    the transaction's own.
+    """
+    @event.listens_for(session_factory, "after_begin")
+    def read_start_version(session, transaction, connection):
+        if versions_available(connection):
+            session.info["catalog_start"] = _read_catalog_version(connection)
+
+    @event.listens_for(session_factory, "before_commit")
+    def read_end_version(session):
+        if session.info.get("catalog_start") is not None:
+            # Runs before commit's own flush
+            session.flush()
+            session.info["catalog_end"] = _read_catalog_version(session.connection())
+
+    @event.listens_for(session_factory, "after_commit")
+    def remember_versions(session):
+        start = session.info.pop("catalog_start", None)
+        end = session.info.pop("catalog_end", None)
+        if start is not None and end is not None:
+            previous = session.info.get("catalog_committed")
+            # Back-to-back commits of one session, nothing else in between
+            if previous is not None and previous[1] == start:
+                start = previous[0]
+            session.info["catalog_committed"] = (start, end)
+        _commit_versions.set(session.info.get("catalog_committed"))
+
+    @event.listens_for(session_factory, "after_rollback")
+    def forget_versions(session):
+        session.info.pop("catalog_start", None)
+        session.info.pop("catalog_end", None)
+
+
+def committed_versions() -> Optional[Tuple[str, str]]:
+    """(before, after) catalog versions of the commit whose changes are being published"""
+    return _commit_versions.get()
+
+
+def advance_version(current: Optional[str], versions: Optional[Tuple[str, str]]) -> Optional[str]:
+    """
+    Version of in-memory state at current once it has applied a commit's changes
+
+    The state only moves to the commit's version when the commit started from
+    a version it already covered; otherwise it missed a change in between and
+    keeps its version, so catalog_watcher finds it behind.
+    """
+    if current is None or versions is None:
+        return current
+    before, after = versions
+    if int(before) <= int(current) <= int(after):
+        return after
+    return current
+
+
+class CatalogWatcher:
+    """Background poll of the catalog version"""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        # Last version read, None before the first poll or without versions
+        self.latest: Optional[int] = None
+        self._stop = threading.Event()
+
+    def poll(self, session_factory: Callable[[], Session]) -> None:
+        db = session_factory()
+        try:
+            tag = catalog_tag(db)
+        except Exception as e:
+            logger.warning(f"Error reading the catalog version: {e}")
+            return
+        finally:
+            db.close()
+        self.latest = int(tag) if tag is not None else None
+
+    def start(self, session_factory: Callable[[], Session]) -> Optional[threading.Thread]:
+        """Poll every interval seconds until stop() is called; 0 disables it"""
+        if self.interval <= 0:
+            return None
+        self.poll(session_factory)
+
+        def poll_loop():
+            while not self._stop.wait(self.interval):
+                self.poll(session_factory)
+
+        thread = threading.Thread(target=poll_loop, name="catalog-watcher", daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def moved_since(self, version: Optional[str]) -> bool:
+        """Whether the last poll saw the catalog past version"""
+        latest = self.latest
+        return latest is not None and version is not None and latest > int(version)
+
+
+catalog_watcher = CatalogWatcher(settings.CATALOG_VERSION_POLL_SECONDS)
+
+
+def movie_version(db: Session, movie_id: int) -> Optional[ResourceVersion]:
+    """Version of one movie, None if it doesn't exist or without version tracking"""
+    if not versions_available(db):
+        return None
+    row = db.execute(
+        select(Movie.version, Movie.updated_at).where(Movie.id == movie_id)
+    ).first()
+    if row is None:
+        return None
+    version, updated_at = row
+    # updated_at too: a deleted movie's ID can be reused, restarting its version
+    return ResourceVersion(
+        tag=f"{version}:{updated_at}",
+        modified=updated_at.replace(tzinfo=timezone.utc) if updated_at else None
+    )
+
+
+def _http_date(modified: datetime) -> Optional[datetime]:
+    """
+    Whole-second Last-Modified date, once it can stand for the version
+
+    HTTP dates have whole seconds, so while the second of the last change
+    isn't over another change could still get the same date. Until then the
+    date is coarser than the version and only the ETag is sent.
+    """
+    second = modified.replace(microsecond=0)
+    if datetime.now(timezone.utc) < second + timedelta(seconds=1):
+        return None
+    return second
+
+
+def _not_modified_since(request: Request, modified: datetime) -> bool:
+    header = request.headers.get("if-modified-since")
+    if not header:
+        return False
+    try:
+        since = parsedate_to_datetime(header)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    return modified <= since
+
+
+def conditional_response(movie_param: Optional[str] = None) -> Callable:
+    """
+    Add ETag / Last-Modified to an async GET handler and answer 304s
+
+    Goes above ``cached_response``, so a revalidation never reaches the cache
+    or the handler's query. The ETag covers the route, its parameters and the
+    version, so different pages or filters never share one.
+
+    Args:
+        movie_param: Handler parameter holding a movie ID; the response then
+            follows that movie's version instead of the catalog's
+    """
+    def decorator(handler: Callable) -> Callable:
+        route = f"{handler.__module__}.{handler.__name__}"
+
+        @functools.wraps(handler)
+        async def wrapper(*args, _request: Request, _response: Response, **kwargs):
+            db = next(value for value in kwargs.values() if isinstance(value, DatabaseRunner))
+            params = {name: value for name, value in kwargs.items() if not isinstance(value, DatabaseRunner)}
+            if movie_param is None:
+                version = await db.run(catalog_version)
+            else:
+                version = await db.run(movie_version, kwargs[movie_param])
+            if version is None:
+                return await handler(*args, **kwargs)
+
+            etag = compute_etag(route, params, version.tag)
+            # Cache-Control comes from the route's policy (CACHE_CONTROL_POLICIES)
+            headers = {"ETag": etag}
+            modified = _http_date(version.modified) if version.modified is not None else None
+            if modified is not None:
+                headers["Last-Modified"] = format_datetime(modified, usegmt=True)
+            # If-None-Match decides alone when present; If-Modified-Since only
+            # counts once the date stands for the version
+            if "if-none-match" in _request.headers:
+                matched = etag_matches(_request, etag)
+            else:
+                matched = modified is not None and _not_modified_since(_request, modified)
+            if matched:
+                return not_modified(etag, headers)
+
+            token = response_version.set(version.tag)
+            try:
+                result = await handler(*args, **kwargs)
+            finally:
+                response_version.reset(token)
+            (result if isinstance(result, Response) else _response).headers.update(headers)
+            return result
+
+        # FastAPI reads the handler's signature (through __wrapped__); add the
+        # request and response so they are passed to the wrapper
+        signature = inspect.signature(handler)
+        wrapper.__signature__ = signature.replace(parameters=[
+            *signature.parameters.values(),
+            inspect.Parameter("_request", inspect.Parameter.KEYWORD_ONLY, annotation=Request),
+            inspect.Parameter("_response", inspect.Parameter.KEYWORD_ONLY, annotation=Response),
+        ])
+        return wrapper
+
+    return decorator
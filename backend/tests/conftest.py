@@ -0,0 +1,71 @@
+"""
+Shared pytest setup
+
+Run from the backend directory: ``python -m pytest``. Modules read their
+settings and create the default engines at import time, so DATABASE_URL points
+at a scratch file before anything from the app is imported; the ``client``
+fixture bootstraps and seeds it once per session.
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from typing import Callable
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+_scratch = tempfile.mkdtemp(prefix="movies-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_scratch, 'movies.sqlite')}"
+os.environ["BOOTSTRAP_LOCK_FILE"] = os.path.join(_scratch, "bootstrap.lock")
+os.environ.setdefault("DATABASE_REPLICA_URLS", "")
+
+
+@pytest.fixture(scope="session")
+def client():
+    """TestClient of the app on the seeded scratch database
+
+    The database and the in-memory indexes are shared by every test, so tests
+    create their own movies rather than relying on each other's.
+    """
+    from fastapi.testclient import TestClient
+    from main import app
+
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def wait_until() -> Callable:
+    """Poll a condition until it holds, failing the test after a timeout"""
+
+    def wait(condition: Callable[[], bool], timeout: float = 10.0) -> None:
+        deadline = time.monotonic() + timeout
+        while not condition():
+            if time.monotonic() > deadline:
+                pytest.fail("Condition not met in time")
+            time.sleep(0.02)
+
+    return wait
+
+
+@pytest.fixture
+def write_elsewhere() -> Callable:
+    """Change the database without going through this process' app, as
+    another worker or an import would"""
+    from sqlalchemy.engine import make_url
+    from config import settings
+
+    def write(sql: str, *params) -> int:
+        connection = sqlite3.connect(make_url(settings.DATABASE_URL).database)
+        try:
+            row_id = connection.execute(sql, params).lastrowid
+            connection.commit()
+        finally:
+            connection.close()
+        return row_id
+
+    return write
@@ -0,0 +1,64 @@
+"""
+Batch writes: per-item results, partial failures and whole-batch rejections
+"""
+from config import settings
+
+
+def test_create_reports_ids_in_request_order(client):
+    response = client.post("/movies/batch", json=[
+        {"title": "Batch First", "year": 2011, "genres": ["Drama"]},
+        {"title": "Batch Second", "year": 2012, "rating": {"rating": 6.5, "vote_count": 10}},
+    ])
+    assert response.status_code == 201
+    body = response.json()
+    assert (body["succeeded"], body["failed"]) == (2, 0)
+    ids = [item["id"] for item in body["results"]]
+    assert [item["index"] for item in body["results"]] == [0, 1]
+    assert [client.get(f"/movies/{movie_id}").json()["title"] for movie_id in ids] == ["Batch First", "Batch Second"]
+
+
+def test_invalid_item_rejects_the_whole_batch(client):
+    total = client.get("/movies/").json()["total"]
+    response = client.post("/movies/batch", json=[
+        {"title": "Batch Never", "year": 2013},
+        {"year": 2014},
+    ])
+    assert response.status_code == 422
+    assert client.get("/movies/").json()["total"] == total
+
+
+def test_update_applies_valid_items_and_reports_the_rest(client):
+    first, second = (
+        client.post("/movies/", json={"title": title, "year": 2015, "duration": 90}).json()
+        for title in ("Batch Update One", "Batch Update Two")
+    )
+    response = client.put("/movies/batch", json=[
+        {"id": first["id"], "duration": 91},
+        {"id": 999999999, "duration": 92},
+        {"id": first["id"], "duration": 93},
+        {"id": second["id"], "genres": ["Comedy"]},
+    ])
+    assert response.status_code == 200
+    body = response.json()
+    assert [(item["index"], item["status"]) for item in body["results"]] == [
+        (0, "updated"), (1, "not_found"), (2, "duplicate"), (3, "updated")
+    ]
+    assert (body["succeeded"], body["failed"]) == (2, 2)
+    assert client.get(f"/movies/{first['id']}").json()["duration"] == 91
+    assert [genre["genre"] for genre in client.get(f"/movies/{second['id']}").json()["genres"]] == ["Comedy"]
+
+
+def test_genre_batch_reports_existing_and_empty_names(client):
+    movie = client.post("/movies/", json={"title": "Batch Genres", "year": 2016, "genres": ["Drama"]}).json()
+    response = client.post(f"/movies/{movie['id']}/genres/batch", json=["Drama", "Horror", " ", "Horror"])
+    assert response.status_code == 201
+    body = response.json()
+    assert [item["status"] for item in body["results"]] == ["exists", "added", "invalid", "exists"]
+    assert (body["succeeded"], body["failed"]) == (1, 3)
+
+
+def test_empty_and_oversized_batches_are_refused(client, monkeypatch):
+    assert client.post("/movies/batch", json=[]).status_code == 400
+    monkeypatch.setattr(settings, "BATCH_MAX_ITEMS", 2)
+    items = [{"title": f"Batch Over {index}"} for index in range(3)]
+    assert client.post("/movies/batch", json=items).status_code == 413
@@ -0,0 +1,40 @@
+"""
+Compression and validators: 304s repeat the ETag the way the 200 sent it
+"""
+
+
+def _get(client, encoding: str, etag: str = None):
+    headers = {"Accept-Encoding": encoding}
+    if etag:
+        headers["If-None-Match"] = etag
+    return client.get("/movies/", params={"page_size": 100}, headers=headers)
+
+
+def test_compressed_responses_and_their_304s_share_a_weak_etag(client):
+    response = _get(client, "gzip")
+    assert response.headers["content-encoding"] == "gzip"
+    etag = response.headers["etag"]
+    assert etag.startswith("W/")
+
+    revalidated = _get(client, "gzip", etag)
+    assert revalidated.status_code == 304
+    assert revalidated.headers["etag"] == etag
+    assert "Accept-Encoding" in revalidated.headers["vary"]
+
+
+def test_identity_responses_and_their_304s_share_a_strong_etag(client):
+    response = _get(client, "identity")
+    assert "content-encoding" not in response.headers
+    etag = response.headers["etag"]
+    assert not etag.startswith("W/")
+
+    revalidated = _get(client, "identity", etag)
+    assert revalidated.status_code == 304
+    assert revalidated.headers["etag"] == etag
+
+
+def test_small_bodies_get_the_same_tag_as_compressed_ones(client):
+    movie = client.post("/movies/", json={"title": "Small Body", "year": 2018}).json()
+    response = client.get(f"/movies/{movie['id']}", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+    assert response.headers["etag"].startswith("W/")
@@ -0,0 +1,66 @@
+"""
+ETag / Last-Modified validators and 304 responses
+"""
+import time
+
+
+def _start_of_second() -> None:
+    """Sleep into the next second, so the next few steps share it"""
+    time.sleep(1 - time.time() % 1 + 0.01)
+
+
+def test_matching_etag_gets_an_empty_304(client):
+    movie = client.post("/movies/", json={"title": "Validators", "year": 2007}).json()
+    response = client.get(f"/movies/{movie['id']}")
+    etag = response.headers["etag"]
+
+    revalidated = client.get(f"/movies/{movie['id']}", headers={"If-None-Match": etag})
+    assert revalidated.status_code == 304
+    assert revalidated.content == b""
+    assert revalidated.headers["etag"] == etag
+
+    client.put(f"/movies/{movie['id']}", json={"duration": 101})
+    changed = client.get(f"/movies/{movie['id']}", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+    assert changed.json()["duration"] == 101
+
+
+def test_collection_etags_follow_the_catalog_and_parameters(client):
+    first = client.get("/movies/", params={"page_size": 5})
+    other_page = client.get("/movies/", params={"page_size": 5, "page": 2})
+    assert first.headers["etag"] != other_page.headers["etag"]
+    assert client.get(
+        "/movies/", params={"page_size": 5}, headers={"If-None-Match": first.headers["etag"]}
+    ).status_code == 304
+
+    client.post("/movies/", json={"title": "Validators Catalog", "year": 2008})
+    assert client.get(
+        "/movies/", params={"page_size": 5}, headers={"If-None-Match": first.headers["etag"]}
+    ).status_code == 200
+
+
+def test_no_last_modified_while_its_second_can_still_change(client):
+    _start_of_second()
+    movie = client.post("/movies/", json={"title": "Validators Fresh", "year": 2009}).json()
+    response = client.get(f"/movies/{movie['id']}")
+    assert "last-modified" not in response.headers
+
+    time.sleep(1.1)
+    settled = client.get(f"/movies/{movie['id']}")
+    assert "last-modified" in settled.headers
+    assert settled.headers["etag"] == response.headers["etag"]
+
+
+def test_if_modified_since_counts_only_without_if_none_match(client):
+    movie = client.post("/movies/", json={"title": "Validators Dated", "year": 2010}).json()
+    time.sleep(1.1)
+    response = client.get(f"/movies/{movie['id']}")
+    last_modified = response.headers["last-modified"]
+
+    assert client.get(
+        f"/movies/{movie['id']}", headers={"If-Modified-Since": last_modified}
+    ).status_code == 304
+    assert client.get(
+        f"/movies/{movie['id']}", headers={"If-Modified-Since": last_modified, "If-None-Match": '"other"'}
+    ).status_code == 200
@@ -0,0 +1,66 @@
+"""
+Dataset imports into a scratch database of their own
+"""
+import pytest
+from sqlalchemy import create_engine, text
+from cli.datasets import main
+from database.profile import apply_sqlite_profile, pool_options
+
+MOVIES = "id_pelicula,titulo,año,duracion\n1,Import One,1999,100\n2,Import Two,2001,95\n"
+GENRES = "id,id_pelicula,genero\n1,1,Drama\n2,2,Comedy\n"
+RATINGS = "id,id_pelicula,rating,nro_votos\n1,1,7.1,120\n2,2,6.4,80\n"
+
+
+@pytest.fixture
+def import_files(tmp_path):
+    engine_url = f"sqlite:///{tmp_path / 'import.sqlite'}"
+    engine = create_engine(engine_url, **pool_options(engine_url))
+    apply_sqlite_profile(engine)
+    paths = {}
+    for name, content in (("movies", MOVIES), ("genres", GENRES), ("ratings", RATINGS)):
+        paths[name] = tmp_path / f"{name}.csv"
+        paths[name].write_text(content, encoding="utf-8")
+
+    def run_import(**overrides) -> None:
+        for name, content in overrides.items():
+            paths[name].write_text(content, encoding="utf-8")
+        argv = ["import"]
+        for name, path in paths.items():
+            argv += [f"--{name}", str(path)]
+        assert main(argv, engine=engine) == 0
+
+    yield engine, run_import
+    engine.dispose()
+
+
+def _versions(engine) -> tuple:
+    with engine.connect() as connection:
+        catalog = connection.execute(text("SELECT value FROM schema_meta WHERE key = 'catalog_version'")).scalar()
+        movies = connection.execute(text("SELECT id, version FROM movies ORDER BY id")).all()
+    return catalog, [tuple(row) for row in movies]
+
+
+def test_import_sets_up_the_version_triggers(import_files):
+    engine, run_import = import_files
+    run_import()
+
+    catalog, movies = _versions(engine)
+    assert int(catalog) > 1
+    with engine.connect() as connection:
+        assert connection.execute(
+            text("SELECT count(*) FROM sqlite_master WHERE type = 'trigger' AND name = 'movies_version_update'")
+        ).scalar() == 1
+
+
+def test_reimporting_unchanged_files_moves_no_version(import_files):
+    engine, run_import = import_files
+    run_import()
+    before = _versions(engine)
+
+    run_import()
+    assert _versions(engine) == before
+
+    run_import(movies=MOVIES.replace("Import Two,2001,95", "Import Two,2001,97"))
+    catalog, movies = _versions(engine)
+    assert int(catalog) == int(before[0]) + 1
+    assert movies == [before[1][0], (2, before[1][1][1] + 1)]
@@ -0,0 +1,57 @@
+"""
+Facet index: kept current by the change feed, rebuilt after changes made
+elsewhere
+"""
+import pytest
+from config import settings
+from database.db import ReadSessionLocal
+from services import facets
+from services.facets import facet_index
+from services.versions import catalog_watcher
+
+
+@pytest.fixture
+def facet_engine(client, monkeypatch):
+    monkeypatch.setattr(settings, "FACET_ENGINE_ENABLED", True)
+    if not facet_index.ready:
+        facets.start_facet_index(ReadSessionLocal).join()
+    return facet_index
+
+
+def _index_current(client) -> bool:
+    """Whether the index is current, starting a rebuild through a listing
+    when it isn't"""
+    client.get("/movies/", params={"year": 1900})
+    return not facet_index.stale()
+
+
+def _listed_ids(client, **params):
+    return [movie["id"] for movie in client.get("/movies/", params=params).json()["movies"]]
+
+
+def test_local_writes_keep_the_index_current(client, facet_engine, wait_until, monkeypatch):
+    wait_until(lambda: _index_current(client))
+    rebuilds = []
+    monkeypatch.setattr(facets, "start_facet_index", rebuilds.append)
+
+    movie = client.post("/movies/", json={"title": "Facet Local", "year": 1891, "duration": 90}).json()
+    client.put(f"/movies/{movie['id']}", json={"year": 1892, "duration": 95})
+    catalog_watcher.poll(ReadSessionLocal)
+
+    assert not facet_engine.stale()
+    assert _listed_ids(client, year=1891) == []
+    assert _listed_ids(client, year=1892) == [movie["id"]]
+    assert rebuilds == []
+
+
+def test_writes_made_elsewhere_trigger_a_rebuild(client, facet_engine, wait_until, write_elsewhere):
+    wait_until(lambda: _index_current(client))
+    movie_id = write_elsewhere(
+        "INSERT INTO movies (title, year, duration) VALUES (?, ?, ?)", "Facet Elsewhere", 1887, 80
+    )
+    catalog_watcher.poll(ReadSessionLocal)
+
+    # Answered from SQL while the index is rebuilt
+    assert _listed_ids(client, year=1887) == [movie_id]
+    wait_until(lambda: not facet_engine.stale())
+    assert facets.page_from_bitmap(facet_engine.match([], year=1887), 1, 10)[0] == [movie_id]
@@ -0,0 +1,34 @@
+"""
+Genre counts: kept current by the change feed, recounted after changes made
+elsewhere
+"""
+from database.db import ReadSessionLocal
+from services.genre_counts import genre_counts
+from services.versions import catalog_watcher
+
+
+def _movie_count(client, genre: str) -> int:
+    return next(item["movie_count"] for item in client.get("/genres/").json() if item["genre"] == genre)
+
+
+def test_local_writes_keep_the_counts_current(client, monkeypatch):
+    start = _movie_count(client, "Drama")
+    reconciles = []
+    monkeypatch.setattr(genre_counts, "reconcile", reconciles.append)
+
+    movie = client.post("/movies/", json={"title": "Counts Local", "year": 2005, "genres": ["Drama"]}).json()
+    client.put(f"/movies/{movie['id']}", json={"duration": 110})
+    catalog_watcher.poll(ReadSessionLocal)
+
+    assert _movie_count(client, "Drama") == start + 1
+    assert reconciles == []
+
+
+def test_writes_made_elsewhere_are_recounted(client, write_elsewhere):
+    start = _movie_count(client, "Drama")
+    drama_id = next(item["id"] for item in client.get("/genres/").json() if item["genre"] == "Drama")
+    movie_id = write_elsewhere("INSERT INTO movies (title, year) VALUES (?, ?)", "Counts Elsewhere", 2006)
+    write_elsewhere("INSERT INTO movie_genres (movie_id, genre_id) VALUES (?, ?)", movie_id, drama_id)
+    catalog_watcher.poll(ReadSessionLocal)
+
+    assert _movie_count(client, "Drama") == start + 1
@@ -0,0 +1,27 @@
+"""
+Genre catalog IDs in responses and the catalog cache
+"""
+from services.genre_catalog import genre_catalog
+
+
+def test_movie_genres_carry_the_catalog_id(client):
+    movie = client.post("/movies/", json={"title": "Genre Ids", "year": 2019, "genres": ["Drama"]}).json()
+    drama_id = next(item["id"] for item in client.get("/genres/").json() if item["genre"] == "Drama")
+
+    genre = client.get(f"/movies/{movie['id']}/genres").json()[0]
+    assert genre["genre_id"] == drama_id
+    # Deprecated, kept with the same value
+    assert genre["id"] == drama_id
+    assert client.get(f"/movies/{movie['id']}").json()["genres"][0]["genre_id"] == drama_id
+
+    assert client.delete(f"/movies/{movie['id']}/genres/{drama_id}").status_code == 200
+    assert client.get(f"/movies/{movie['id']}/genres").json() == []
+
+
+def test_lookup_caches_genres_created_elsewhere(client, write_elsewhere):
+    genre_id = write_elsewhere("INSERT INTO genre_catalog (name) VALUES (?)", "Lookup Noir")
+    assert "lookup noir" not in genre_catalog
+
+    assert client.get("/genres/Lookup Noir/movies").status_code == 200
+    assert "lookup noir" in genre_catalog
+    assert genre_catalog.lookup(None, "LOOKUP NOIR") == (genre_id, "Lookup Noir")
@@ -0,0 +1,51 @@
+"""
+Leaderboards: kept current by the change feed, rebuilt after changes made
+elsewhere
+"""
+from database.db import ReadSessionLocal
+from services import leaderboard as leaderboard_module
+from services.leaderboard import leaderboard
+from services.versions import catalog_watcher
+
+
+def _lists_current(client) -> bool:
+    """Whether the lists are current, starting a rebuild through a request
+    when they aren't"""
+    client.get("/ratings/top-rated", params={"decade": 1900})
+    return leaderboard.ready and not leaderboard.stale()
+
+
+def _top_ids(client, decade: int):
+    response = client.get("/ratings/top-rated", params={"decade": decade, "min_votes": 50})
+    return [movie["id"] for movie in response.json()]
+
+
+def test_local_writes_keep_the_lists_current(client, wait_until, monkeypatch):
+    wait_until(lambda: _lists_current(client))
+    rebuilds = []
+    monkeypatch.setattr(leaderboard_module, "start_leaderboard", rebuilds.append)
+
+    first = client.post("/movies/", json={
+        "title": "Board Local", "year": 1863, "rating": {"rating": 7.5, "vote_count": 60}
+    }).json()
+    second = client.post("/movies/", json={
+        "title": "Board Local II", "year": 1865, "rating": {"rating": 7.0, "vote_count": 60}
+    }).json()
+    client.put(f"/movies/{first['id']}/rating", json={"rating": 6.5})
+    catalog_watcher.poll(ReadSessionLocal)
+
+    assert not leaderboard.stale()
+    assert _top_ids(client, 1860) == [second["id"], first["id"]]
+    assert rebuilds == []
+
+
+def test_writes_made_elsewhere_trigger_a_rebuild(client, wait_until, write_elsewhere):
+    wait_until(lambda: _lists_current(client))
+    movie_id = write_elsewhere("INSERT INTO movies (title, year) VALUES (?, ?)", "Board Elsewhere", 1854)
+    write_elsewhere("INSERT INTO ratings (movie_id, rating, vote_count) VALUES (?, ?, ?)", movie_id, 8.0, 70)
+    catalog_watcher.poll(ReadSessionLocal)
+
+    # Answered from SQL while the lists are rebuilt
+    assert _top_ids(client, 1850) == [movie_id]
+    wait_until(lambda: not leaderboard.stale())
+    assert [movie["id"] for movie in leaderboard.top(10, 50, decade=1850)] == [movie_id]
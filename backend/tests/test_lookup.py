@@ -0,0 +1,43 @@
+"""
+Movie lookup by ID: request order, missing and repeated IDs, limits
+"""
+from config import settings
+
+
+def _create(client, title: str) -> int:
+    return client.post("/movies/", json={"title": title, "year": 2017, "genres": ["Drama"]}).json()["id"]
+
+
+def test_movies_come_back_in_request_order(client):
+    first, second, third = (_create(client, f"Lookup {name}") for name in ("One", "Two", "Three"))
+
+    response = client.get("/movies/lookup", params={"ids": f"{third},{first},{second}"})
+    assert response.status_code == 200
+    body = response.json()
+    assert [movie["id"] for movie in body["movies"]] == [third, first, second]
+    assert body["movies"][0]["genres"][0]["genre"] == "Drama"
+    assert body["missing"] == []
+
+
+def test_missing_and_repeated_ids(client):
+    movie_id = _create(client, "Lookup Missing")
+    deleted_id = _create(client, "Lookup Deleted")
+    client.delete(f"/movies/{deleted_id}")
+
+    body = client.post("/movies/lookup", json={"ids": [999999999, movie_id, deleted_id, movie_id]}).json()
+    assert [movie["id"] for movie in body["movies"]] == [movie_id]
+    assert body["missing"] == [999999999, deleted_id]
+
+
+def test_get_and_post_agree(client):
+    ids = [_create(client, "Lookup Same"), 999999998]
+    by_query = client.get("/movies/lookup", params={"ids": ",".join(map(str, ids))}).json()
+    assert client.post("/movies/lookup", json={"ids": ids}).json() == by_query
+
+
+def test_invalid_and_oversized_id_lists(client, monkeypatch):
+    assert client.get("/movies/lookup", params={"ids": "1,x"}).status_code == 400
+    assert client.get("/movies/lookup", params={"ids": ","}).status_code == 400
+    assert client.post("/movies/lookup", json={"ids": []}).status_code == 422
+    monkeypatch.setattr(settings, "LOOKUP_MAX_IDS", 2)
+    assert client.post("/movies/lookup", json={"ids": [1, 2, 3]}).status_code == 413
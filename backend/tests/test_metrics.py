@@ -0,0 +1,33 @@
+"""
+Pool checkout timing: observed on the pool's checkout event for session
+transactions, also after the engine's pool is replaced
+"""
+from sqlalchemy import text
+from database.db import ReadSessionLocal, read_engine
+from utils.metrics import pool_checkout_seconds
+
+
+def _checkouts(name: str) -> int:
+    series = pool_checkout_seconds._series.get((name,))
+    return series[2] if series else 0
+
+
+def test_session_checkouts_are_timed(client):
+    before = _checkouts("reader")
+    with ReadSessionLocal() as db:
+        db.execute(text("SELECT 1"))
+    assert _checkouts("reader") == before + 1
+
+    # A checkout outside a session has no start to time from
+    with read_engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+    assert _checkouts("reader") == before + 1
+
+
+def test_timing_survives_dispose(client):
+    read_engine.dispose()
+    before = _checkouts("reader")
+    with ReadSessionLocal() as db:
+        db.execute(text("SELECT 1"))
+    assert _checkouts("reader") == before + 1
+    assert "db_pool_checked_out" in client.get("/metrics").text
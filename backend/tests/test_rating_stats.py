@@ -0,0 +1,40 @@
+"""
+Rating aggregates: kept current by the change feed, reconciled after changes
+made elsewhere
+"""
+from database.db import ReadSessionLocal
+from services.rating_stats import rating_aggregates
+from services.versions import catalog_watcher
+
+
+def _statistics(client) -> dict:
+    return client.get("/ratings/statistics").json()
+
+
+def test_local_writes_keep_the_counters_current(client, monkeypatch):
+    start = _statistics(client)
+    reconciles = []
+    monkeypatch.setattr(rating_aggregates, "reconcile", reconciles.append)
+
+    movie = client.post("/movies/", json={
+        "title": "Stats Local", "year": 2003, "rating": {"rating": 6.0, "vote_count": 40}
+    }).json()
+    client.put(f"/movies/{movie['id']}/rating", json={"vote_count": 45})
+    client.put(f"/movies/{movie['id']}", json={"duration": 100})
+    catalog_watcher.poll(ReadSessionLocal)
+
+    statistics = _statistics(client)
+    assert statistics["total_movies_with_ratings"] == start["total_movies_with_ratings"] + 1
+    assert statistics["total_votes"] == start["total_votes"] + 45
+    assert reconciles == []
+
+
+def test_writes_made_elsewhere_are_reconciled(client, write_elsewhere):
+    start = _statistics(client)
+    movie_id = write_elsewhere("INSERT INTO movies (title, year) VALUES (?, ?)", "Stats Elsewhere", 2004)
+    write_elsewhere("INSERT INTO ratings (movie_id, rating, vote_count) VALUES (?, ?, ?)", movie_id, 5.0, 30)
+    catalog_watcher.poll(ReadSessionLocal)
+
+    statistics = _statistics(client)
+    assert statistics["total_movies_with_ratings"] == start["total_movies_with_ratings"] + 1
+    assert statistics["total_votes"] == start["total_votes"] + 30
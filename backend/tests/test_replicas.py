@@ -0,0 +1,125 @@
+"""
+Read replica routing against two local SQLite files
+
+The primary and the replica each hold a one-row ``source`` table naming the
+file, so a route can tell which database served it.
+"""
+import sqlite3
+import time
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session, sessionmaker
+from database import replicas
+from database.replicas import CONSISTENCY_HEADER, PRIMARY_COOKIE, ReplicaRouter, read_your_writes
+from database.runner import DatabaseRunner
+
+
+def _create_database(path, name: str) -> str:
+    connection = sqlite3.connect(path)
+    connection.execute("CREATE TABLE source (name TEXT)")
+    connection.execute("INSERT INTO source (name) VALUES (?)", (name,))
+    connection.execute("CREATE TABLE notes (body TEXT)")
+    connection.commit()
+    connection.close()
+    return f"sqlite:///{path}"
+
+
+def _source(db: Session) -> str:
+    return db.execute(text("SELECT name FROM source")).scalar()
+
+
+def _add_note(db: Session, body: str) -> str:
+    db.execute(text("INSERT INTO notes (body) VALUES (:body)"), {"body": body})
+    db.commit()
+    return _source(db)
+
+
+def _notes(path) -> list:
+    connection = sqlite3.connect(path)
+    try:
+        return [body for body, in connection.execute("SELECT body FROM notes")]
+    finally:
+        connection.close()
+
+
+@pytest.fixture
+def databases(tmp_path):
+    primary_path, replica_path = tmp_path / "primary.sqlite", tmp_path / "replica.sqlite"
+    return (
+        primary_path, _create_database(primary_path, "primary"),
+        replica_path, _create_database(replica_path, "replica")
+    )
+
+
+@pytest.fixture
+def client(databases, monkeypatch):
+    _, primary_url, _, replica_url = databases
+    primary_engine = create_engine(primary_url)
+    primary_sessions = sessionmaker(autocommit=False, autoflush=False, bind=primary_engine)
+    router = ReplicaRouter([replica_url], check_interval=60)
+    # The middleware consults the module's router
+    monkeypatch.setattr(replicas, "replica_router", router)
+    runner = DatabaseRunner(primary_sessions, primary_sessions, router)
+
+    app = FastAPI()
+    app.middleware("http")(read_your_writes)
+
+    def get_runner() -> DatabaseRunner:
+        return runner
+
+    @app.get("/source")
+    async def read_source(db: DatabaseRunner = Depends(get_runner)):
+        return {"source": await db.run(_source)}
+
+    @app.post("/notes")
+    async def add_note(body: str, db: DatabaseRunner = Depends(get_runner)):
+        return {"source": await db.write(_add_note, body)}
+
+    with TestClient(app) as test_client:
+        yield test_client
+    router.stop()
+    primary_engine.dispose()
+
+
+def test_reads_go_to_the_replica(client):
+    assert client.get("/source").json() == {"source": "replica"}
+    assert client.get("/source").json() == {"source": "replica"}
+
+
+def test_writes_go_to_the_primary(client, databases):
+    primary_path, _, replica_path, _ = databases
+
+    response = client.post("/notes", params={"body": "hello"})
+
+    assert response.json() == {"source": "primary"}
+    assert _notes(primary_path) == ["hello"]
+    assert _notes(replica_path) == []
+
+
+def test_write_pins_reads_to_the_primary_within_the_lag_window(client):
+    response = client.post("/notes", params={"body": "hello"})
+    pinned_until = float(response.cookies[PRIMARY_COOKIE])
+
+    assert pinned_until > time.time()
+    assert client.get("/source").json() == {"source": "primary"}
+
+
+def test_reads_return_to_the_replica_after_the_lag_window(client):
+    client.post("/notes", params={"body": "hello"})
+    client.cookies.set(PRIMARY_COOKIE, str(int(time.time()) - 1))
+
+    assert client.get("/source").json() == {"source": "replica"}
+
+
+def test_failed_write_does_not_pin_reads(client):
+    response = client.post("/notes")
+
+    assert response.status_code == 422
+    assert PRIMARY_COOKIE not in response.cookies
+    assert client.get("/source").json() == {"source": "replica"}
+
+
+def test_consistency_header_reads_the_primary(client):
+    assert client.get("/source", headers={CONSISTENCY_HEADER: "primary"}).json() == {"source": "primary"}
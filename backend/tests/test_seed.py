@@ -0,0 +1,34 @@
+"""
+Seeding helpers
+"""
+import pytest
+from sqlalchemy import create_engine, text
+from database.seed import sqlite_load_window
+
+
+def _pragmas(connection) -> tuple:
+    return (
+        connection.exec_driver_sql("PRAGMA synchronous").scalar(),
+        connection.exec_driver_sql("PRAGMA journal_mode").scalar(),
+    )
+
+
+@pytest.mark.parametrize("journal_mode", ["delete", "wal"])
+def test_load_window_relaxes_durability_outside_wal_only(tmp_path, journal_mode):
+    engine = create_engine(f"sqlite:///{tmp_path / 'seed.sqlite'}")
+    with engine.connect() as connection:
+        connection.exec_driver_sql(f"PRAGMA journal_mode={journal_mode}")
+        connection.exec_driver_sql("PRAGMA synchronous=FULL")
+        connection.commit()
+        before = _pragmas(connection)
+
+        with sqlite_load_window(connection):
+            during = _pragmas(connection)
+            connection.execute(text("SELECT 1"))
+        assert _pragmas(connection) == before
+    engine.dispose()
+
+    if journal_mode == "wal":
+        assert during == before
+    else:
+        assert during == (0, "memory")
@@ -0,0 +1,33 @@
+"""
+Title suggestions: kept current by the change feed, rebuilt after changes
+made elsewhere
+"""
+from database.db import ReadSessionLocal
+from services import suggest
+from services.suggest import title_suggester
+from services.versions import catalog_watcher
+
+
+def test_local_writes_keep_the_index_current(client, wait_until, monkeypatch):
+    wait_until(suggest.suggestions_ready)
+    rebuilds = []
+    monkeypatch.setattr(suggest, "start_title_suggestions", rebuilds.append)
+
+    movie = client.post("/movies/", json={"title": "Quokka Dawn", "year": 2001, "duration": 90}).json()
+    client.put(f"/movies/{movie['id']}", json={"duration": 95})
+    catalog_watcher.poll(ReadSessionLocal)
+
+    assert not title_suggester.stale()
+    assert [hit["id"] for hit in client.get("/movies/suggest", params={"q": "quokka d"}).json()] == [movie["id"]]
+    assert rebuilds == []
+
+
+def test_writes_made_elsewhere_trigger_a_rebuild(client, wait_until, write_elsewhere):
+    wait_until(suggest.suggestions_ready)
+    write_elsewhere("INSERT INTO movies (title, year, duration) VALUES (?, ?, ?)", "Quokka Dusk", 2002, 80)
+    catalog_watcher.poll(ReadSessionLocal)
+
+    # Answered from the database while the index is rebuilt
+    assert [hit["title"] for hit in client.get("/movies/suggest", params={"q": "quokka dus"}).json()] == ["Quokka Dusk"]
+    wait_until(lambda: not title_suggester.stale())
+    assert [hit["title"] for hit in title_suggester.suggest("quokka dus")] == ["Quokka Dusk"]
@@ -0,0 +1,50 @@
+"""
+Cache-Control policies by route
+
+CACHE_CONTROL_POLICIES maps path prefixes to a Cache-Control value; the
+longest prefix matching a request's path (whole segments only, so
+``/movies`` covers ``/movies/12`` but not ``/movies-old``) applies. Policies
+are set on successful and 304 responses to GET and HEAD requests that don't
+already carry a Cache-Control header, so a handler can still override its
+route's policy. Errors and writes are never marked cacheable.
+"""
+from typing import Dict, List, Optional, Tuple
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+class CacheControlMiddleware:
+    """ASGI middleware adding the Cache-Control policy of the matching route"""
+
+    def __init__(self, app: ASGIApp, policies: Dict[str, str]):
+        self.app = app
+        # Longest prefix first
+        self.policies: List[Tuple[str, str]] = sorted(
+            ((prefix.rstrip("/") or "/", value) for prefix, value in policies.items()),
+            key=lambda policy: len(policy[0]),
+            reverse=True
+        )
+
+    def policy_for(self, path: str) -> Optional[str]:
+        for prefix, value in self.policies:
+            if prefix == "/" or path == prefix or path.startswith(prefix + "/"):
+                return value
+        return None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] not in ("GET", "HEAD"):
+            await self.app(scope, receive, send)
+            return
+        policy = self.policy_for(scope["path"])
+        if policy is None:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_policy(message: Message) -> None:
+            if message["type"] == "http.response.start" and (message["status"] < 300 or message["status"] == 304):
+                headers = MutableHeaders(scope=message)
+                if "cache-control" not in headers:
+                    headers["Cache-Control"] = policy
+            await send(message)
+
+        await self.app(scope, receive, send_with_policy)
@@ -0,0 +1,281 @@
+"""
+Response compression middleware
+
+Compresses text and JSON responses with brotli (when the ``brotli`` package
+is installed) or gzip, following the client's Accept-Encoding. Bodies smaller
+than COMPRESSION_MINIMUM_SIZE are sent as they are: below about a packet the
+CPU isn't worth the bytes. Streamed responses (the catalog export) are
+compressed chunk by chunk and flushed, so the client still receives rows as
+they are read.
+
+When the client accepts an encoding, compressible responses (small ones
+too) and 304s get a weak ETag (``W/"..."``), since the bytes differ from the
+identity representation: a revalidation repeats the tag the 200 carried.
+Compressible responses and 304s get ``Vary: Accept-Encoding``. ``compression_stats`` counts bytes in and out and the
+CPU time spent per encoding.
+"""
+import threading
+import time
+import zlib
+from typing import Any, Dict, List, Optional
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from utils.metrics import MetricFamily, collector
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "application/x-ndjson",
+    "application/javascript",
+    "application/xml",
+)
+
+
+def is_compressible(content_type: str) -> bool:
+    media_type = content_type.split(";", 1)[0].strip().lower()
+    return media_type.startswith("text/") or media_type in COMPRESSIBLE_TYPES or media_type.endswith("+json")
+
+
+def available_encodings() -> List[str]:
+    """Encodings this process can produce, preferred first"""
+    return ["br", "gzip"] if brotli is not None else ["gzip"]
+
+
+def choose_encoding(accept_encoding: str, encodings: List[str]) -> Optional[str]:
+    """Best of encodings by the client's q-values, None for identity"""
+    weights: Dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name] = q
+
+    best, best_q = None, 0.0
+    for encoding in encodings:
+        q = weights.get(encoding, weights.get("*", 0.0))
+        # Ties go to the earlier (preferred) encoding
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+class Compressor:
+    """Incremental compressor for one response"""
+
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        self.encoding = encoding
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=brotli_quality)
+        else:
+            # wbits 31: gzip container
+            self._zlib = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes, flush: bool = False) -> bytes:
+        """Compress a chunk; flush makes everything so far decodable"""
+        if self.encoding == "br":
+            out = self._brotli.process(data)
+            return out + self._brotli.flush() if flush else out
+        out = self._zlib.compress(data)
+        return out + self._zlib.flush(zlib.Z_SYNC_FLUSH) if flush else out
+
+    def finish(self, data: bytes = b"") -> bytes:
+        if self.encoding == "br":
+            return self._brotli.process(data) + self._brotli.finish()
+        return self._zlib.compress(data) + self._zlib.flush()
+
+
+class CompressionStats:
+    """Bytes and CPU time per encoding"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._encodings: Dict[str, Dict[str, float]] = {}
+            self._skipped: Dict[str, int] = {}
+
+    def add(self, encoding: str, bytes_in: int, bytes_out: int, cpu_seconds: float, responses: int = 0) -> None:
+        with self._lock:
+            entry = self._encodings.setdefault(
+                encoding, {"responses": 0, "bytes_in": 0, "bytes_out": 0, "cpu_seconds": 0.0}
+            )
+            entry["responses"] += responses
+            entry["bytes_in"] += bytes_in
+            entry["bytes_out"] += bytes_out
+            entry["cpu_seconds"] += cpu_seconds
+
+    def skip(self, reason: str) -> None:
+        with self._lock:
+            self._skipped[reason] = self._skipped.get(reason, 0) + 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            encodings = {}
+            for encoding, entry in self._encodings.items():
+                bytes_in = entry["bytes_in"]
+                encodings[encoding] = {
+                    "responses": entry["responses"],
+                    "bytes_in": bytes_in,
+                    "bytes_out": entry["bytes_out"],
+                    "ratio": round(entry["bytes_out"] / bytes_in, 4) if bytes_in else None,
+                    "cpu_ms": round(entry["cpu_seconds"] * 1000, 3),
+                    # CPU cost per MB of JSON, to weigh against the bytes saved
+                    "cpu_ms_per_mb": round(entry["cpu_seconds"] * 1000 / (bytes_in / 1e6), 3) if bytes_in else None,
+                }
+            return {"encodings": encodings, "skipped": dict(self._skipped), "available": available_encodings()}
+
+    def metrics(self) -> List[MetricFamily]:
+        """Counters per encoding for GET /metrics"""
+        with self._lock:
+            encodings = sorted((encoding, dict(entry)) for encoding, entry in self._encodings.items())
+        return [
+            (f"compression_{name}_total", "counter", help_text,
+             [({"encoding": encoding}, entry[name]) for encoding, entry in encodings])
+            for name, help_text in (
+                ("responses", "Compressed responses"),
+                ("bytes_in", "Bytes before compression"),
+                ("bytes_out", "Bytes after compression"),
+                ("cpu_seconds", "CPU time spent compressing"),
+            )
+        ]
+
+
+compression_stats = CompressionStats()
+collector(compression_stats.metrics)
+
+
+class CompressionMiddleware:
+    """ASGI middleware compressing large text/JSON responses"""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+        stats: CompressionStats = compression_stats
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.stats = stats
+        self.encodings = available_encodings()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""), self.encodings)
+        responder = _CompressingResponder(self, encoding, send)
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressingResponder:
+    """Rewrites one response's messages"""
+
+    def __init__(self, middleware: CompressionMiddleware, encoding: Optional[str], send: Send):
+        self.middleware = middleware
+        self.encoding = encoding
+        self.downstream = send
+        self.start: Optional[Message] = None
+        self.compressor: Optional[Compressor] = None
+        self.passthrough = False
+        self.finished = False
+        # Body held back until it is complete (Content-Length known) or, for
+        # streams, reaches the minimum size: responses passing through
+        # BaseHTTPMiddleware arrive in several messages either way
+        self.buffer: List[bytes] = []
+        self.buffered = 0
+        self.expected: Optional[int] = None
+
+    def _skip_reason(self) -> Optional[str]:
+        """Why the response is sent as it is, None to compress it"""
+        headers = Headers(raw=self.start["headers"])
+        if self.start["status"] in (204, 304) or "content-encoding" in headers:
+            return "not_compressible"
+        if not is_compressible(headers.get("content-type", "")):
+            return "not_compressible"
+        return "identity" if self.encoding is None else None
+
+    async def send(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            self.start = message
+            headers = MutableHeaders(scope=message)
+            reason = self._skip_reason()
+            revalidation = message["status"] == 304
+            if reason != "not_compressible" or revalidation:
+                headers.add_vary_header("Accept-Encoding")
+            etag = headers.get("etag")
+            if self.encoding is not None and (reason is None or revalidation) and etag and not etag.startswith("W/"):
+                headers["ETag"] = "W/" + etag
+            if reason is not None:
+                self.middleware.stats.skip(reason)
+                self.passthrough = True
+                await self.downstream(message)
+            elif "content-length" in headers:
+                self.expected = int(headers["content-length"])
+            return
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.downstream(message)
+            return
+        if self.finished:
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self.compressor is None:
+            self.buffer.append(body)
+            self.buffered += len(body)
+            if more_body and self.buffered < (self.expected or self.middleware.minimum_size):
+                return
+            body, self.buffer = b"".join(self.buffer), []
+            if self.expected is not None:
+                # The rest can only be empty messages
+                more_body = False
+            headers = MutableHeaders(scope=self.start)
+            if not more_body and len(body) < self.middleware.minimum_size:
+                self.middleware.stats.skip("too_small")
+                self.finished = True
+                headers["Content-Length"] = str(len(body))
+                await self.downstream(self.start)
+                await self.downstream({"type": "http.response.body", "body": body})
+                return
+
+            self.compressor = Compressor(self.encoding, self.middleware.gzip_level, self.middleware.brotli_quality)
+            headers["Content-Encoding"] = self.encoding
+            if "content-length" in headers:
+                del headers["content-length"]
+            if not more_body:
+                data = self._compress(body, final=True)
+                headers["Content-Length"] = str(len(data))
+                await self.downstream(self.start)
+                await self.downstream({"type": "http.response.body", "body": data})
+                self.finished = True
+                return
+            await self.downstream(self.start)
+
+        data = self._compress(body, final=not more_body)
+        await self.downstream({"type": "http.response.body", "body": data, "more_body": more_body})
+
+    def _compress(self, body: bytes, final: bool) -> bytes:
+        started = time.thread_time()
+        data = self.compressor.finish(body) if final else self.compressor.compress(body, flush=True)
+        self.middleware.stats.add(
+            self.encoding, len(body), len(data), time.thread_time() - started, responses=int(final)
+        )
+        return data
@@ -0,0 +1,30 @@
+"""
+ETag helpers for conditional GET requests
+"""
+import hashlib
+import json
+from typing import Any, Optional
+from fastapi import Request, Response
+
+
+def compute_etag(*parts: Any) -> str:
+    """Strong ETag from JSON-serializable parts"""
+    payload = json.dumps(parts, sort_keys=True, separators=(",", ":"), default=str)
+    return '"' + hashlib.sha1(payload.encode("utf-8")).hexdigest() + '"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Whether the request's If-None-Match covers the ETag"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # Weak comparison, as for GET: W/ prefixes are ignored
+    candidates = [candidate.strip() for candidate in header.split(",")]
+    return any(candidate.removeprefix("W/") == etag for candidate in candidates)
+
+
+def not_modified(etag: str, headers: Optional[dict] = None) -> Response:
+    """Empty 304 response repeating the ETag"""
+    return Response(status_code=304, headers={**(headers or {}), "ETag": etag})
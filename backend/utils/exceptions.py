@@ -48,6 +48,16 @@ class DuplicateGenreError(HTTPException):
         )
 
 
+class DatabaseBusyError(HTTPException):
+    """Custom exception for a full database work queue"""
+    def __init__(self, retry_after: int = 1):
+        super().__init__(
+            status_code=503,
+            detail="Server busy, try again shortly",
+            headers={"Retry-After": str(retry_after)}
+        )
+
+
 async def database_exception_handler(request: Request, exc: SQLAlchemyError):
     """Handle database exceptions"""
     logger.error(f"Database error: {str(exc)}")
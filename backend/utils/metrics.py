@@ -0,0 +1,282 @@
+"""
+Request metrics in the Prometheus text format
+
+``MetricsMiddleware`` times every request and labels it with the route
+template (``/movies/{movie_id}``, not the raw path) and status code. Engines
+passed to ``instrument_engine`` report each SQL statement through SQLAlchemy's
+``before_cursor_execute`` / ``after_cursor_execute`` events, both globally and
+to the request that ran it, so a route whose statement count per request
+grows (an N+1 query) shows up in ``http_request_sql_statements``; requests
+over SQL_STATEMENT_WARN_THRESHOLD statements are also logged. Pool checkout
+time runs from a session starting a transaction to the pool's ``checkout``
+event.
+
+Other modules expose their counters (response cache, database runner,
+compression) through functions registered with ``collector``, read at scrape
+time.
+``render_metrics`` produces the ``GET /metrics`` body.
+"""
+import threading
+import time
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from config import settings
+from utils.logging import logger
+
+SQL_STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+POOL_WAIT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5)
+
+# (labels, value) pairs of one metric
+Samples = List[Tuple[Dict[str, str], float]]
+# name, type ("counter" / "gauge"), help text, samples
+MetricFamily = Tuple[str, str, str, Samples]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """Cumulative-bucket histogram per label set"""
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str], buckets: Sequence[float]):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> (per-bucket counts, sum, count)
+        self._series: Dict[Tuple[str, ...], List] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels: Tuple[str, ...], value: float) -> None:
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * len(self.buckets), 0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][index] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted((labels, list(counts), total, count) for labels, (counts, total, count) in self._series.items())
+        for labels, counts, total, count in series:
+            names = dict(zip(self.label_names, labels))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{_format_labels({**names, 'le': _format_value(float(bound))})} {cumulative}")
+            lines.append(f"{self.name}_bucket{_format_labels({**names, 'le': '+Inf'})} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(names)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(names)} {count}")
+        return lines
+
+
+class _Counters:
+    """Counters per label set"""
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str]):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels: Tuple[str, ...], amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def family(self) -> MetricFamily:
+        with self._lock:
+            samples = [(dict(zip(self.label_names, labels)), value) for labels, value in sorted(self._values.items())]
+        return self.name, "counter", self.help_text, samples
+
+
+request_latency = Histogram(
+    "http_request_duration_seconds", "Request latency by route", ("method", "route", "status"),
+    settings.METRICS_LATENCY_BUCKETS
+)
+request_sql_statements = Histogram(
+    "http_request_sql_statements", "SQL statements run per request", ("method", "route"), SQL_STATEMENT_BUCKETS
+)
+request_sql_seconds = Histogram(
+    "http_request_sql_seconds", "Time spent in SQL statements per request", ("method", "route"),
+    settings.METRICS_LATENCY_BUCKETS
+)
+pool_checkout_seconds = Histogram(
+    "db_pool_checkout_seconds", "Time to obtain a pooled connection", ("engine",), POOL_WAIT_BUCKETS
+)
+sql_statements = _Counters("db_statements_total", "SQL statements executed", ("engine",))
+sql_seconds = _Counters("db_statement_seconds_total", "Time spent executing SQL statements", ("engine",))
+
+_collectors: List[Callable[[], Iterable[MetricFamily]]] = []
+
+
+def collector(function: Callable[[], Iterable[MetricFamily]]) -> Callable[[], Iterable[MetricFamily]]:
+    """Register a function returning metric families, called on every scrape"""
+    _collectors.append(function)
+    return function
+
+
+class _SqlTally:
+    """SQL statements of one request"""
+
+    def __init__(self):
+        self.statements = 0
+        self.seconds = 0.0
+
+
+# Set by the middleware for the duration of a request
+_request_tally: ContextVar[Optional[_SqlTally]] = ContextVar("request_sql_tally", default=None)
+
+
+# When the current session asked for a connection; the pool has no event
+# before a checkout, so the wait is timed from the session transaction that
+# needs it
+_checkout_requested: ContextVar[Optional[float]] = ContextVar("pool_checkout_requested", default=None)
+
+
+@event.listens_for(Session, "after_transaction_create")
+def _note_checkout_request(session, transaction):
+    if transaction.parent is None and settings.METRICS_ENABLED:
+        _checkout_requested.set(time.perf_counter())
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _drop_checkout_request(session, transaction):
+    # Transactions that ended without a checkout (nothing ran, or the
+    # connection came from an engine that isn't instrumented)
+    if transaction.parent is None:
+        _checkout_requested.set(None)
+
+
+def instrument_engine(engine: Engine, name: str) -> None:
+    """Count and time the engine's statements and pool checkouts"""
+    if not settings.METRICS_ENABLED:
+        return
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(connection, cursor, statement, parameters, context, executemany):
+        connection.info.setdefault("metrics_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(connection, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - connection.info["metrics_started"].pop()
+        sql_statements.inc((name,))
+        sql_seconds.inc((name,), elapsed)
+        tally = _request_tally.get()
+        if tally is not None:
+            tally.statements += 1
+            tally.seconds += elapsed
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(context):
+        started = context.connection.info.get("metrics_started") if context.connection is not None else None
+        if started:
+            started.pop()
+
+    # Pool events set on the engine carry over to the pool dispose() creates
+    @event.listens_for(engine, "checkout")
+    def checkout(dbapi_connection, connection_record, connection_proxy):
+        started = _checkout_requested.get()
+        if started is not None:
+            _checkout_requested.set(None)
+            pool_checkout_seconds.observe((name,), time.perf_counter() - started)
+
+    @collector
+    def pool_metrics() -> List[MetricFamily]:
+        families = []
+        for metric, method, help_text in (
+            ("checked_out", "checkedout", "Connections in use"),
+            ("size", "size", "Persistent connections the pool keeps"),
+            ("overflow", "overflow", "Connections opened beyond the pool size"),
+        ):
+            value = getattr(engine.pool, method, None)
+            if callable(value):
+                # QueuePool counts overflow from -size
+                families.append((f"db_pool_{metric}", "gauge", help_text, [({"engine": name}, max(value(), 0))]))
+        return families
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency and SQL usage per route"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        tally = _SqlTally()
+        token = _request_tally.set(tally)
+        started = time.perf_counter()
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            _request_tally.reset(token)
+            # The matched route's template keeps the label set bounded
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            method = scope["method"]
+            request_latency.observe((method, route, str(status)), elapsed)
+            request_sql_statements.observe((method, route), tally.statements)
+            request_sql_seconds.observe((method, route), tally.seconds)
+            threshold = settings.SQL_STATEMENT_WARN_THRESHOLD
+            if threshold and tally.statements > threshold:
+                logger.warning(f"{method} {route} ran {tally.statements} SQL statements")
+
+
+def _render_family(name: str, kind: str, help_text: str, samples: Samples) -> List[str]:
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+    lines.extend(f"{name}{_format_labels(labels)} {_format_value(value)}" for labels, value in samples)
+    return lines
+
+
+def render_metrics() -> str:
+    """All metrics in the Prometheus text exposition format"""
+    lines: List[str] = []
+    for histogram in (request_latency, request_sql_statements, request_sql_seconds, pool_checkout_seconds):
+        lines.extend(histogram.render())
+    families: Dict[str, MetricFamily] = {}
+    for family in [sql_statements.family(), sql_seconds.family()] + [
+        family for function in _collectors for family in function()
+    ]:
+        # Collectors of several engines report the same metric: merge them
+        name, kind, help_text, samples = family
+        if name in families:
+            families[name][3].extend(samples)
+        else:
+            families[name] = (name, kind, help_text, list(samples))
+    for family in families.values():
+        lines.extend(_render_family(*family))
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,39 @@
+"""
+Keyset (cursor) pagination helpers for the Movies API
+"""
+import base64
+import json
+from typing import Optional
+from fastapi import HTTPException
+
+
+def encode_cursor(last_id: int) -> str:
+    """Build the opaque cursor pointing after the given movie ID"""
+    payload = json.dumps({"id": last_id}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    """Extract the movie ID from an opaque cursor"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        last_id = json.loads(base64.urlsafe_b64decode(padded.encode()))["id"]
+        if not isinstance(last_id, int):
+            raise ValueError("cursor id must be an integer")
+        return last_id
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def resolve_after_id(after_id: Optional[int], cursor: Optional[str]) -> Optional[int]:
+    """
+    Combine the after_id and cursor query parameters
+
+    Returns:
+        The ID to continue after, or None for offset (page) pagination
+    """
+    if cursor is not None:
+        if after_id is not None:
+            raise HTTPException(status_code=400, detail="Use either after_id or cursor, not both")
+        return decode_cursor(cursor)
+    return after_id
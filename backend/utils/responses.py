@@ -0,0 +1,41 @@
+"""
+Fast JSON responses
+
+Handlers on hot paths build plain dicts and return them through
+``json_response``. With LEAN_SERIALIZATION on, the dicts are encoded directly
+(with orjson when installed) and FastAPI skips validating them against the
+route's response_model; with it off they are returned as they are and
+FastAPI validates and serializes them as usual.
+"""
+import json
+from typing import Any
+from fastapi.responses import JSONResponse
+from config import settings
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse encoding with orjson, or compact json.dumps without it"""
+
+    def __init__(self, content: Any, *args, **kwargs):
+        # Kept so the response cache can store what was sent
+        self.content = content
+        super().__init__(content, *args, **kwargs)
+
+    def render(self, content: Any) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+        return json.dumps(
+            content, ensure_ascii=False, allow_nan=False, separators=(",", ":")
+        ).encode("utf-8")
+
+
+def json_response(content: Any) -> Any:
+    """Encode JSON-ready content directly when LEAN_SERIALIZATION is on"""
+    if settings.LEAN_SERIALIZATION:
+        return FastJSONResponse(content)
+    return content
@@ -3,6 +3,7 @@
 
 import { useState, useEffect } from 'react';
 import { MoviesAPI } from '@/services/api';
+import { MovieSuggestion } from '@/types/movie';
 
 interface SearchFiltersProps {
   onSearch: (filters: {
@@ -28,6 +29,7 @@ export default function SearchFilters({ onSearch, initialFilters }: SearchFilter
   const [genre, setGenre] = useState('');
   const [rating, setRating] = useState('');
   const [availableGenres, setAvailableGenres] = useState<string[]>([]);
+  const [suggestions, setSuggestions] = useState<MovieSuggestion[]>([]);
 
   // Aplicar filtros iniciales cuando se reciben
   useEffect(() => {
@@ -55,6 +57,24 @@ export default function SearchFilters({ onSearch, initialFilters }: SearchFilter
     loadGenres();
   }, []);
 
+  // Sugerencias de títulos (servidas desde memoria por /movies/suggest)
+  useEffect(() => {
+    const term = query.trim();
+    if (!term) {
+      setSuggestions([]);
+      return;
+    }
+    const timeoutId = setTimeout(async () => {
+      try {
+        setSuggestions(await MoviesAPI.suggestMovies(term));
+      } catch (error) {
+        console.error('Error loading suggestions:', error);
+      }
+    }, 100);
+
+    return () => clearTimeout(timeoutId);
+  }, [query]);
+
   // Búsqueda en tiempo real con debounce
   useEffect(() => {
     const timeoutId = setTimeout(() => {
@@ -91,9 +111,17 @@ export default function SearchFilters({ onSearch, initialFilters }: SearchFilter
           type="text"
           value={query}
           onChange={(e) => setQuery(e.target.value)}
+          list="movie-title-suggestions"
           placeholder="Search movies by title..."
           className="w-full pl-10 pr-12 py-3 text-lg text-gray-900 placeholder-gray-600 border border-gray-300 rounded-full bg-white shadow-sm focus:outline-none focus:ring-2 focus:ring-blue-500 focus:border-transparent transition-all duration-200"
         />
+        <datalist id="movie-title-suggestions">
+          {suggestions.map((suggestion) => (
+            <option key={suggestion.id} value={suggestion.title}>
+              {suggestion.year ?? ''}
+            </option>
+          ))}
+        </datalist>
         {query && (
           <button
             onClick={() => setQuery('')}
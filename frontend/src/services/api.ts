@@ -1,5 +1,5 @@
 // services/api.ts
-import { Movie, MovieResponse, MovieCreate, MovieSummary } from '@/types/movie';
+import { Movie, MovieResponse, MovieCreate, MovieSummary, MovieSuggestion } from '@/types/movie';
 
 const API_BASE_URL = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000';
 
@@ -9,13 +9,17 @@ export class MoviesAPI {
     options: RequestInit = {}
   ): Promise<T> {
     const url = `${API_BASE_URL}${endpoint}`;
-    
+    const isRead = !options.method || options.method === 'GET';
+
     const response = await fetch(url, {
+      // Reads revalidate with the stored ETag, so unchanged data comes back as a 304
+      cache: isRead ? 'no-cache' : undefined,
+      ...options,
       headers: {
-        'Content-Type': 'application/json',
+        // No body on reads: skipping Content-Type avoids a CORS preflight
+        ...(isRead ? {} : { 'Content-Type': 'application/json' }),
         ...options.headers,
       },
-      ...options,
     });
 
     if (!response.ok) {
@@ -35,6 +39,7 @@ export class MoviesAPI {
     genre?: string;
     min_rating?: number;
     max_rating?: number;
+    cursor?: string;
   } = {}): Promise<MovieResponse> {
     const searchParams = new URLSearchParams();
     
@@ -50,10 +55,23 @@ export class MoviesAPI {
     return this.request<MovieResponse>(endpoint);
   }
 
+  static async suggestMovies(q: string, limit: number = 8): Promise<MovieSuggestion[]> {
+    const searchParams = new URLSearchParams({ q, limit: limit.toString() });
+    return this.request<MovieSuggestion[]>(`/movies/suggest?${searchParams.toString()}`);
+  }
+
   static async getMovie(id: number): Promise<Movie> {
     return this.request<Movie>(`/movies/${id}`);
   }
 
+  // Several movies in one request, in the order given; unknown IDs come back in missing
+  static async lookupMovies(ids: number[]): Promise<{ movies: Movie[]; missing: number[] }> {
+    return this.request<{ movies: Movie[]; missing: number[] }>('/movies/lookup', {
+      method: 'POST',
+      body: JSON.stringify({ ids }),
+    });
+  }
+
   static async createMovie(movie: MovieCreate): Promise<Movie> {
     return this.request<Movie>('/movies', {
       method: 'POST',
@@ -75,8 +93,8 @@ export class MoviesAPI {
   }
 
   // Genres endpoints
-  static async getGenres(): Promise<Array<{ genre: string; movie_count: number }>> {
-    return this.request<Array<{ genre: string; movie_count: number }>>('/genres');
+  static async getGenres(): Promise<Array<{ id: number; genre: string; movie_count: number }>> {
+    return this.request<Array<{ id: number; genre: string; movie_count: number }>>('/genres');
   }
 
   static async getUniqueGenres(): Promise<string[]> {
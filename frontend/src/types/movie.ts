@@ -18,7 +18,17 @@ export interface MovieSummary {
   genres: string[];
 }
 
+export interface MovieSuggestion {
+  id: number;
+  title: string;
+  year?: number;
+  vote_count: number;
+}
+
 export interface Genre {
+  // Catalog ID of the genre (same for every movie), used by DELETE /movies/{id}/genres/{genre_id}
+  genre_id: number;
+  // Deprecated: same as genre_id
   id: number;
   movie_id: number;
   genre: string;
@@ -36,6 +46,7 @@ export interface MovieResponse {
   total: number;
   page: number;
   page_size: number;
+  next_cursor?: string | null;
 }
 
 export interface MovieCreate {